@@ -0,0 +1,97 @@
+'''
+benchmark the fused, single pass check dispatch against one pass per check
+
+usage: python benchmarks/fused_dispatch.py [OBJECTS]
+'''
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from parabola_repolint.linter import Linter, LinterCheckBase, LinterCheckType, LinterIssue
+
+
+class FakeEntry():
+    ''' a stand-in for a repo.db entry '''
+
+    def __init__(self, i):
+        ''' constructor '''
+        self.pkgname = 'pkg%i' % i
+        self.depends = set('dep%i' % (i % 97 + d) for d in range(5))
+
+
+class FakeRepo():
+    ''' a stand-in for a repository '''
+
+    def __init__(self, count):
+        ''' constructor '''
+        self.pkgentries = [FakeEntry(i) for i in range(count)]
+
+
+class FakeCache():
+    ''' a stand-in for the repo cache, rebuilding its lists like RepoCache '''
+
+    def __init__(self, count):
+        ''' constructor '''
+        self._repos = {'repo%i' % i: FakeRepo(count // 4) for i in range(4)}
+
+    @property
+    def pkgentries(self):
+        ''' produce the list of entries in all repos '''
+        return [p for r in self._repos.values() for p in r.pkgentries]
+
+
+def make_check(i):
+    ''' produce a cheap PKGENTRY check that flags some of the entries '''
+
+    def check(self, pkgentry): # pylint: disable=unused-argument
+        ''' run the check '''
+        if 'dep%i' % i in pkgentry.depends:
+            raise LinterIssue('%s', pkgentry.pkgname)
+
+    return type('BenchCheck%i' % i, (LinterCheckBase,), {
+        'name': 'bench_check_%i' % i,
+        'check_type': LinterCheckType.PKGENTRY,
+        'header': 'benchmark check %i' % i,
+        'check': check,
+    })
+
+
+def make_linter(cache, num_checks):
+    ''' produce a linter with the given number of enabled checks '''
+    linter = Linter(cache, [make_check(i) for i in range(num_checks)])
+    linter.load_checks([str(c) for c in linter.checks])
+    return linter
+
+
+def run_per_check(linter):
+    ''' the previous dispatch: one traversal of the cache per check '''
+    for check in linter._enabled_checks:
+        for pkgentry in linter._cache.pkgentries:
+            linter._try_check(check, pkgentry)
+
+
+def run_fused(linter):
+    ''' the fused dispatch: one traversal of the cache per check type '''
+    linter.run_checks()
+
+
+def main():
+    ''' run the benchmark '''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40000
+    cache = FakeCache(count)
+
+    print('%8s %12s %12s %8s' % ('checks', 'per-check', 'fused', 'speedup'))
+    for num_checks in [1, 2, 5, 10, 20, 40]:
+        times = []
+        for func in [run_per_check, run_fused]:
+            linter = make_linter(cache, num_checks)
+            times.append(min(timeit.repeat(lambda: func(linter), number=1, repeat=3)))
+        print('%8i %11.3fs %11.3fs %7.2fx' % (num_checks, times[0], times[1], times[0] / times[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+'''
+benchmark the pure-Python signature parser against running gpg --list-packets,
+on the detached signatures and repo.db PGPSIG fields below a mirror directory
+
+usage: python benchmarks/openpgp_parse.py MIRROR_DIR [GPG_SAMPLE]
+'''
+
+import os
+import sys
+import time
+import shutil
+import tarfile
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# pylint: disable=wrong-import-position
+from parabola_repolint.openpgp import read_pgpsig, read_signature_file
+
+
+def find_files(mirror_dir):
+    ''' produce the detached signatures and the repo.db files below the mirror '''
+    sigs = []
+    dbs = []
+    for root, _, files in os.walk(mirror_dir):
+        for name in files:
+            if name.endswith('.pkg.tar.xz.sig') or name.endswith('.pkg.tar.zst.sig'):
+                sigs.append(os.path.join(root, name))
+            elif name.endswith('.db.tar.gz') or name.endswith('.db.tar.xz'):
+                dbs.append(os.path.join(root, name))
+    return sigs, dbs
+
+
+def read_pgpsigs(db_path):
+    ''' produce the PGPSIG fields of the entries of a repo.db '''
+    res = []
+    with tarfile.open(db_path) as db:
+        for member in db:
+            if not member.name.endswith('/desc'):
+                continue
+            lines = db.extractfile(member).read().decode('utf-8').splitlines()
+            if '%PGPSIG%' in lines:
+                res.append(lines[lines.index('%PGPSIG%') + 1])
+    return res
+
+
+def timed(func, items):
+    ''' apply func to all items, producing the elapsed time and the failure count '''
+    failures = 0
+    start = time.perf_counter()
+    for item in items:
+        try:
+            func(item)
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            failures += 1
+    return time.perf_counter() - start, failures
+
+
+def gpg_list_packets(path):
+    ''' parse a signature by running gpg, as the linter used to '''
+    subprocess.run(['gpg', '--list-packets', path], check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def report(label, count, elapsed, failures):
+    ''' print a single result line '''
+    rate = count / elapsed if elapsed else float('inf')
+    print('%-24s %8i %10.3fs %12.0f/s %8i' % (label, count, elapsed, rate, failures))
+
+
+def main():
+    ''' run the benchmark '''
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        sys.exit(1)
+    sample = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    sigs, dbs = find_files(sys.argv[1])
+    pgpsigs = [s for db in dbs for s in read_pgpsigs(db)]
+
+    print('%-24s %8s %11s %14s %8s' % ('parser', 'count', 'time', 'rate', 'failed'))
+    report('openpgp .sig files', len(sigs), *timed(read_signature_file, sigs))
+    report('openpgp PGPSIG fields', len(pgpsigs), *timed(read_pgpsig, pgpsigs))
+
+    if shutil.which('gpg'):
+        subset = sigs[:sample]
+        report('gpg --list-packets', len(subset), *timed(gpg_list_packets, subset))
+    else:
+        print('gpg not found, skipping the comparison')
+
+
+if __name__ == '__main__':
+    main()
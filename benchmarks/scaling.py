@@ -0,0 +1,133 @@
+'''
+benchmark full linter runs on synthetic mirrors of increasing size: a cold run
+on an empty cache, a warm run on an unchanged mirror, and an incremental run
+after a fraction of the packages has been rebuilt
+
+every run is a separate parabola-repolint process, configured to update from
+the synthetic mirror and abslibre on the local disk. the mirrors are kept in
+the work directory and reused by later invocations.
+
+usage: python benchmarks/scaling.py [--sizes 1000,10000,100000] [--workdir DIR]
+'''
+
+import os
+import sys
+import json
+import glob
+import time
+import shutil
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+# pylint: disable=wrong-import-position
+from synthetic_mirror import SyntheticMirror
+
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def write_config(mirror, run_dir):
+    ''' write a config using the synthetic mirror, as json which is valid yaml '''
+    config = {
+        'parabola': {
+            'arches': mirror.arches,
+            'repos': mirror.repos,
+            'abslibre': mirror.abslibre_url,
+            'abslibre_sparse': False,
+            'mirror': mirror.mirror_dir,
+            'update_jobs': None,
+        },
+        'fixhooks': {'enabled': False},
+        'notify': {
+            'etherpad_url': None,
+            'smtp_host': None,
+            'logfile_dest': os.path.join(run_dir, 'output'),
+        },
+        'gnupg': {'gpgdir': mirror.gnupg_dir, 'keyserver': None},
+        'logging': {
+            'version': 1,
+            'formatters': {'brief': {'format': '%(levelname)s: %(message)s'}},
+            'handlers': {'console': {
+                'class': 'logging.StreamHandler',
+                'formatter': 'brief',
+                'level': 'INFO',
+                'stream': 'ext://sys.stdout',
+            }},
+            'loggers': {'': {'handlers': ['console'], 'level': 'INFO'}},
+        },
+    }
+    with open(os.path.join(run_dir, 'parabola-repolint.conf'), 'w') as outfile:
+        outfile.write(json.dumps(config, indent=2))
+
+
+def run_linter(run_dir, name, jobs):
+    '''
+    run the linter once in run_dir, logging to <name>.log. produces the wall
+    time and the timing report of the run.
+    '''
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT
+    env['XDG_CACHE_HOME'] = os.path.join(run_dir, 'cache')
+    env['XDG_CONFIG_HOME'] = os.path.join(run_dir, 'config')
+
+    cmd = [sys.executable, '-m', 'parabola_repolint', '--incremental', '-j', str(jobs)]
+    start = time.perf_counter()
+    with open(os.path.join(run_dir, '%s.log' % name), 'w') as log:
+        subprocess.run(cmd, cwd=run_dir, env=env, stdout=log, stderr=subprocess.STDOUT, check=True)
+    wall = time.perf_counter() - start
+
+    reports = glob.glob(os.path.join(run_dir, 'output', 'repolint-timing-*.json'))
+    if not reports:
+        return wall, {}
+    with open(max(reports, key=os.path.getmtime), 'r') as infile:
+        return wall, json.loads(infile.read())
+
+
+def report(size, name, wall, timing):
+    ''' print a single result line '''
+    checks = sum(timing.get('check_types', {}).values())
+    calls = {n: t['visited'] for n, t in timing.get('subprocesses', {}).items()}
+    print('%8i %-12s %9.1fs %9.1fs %9.1fs  %s' % (
+        size, name, wall, wall - checks, checks,
+        ', '.join('%s %i' % c for c in sorted(calls.items())) or '-'))
+
+
+def main():
+    ''' run the benchmark '''
+    parser = argparse.ArgumentParser(description='benchmark linter runs on synthetic mirrors')
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='comma-separated list of mirror sizes, in repo.db entries')
+    parser.add_argument('--workdir', default='repolint-scaling',
+                        help='the directory keeping the mirrors and caches')
+    parser.add_argument('--mutate', type=float, default=0.01,
+                        help='the fraction of pkgbases rebuilt before the incremental run')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='the number of linter check processes')
+    parser.add_argument('--regenerate', action='store_true',
+                        help='generate the mirrors again even if they exist')
+    args = parser.parse_args()
+
+    print('%8s %-12s %10s %10s %10s  %s' % ('size', 'run', 'total', 'load', 'checks', 'commands'))
+    for size in [int(s) for s in args.sizes.split(',')]:
+        base = os.path.abspath(os.path.join(args.workdir, str(size)))
+        mirror = SyntheticMirror(os.path.join(base, 'synthetic'), size)
+        if args.regenerate or not mirror.exists:
+            mirror.generate()
+        else:
+            mirror.load()
+
+        run_dir = os.path.join(base, 'run')
+        shutil.rmtree(run_dir, ignore_errors=True)
+        os.makedirs(run_dir)
+        write_config(mirror, run_dir)
+
+        report(size, 'cold', *run_linter(run_dir, 'cold', args.jobs))
+        report(size, 'warm', *run_linter(run_dir, 'warm', args.jobs))
+        mirror.mutate(args.mutate)
+        report(size, 'incremental', *run_linter(run_dir, 'incremental', args.jobs))
+
+
+if __name__ == '__main__':
+    main()
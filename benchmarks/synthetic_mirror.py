@@ -0,0 +1,559 @@
+'''
+generate a synthetic parabola mirror of a given size: a shared top-level pool
+of real, signed .pkg.tar.* files with .PKGINFO and .BUILDINFO, symlinked from
+the os/<arch> directories of the repos as on the real mirror, the repo.db and
+.files databases, an abslibre-like git repository of the PKGBUILDs and a
+parabola-keyring package holding the throwaway signing key
+
+usage: python benchmarks/synthetic_mirror.py DEST [-n PACKAGES] [--mutate FRACTION]
+'''
+
+import io
+import os
+import sys
+import json
+import base64
+import random
+import shutil
+import hashlib
+import tarfile
+import argparse
+import subprocess
+import multiprocessing
+
+
+# the share of the repo.db entries in each repo, the parabola repos split the rest
+ARCH_REPO_SHARES = {'core': 0.05, 'extra': 0.35, 'community': 0.40}
+
+# the directories below pool/ holding the package files, by repo
+ARCH_POOL = 'packages'
+PARABOLA_POOL = 'parabola'
+
+PACKAGER = 'Synthetic Packager <packager@example.org>'
+FIRST_BUILDDATE = 1600000000
+WORDS = ['lib', 'python', 'perl', 'font', 'gtk', 'qt', 'kde', 'xorg', 'ruby', 'haskell',
+         'rust', 'go', 'node', 'lua', 'tex', 'gst', 'vim', 'emacs', 'gnome', 'java']
+
+# the files of the parabola-keyring package
+KEYRING_FILES = ['usr/share/pacman/keyrings/parabola.gpg',
+                 'usr/share/pacman/keyrings/parabola-trusted',
+                 'usr/share/pacman/keyrings/parabola-revoked']
+
+# the rates of the defects planted for the checks to find
+MISSING_DEPENDENCY_RATE = 0.01
+FILE_CONFLICT_RATE = 0.005
+
+
+def _entries(pkgbase, num_arches):
+    ''' produce the number of repo.db entries of a pkgbase '''
+    return len(pkgbase['pkgnames']) * (num_arches if pkgbase['arch'] == ['any'] else len(pkgbase['arch']))
+
+
+def _pkgfiles(pkgbase):
+    ''' produce the (pkgname, arch, filename) of the package files of a pkgbase '''
+    ext = pkgbase['compression']
+    for pkgname in pkgbase['pkgnames']:
+        for arch in pkgbase['arch']:
+            filename = '%s-%s-%s-%s.pkg.tar.%s' % (
+                pkgname, pkgbase['pkgver'], pkgbase['pkgrel'], arch, ext)
+            yield pkgname, arch, filename
+
+
+def _pool(repo):
+    ''' produce the directory below pool/ holding the package files of a repo '''
+    return ARCH_POOL if repo in ARCH_REPO_SHARES else PARABOLA_POOL
+
+
+def _tarinfo(name, size=0, directory=False, mtime=FIRST_BUILDDATE):
+    ''' produce the header of a member of a package file '''
+    info = tarfile.TarInfo(name)
+    info.mtime = mtime
+    info.uname = info.gname = 'root'
+    if directory:
+        info.type = tarfile.DIRTYPE
+        info.mode = 0o755
+    else:
+        info.size = size
+        info.mode = 0o644
+    return info
+
+
+def _pkginfo(pkgbase, pkgname, arch, isize):
+    ''' produce the .PKGINFO of a package '''
+    lines = [
+        '# Generated by makepkg 5.2.2',
+        'pkgname = %s' % pkgname,
+        'pkgbase = %s' % pkgbase['name'],
+        'pkgver = %s-%s' % (pkgbase['pkgver'], pkgbase['pkgrel']),
+        'pkgdesc = synthetic package %s' % pkgname,
+        'url = https://example.org/%s' % pkgbase['name'],
+        'builddate = %i' % pkgbase['builddate'],
+        'packager = %s' % PACKAGER,
+        'size = %i' % isize,
+        'arch = %s' % arch,
+        'license = GPL3',
+    ]
+    lines += ['provides = %s' % p for p in pkgbase['provides'].get(pkgname, [])]
+    lines += ['depend = %s' % d for d in pkgbase['depends'][pkgname]]
+    lines += ['makedepend = %s' % d for d in pkgbase['makedepends']]
+    return '\n'.join(lines) + '\n'
+
+
+def _buildinfo(pkgbase, pkgname, arch, installed):
+    ''' produce the .BUILDINFO of a package '''
+    lines = [
+        'format = 2',
+        'pkgname = %s' % pkgname,
+        'pkgbase = %s' % pkgbase['name'],
+        'pkgver = %s-%s' % (pkgbase['pkgver'], pkgbase['pkgrel']),
+        'pkgarch = %s' % arch,
+        'pkgbuild_sha256sum = %s' % hashlib.sha256(pkgbase['name'].encode()).hexdigest(),
+        'packager = %s' % PACKAGER,
+        'builddate = %i' % pkgbase['builddate'],
+        'builddir = /build',
+        'startdir = /startdir',
+        'buildtool = libretools',
+        'buildtoolver = 20200701',
+        'buildenv = !distcc',
+        'buildenv = color',
+        'options = strip',
+        'options = !debug',
+    ]
+    lines += ['installed = %s' % i for i in installed]
+    return '\n'.join(lines) + '\n'
+
+
+def build_pkgfile(job):
+    '''
+    write and sign a single package file. produces the job key and the data of
+    its repo.db entry.
+    '''
+    pkgbase, pkgname, arch, path, gnupg_dir, installed, extra = job
+
+    files = {f: ('%s %s\n' % (pkgname, f)).encode() for f in pkgbase['files'][pkgname]}
+    files.update(extra)
+    isize = sum(len(c) for c in files.values())
+
+    mode = 'w:xz' if pkgbase['compression'] == 'xz' else 'w:gz'
+    kwargs = {'preset': 0} if mode == 'w:xz' else {'compresslevel': 1}
+    with tarfile.open(path, mode, **kwargs) as tar:
+        for name, text in [('.PKGINFO', _pkginfo(pkgbase, pkgname, arch, isize)),
+                           ('.BUILDINFO', _buildinfo(pkgbase, pkgname, arch, installed))]:
+            data = text.encode()
+            tar.addfile(_tarinfo(name, len(data)), io.BytesIO(data))
+        for name in pkgbase['files'][pkgname]:
+            if name.endswith('/'):
+                tar.addfile(_tarinfo(name.rstrip('/'), directory=True))
+            else:
+                data = files[name]
+                tar.addfile(_tarinfo(name, len(data)), io.BytesIO(data))
+
+    subprocess.run(['gpg', '--homedir', gnupg_dir, '--batch', '--yes', '--no-tty',
+                    '--detach-sign', path], check=True)
+
+    with open(path, 'rb') as infile:
+        content = infile.read()
+    with open(path + '.sig', 'rb') as infile:
+        pgpsig = base64.b64encode(infile.read()).decode()
+
+    return os.path.basename(path), {
+        'csize': len(content),
+        'isize': isize,
+        'md5sum': hashlib.md5(content).hexdigest(),
+        'sha256sum': hashlib.sha256(content).hexdigest(),
+        'pgpsig': pgpsig,
+    }
+
+
+class SyntheticMirror():
+    '''
+    a synthetic mirror below path, with a manifest of its packages so that it
+    can be updated later on
+    '''
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, path, packages=1000, repos=('libre', 'pcr', 'nonprism'),
+                 arches=('x86_64', 'i686'), seed=0, compression='xz', jobs=None):
+        ''' constructor '''
+        self._path = os.path.abspath(path)
+        self._packages = packages
+        self._repos = list(repos)
+        self._arches = list(arches)
+        self._compression = compression
+        self._jobs = jobs or os.cpu_count()
+        self._random = random.Random(seed)
+
+        self._pkgbases = []
+        self._pkgfile_data = {}
+        self._counter = 0
+
+    def load(self):
+        ''' restore the package model of a generated mirror '''
+        with open(os.path.join(self._path, 'manifest.json'), 'r') as infile:
+            data = json.loads(infile.read())
+        self._pkgbases = data['pkgbases']
+        self._pkgfile_data = data['pkgfiles']
+        self._repos = data['repos']
+        self._arches = data['arches']
+        self._counter = data['counter']
+        self._random.seed(data['seed'] + self._counter)
+
+    @property
+    def mirror_dir(self):
+        ''' produce the directory to configure as the mirror '''
+        return os.path.join(self._path, 'mirror')
+
+    @property
+    def abslibre_url(self):
+        ''' produce the url of the abslibre git repository '''
+        return 'file://' + os.path.join(self._path, 'abslibre')
+
+    @property
+    def gnupg_dir(self):
+        ''' produce the gnupg home holding the signing key '''
+        return os.path.join(self._path, 'gnupg')
+
+    @property
+    def repos(self):
+        ''' produce the names of the parabola repos '''
+        return self._repos
+
+    @property
+    def arches(self):
+        ''' produce the architectures of the mirror '''
+        return self._arches
+
+    @property
+    def exists(self):
+        ''' indicate whether the mirror has been generated '''
+        return os.path.isfile(os.path.join(self._path, 'manifest.json'))
+
+    def _save_manifest(self, seed):
+        ''' persist the package model of the mirror '''
+        with open(os.path.join(self._path, 'manifest.json'), 'w') as outfile:
+            outfile.write(json.dumps({
+                'pkgbases': self._pkgbases,
+                'pkgfiles': self._pkgfile_data,
+                'repos': self._repos,
+                'arches': self._arches,
+                'counter': self._counter,
+                'seed': seed,
+            }))
+
+    def _make_pkgbase(self, repo, names, name=None):
+        ''' produce the model of a new random pkgbase in repo '''
+        rnd = self._random
+        self._counter += 1
+        if name is None:
+            name = '%s-%s%i' % (rnd.choice(WORDS), rnd.choice(WORDS), self._counter)
+
+        pkgnames = [name]
+        if rnd.random() < 0.15:
+            pkgnames += ['%s-%s' % (name, s) for s in rnd.sample(['docs', 'devel', 'extras'], rnd.randint(1, 2))]
+
+        if rnd.random() < 0.2:
+            arch = ['any']
+        elif rnd.random() < 0.1:
+            arch = self._arches[:1]
+        else:
+            arch = list(self._arches)
+
+        depends = {}
+        files = {}
+        provides = {}
+        for pkgname in pkgnames:
+            deps = rnd.sample(names, min(len(names), rnd.randint(0, 5)))
+            if rnd.random() < MISSING_DEPENDENCY_RATE:
+                deps.append('missing-dependency%i' % self._counter)
+            depends[pkgname] = deps
+
+            own = ['usr/', 'usr/bin/', 'usr/bin/%s' % pkgname, 'usr/share/',
+                   'usr/share/%s/' % pkgname, 'usr/share/%s/README' % pkgname]
+            own += ['usr/share/%s/data%i' % (pkgname, i) for i in range(rnd.randint(0, 10))]
+            if names and rnd.random() < FILE_CONFLICT_RATE:
+                own.append('usr/bin/%s' % rnd.choice(names))
+            files[pkgname] = own
+
+            if rnd.random() < 0.05:
+                provides[pkgname] = ['virtual-%s=1.0' % pkgname]
+
+        return {
+            'repo': repo,
+            'name': name,
+            'pkgnames': pkgnames,
+            'pkgver': '%i.%i.%i' % (rnd.randint(0, 9), rnd.randint(0, 30), rnd.randint(0, 99)),
+            'pkgrel': 1,
+            'arch': arch,
+            'depends': depends,
+            'makedepends': rnd.sample(names, min(len(names), rnd.randint(0, 3))),
+            'provides': provides,
+            'files': files,
+            'builddate': FIRST_BUILDDATE + self._counter,
+            'compression': self._compression,
+        }
+
+    def _make_model(self):
+        ''' produce the pkgbases of all repos, about packages repo.db entries in total '''
+        shares = dict(ARCH_REPO_SHARES)
+        rest = 1.0 - sum(shares.values())
+        shares.update({r: rest / len(self._repos) for r in self._repos})
+
+        names = []
+        keyring = self._make_pkgbase('libre', names, 'parabola-keyring')
+        keyring.update(pkgnames=['parabola-keyring'], arch=['any'], provides={},
+                       depends={'parabola-keyring': []}, makedepends=[],
+                       files={'parabola-keyring': ['usr/', 'usr/share/', 'usr/share/pacman/',
+                                                   'usr/share/pacman/keyrings/'] + KEYRING_FILES})
+        self._pkgbases.append(keyring)
+
+        for repo, share in shares.items():
+            count = 0
+            while count < share * self._packages:
+                pkgbase = self._make_pkgbase(repo, names)
+                self._pkgbases.append(pkgbase)
+                names.extend(pkgbase['pkgnames'])
+                count += _entries(pkgbase, len(self._arches))
+
+    def _gpg(self, *args, **kwargs):
+        ''' run gpg on the throwaway keyring '''
+        kwargs.setdefault('stderr', subprocess.DEVNULL)
+        return subprocess.run(['gpg', '--homedir', self.gnupg_dir, '--batch', '--no-tty', *args],
+                              check=True, **kwargs)
+
+    def _make_key(self):
+        ''' create the throwaway signing key '''
+        os.makedirs(self.gnupg_dir, mode=0o700)
+        self._gpg('--passphrase', '', '--quick-gen-key', PACKAGER, 'ed25519', 'sign', 'never')
+
+    def _keyring_files(self):
+        ''' produce the contents of the parabola-keyring package '''
+        key = self._gpg('--export', stdout=subprocess.PIPE).stdout
+        fingerprints = self._gpg('--with-colons', '--list-keys', stdout=subprocess.PIPE).stdout
+        fpr = [f.split(':')[9] for f in fingerprints.decode().splitlines() if f.startswith('fpr')][0]
+        return dict(zip(KEYRING_FILES, [key, ('%s:4:\n' % fpr).encode(), b'']))
+
+    def _installed(self, names):
+        ''' produce a random BUILDINFO installed list '''
+        count = min(len(names), self._random.randint(20, 150))
+        return ['%s-1.0-1-%s' % (n, self._random.choice(self._arches)) for n in self._random.sample(names, count)]
+
+    def _build(self, pkgbases):
+        ''' write, sign and link the package files of the given pkgbases '''
+        names = [n for p in self._pkgbases for n in p['pkgnames']]
+        extra = {'parabola-keyring': self._keyring_files()}
+
+        jobs = []
+        for pkgbase in pkgbases:
+            pool_dir = os.path.join(self.mirror_dir, 'pool', _pool(pkgbase['repo']))
+            os.makedirs(pool_dir, exist_ok=True)
+            for pkgname, arch, filename in _pkgfiles(pkgbase):
+                jobs.append((pkgbase, pkgname, arch, os.path.join(pool_dir, filename), self.gnupg_dir,
+                             self._installed(names), extra.get(pkgname, {})))
+
+        with multiprocessing.Pool(self._jobs) as pool:
+            for i, (filename, data) in enumerate(pool.imap_unordered(build_pkgfile, jobs, chunksize=16)):
+                self._pkgfile_data[filename] = data
+                if (i + 1) % 1000 == 0:
+                    sys.stdout.write(' built %i/%i package files\r' % (i + 1, len(jobs)))
+                    sys.stdout.flush()
+
+        for pkgbase in pkgbases:
+            for _, arch, filename in _pkgfiles(pkgbase):
+                for link_arch in self._arches if arch == 'any' else [arch]:
+                    self._link(pkgbase['repo'], link_arch, filename)
+
+    def _link(self, repo, arch, filename):
+        ''' symlink a package file and its signature from the pool into an arch directory '''
+        arch_dir = os.path.join(self.mirror_dir, repo, 'os', arch)
+        os.makedirs(arch_dir, exist_ok=True)
+        for name in [filename, filename + '.sig']:
+            os.symlink(os.path.join('..', '..', '..', 'pool', _pool(repo), name),
+                       os.path.join(arch_dir, name))
+
+    def _unlink(self, pkgbase):
+        ''' remove the package files of a pkgbase and their symlinks '''
+        for _, arch, filename in _pkgfiles(pkgbase):
+            repo_dir = os.path.join(self.mirror_dir, pkgbase['repo'])
+            for name in [filename, filename + '.sig']:
+                for link_arch in self._arches if arch == 'any' else [arch]:
+                    os.remove(os.path.join(repo_dir, 'os', link_arch, name))
+                os.remove(os.path.join(self.mirror_dir, 'pool', _pool(pkgbase['repo']), name))
+            self._pkgfile_data.pop(filename, None)
+
+    def _desc(self, pkgbase, pkgname, arch, filename):
+        ''' produce the desc file of a repo.db entry '''
+        data = self._pkgfile_data[filename]
+        fields = [
+            ('FILENAME', [filename]),
+            ('NAME', [pkgname]),
+            ('BASE', [pkgbase['name']]),
+            ('VERSION', ['%s-%s' % (pkgbase['pkgver'], pkgbase['pkgrel'])]),
+            ('DESC', ['synthetic package %s' % pkgname]),
+            ('CSIZE', [str(data['csize'])]),
+            ('ISIZE', [str(data['isize'])]),
+            ('MD5SUM', [data['md5sum']]),
+            ('SHA256SUM', [data['sha256sum']]),
+            ('PGPSIG', [data['pgpsig']]),
+            ('URL', ['https://example.org/%s' % pkgbase['name']]),
+            ('LICENSE', ['GPL3']),
+            ('ARCH', [arch]),
+            ('BUILDDATE', [str(pkgbase['builddate'])]),
+            ('PACKAGER', [PACKAGER]),
+            ('PROVIDES', pkgbase['provides'].get(pkgname, [])),
+            ('DEPENDS', pkgbase['depends'][pkgname]),
+            ('MAKEDEPENDS', pkgbase['makedepends']),
+        ]
+        return ''.join('%%%s%%\n%s\n\n' % (k, '\n'.join(v)) for k, v in fields if v)
+
+    def _write_dbs(self, repos):
+        ''' write the repo.db and .files databases of the given repos '''
+        for repo in repos:
+            for arch in self._arches:
+                arch_dir = os.path.join(self.mirror_dir, repo, 'os', arch)
+                os.makedirs(arch_dir, exist_ok=True)
+                dbs = {}
+                for kind in ['db', 'files']:
+                    dbs[kind] = tarfile.open(os.path.join(arch_dir, '%s.%s.tar.gz.tmp' % (repo, kind)), 'w:gz')
+
+                for pkgbase in self._pkgbases:
+                    if pkgbase['repo'] != repo:
+                        continue
+                    for pkgname, pkg_arch, filename in _pkgfiles(pkgbase):
+                        if pkg_arch not in ['any', arch]:
+                            continue
+                        entry = '%s-%s-%s' % (pkgname, pkgbase['pkgver'], pkgbase['pkgrel'])
+                        desc = self._desc(pkgbase, pkgname, pkg_arch, filename).encode()
+                        files = ('%%FILES%%\n%s\n' % '\n'.join(pkgbase['files'][pkgname])).encode()
+                        for kind, tar in dbs.items():
+                            tar.addfile(_tarinfo(entry, directory=True))
+                            tar.addfile(_tarinfo(entry + '/desc', len(desc)), io.BytesIO(desc))
+                            if kind == 'files':
+                                tar.addfile(_tarinfo(entry + '/files', len(files)), io.BytesIO(files))
+
+                for kind, tar in dbs.items():
+                    tar.close()
+                    target = '%s.%s.tar.gz' % (repo, kind)
+                    os.replace(os.path.join(arch_dir, target + '.tmp'), os.path.join(arch_dir, target))
+                    link = os.path.join(arch_dir, '%s.%s' % (repo, kind))
+                    if not os.path.lexists(link):
+                        os.symlink(target, link)
+
+    def _pkgbuild(self, pkgbase):
+        ''' produce the PKGBUILD of a pkgbase '''
+        def array(values):
+            return '(%s)' % ' '.join("'%s'" % v for v in values)
+
+        lines = [
+            '# Maintainer: %s' % PACKAGER,
+            '',
+            'pkgbase=%s' % pkgbase['name'],
+            'pkgname=%s' % array(pkgbase['pkgnames']),
+            'pkgver=%s' % pkgbase['pkgver'],
+            'pkgrel=%s' % pkgbase['pkgrel'],
+            'pkgdesc="synthetic package %s"' % pkgbase['name'],
+            'arch=%s' % array(pkgbase['arch']),
+            'url="https://example.org/%s"' % pkgbase['name'],
+            'license=(GPL3)',
+            'makedepends=%s' % array(pkgbase['makedepends']),
+            'source=()',
+        ]
+        for pkgname in pkgbase['pkgnames']:
+            lines += [
+                '',
+                'package_%s() {' % pkgname,
+                '  depends=%s' % array(pkgbase['depends'][pkgname]),
+                '  provides=%s' % array(pkgbase['provides'].get(pkgname, [])),
+                '}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+    def _git(self, *args):
+        ''' run git in the abslibre repository '''
+        subprocess.run(['git', '-c', 'user.name=Synthetic Packager', '-c', 'user.email=packager@example.org',
+                        *args], cwd=os.path.join(self._path, 'abslibre'), check=True,
+                       stdout=subprocess.DEVNULL)
+
+    def _write_pkgbuilds(self, pkgbases, message):
+        ''' write the PKGBUILDs of the given pkgbases of parabola repos and commit them '''
+        for pkgbase in pkgbases:
+            if pkgbase['repo'] not in self._repos:
+                continue
+            pkgbuild_dir = os.path.join(self._path, 'abslibre', pkgbase['repo'], pkgbase['name'])
+            os.makedirs(pkgbuild_dir, exist_ok=True)
+            with open(os.path.join(pkgbuild_dir, 'PKGBUILD'), 'w') as outfile:
+                outfile.write(self._pkgbuild(pkgbase))
+        self._git('add', '-A')
+        self._git('commit', '-q', '-m', message)
+
+    def generate(self, seed=0):
+        ''' generate the whole mirror from scratch '''
+        if os.path.exists(self._path):
+            shutil.rmtree(self._path)
+        os.makedirs(self._path)
+        os.makedirs(os.path.join(self._path, 'abslibre'))
+        self._git('init', '-q')
+
+        self._make_key()
+        self._make_model()
+        self._build(self._pkgbases)
+        self._write_dbs(list(ARCH_REPO_SHARES) + self._repos)
+        self._write_pkgbuilds(self._pkgbases, 'import synthetic packages')
+        self._save_manifest(seed)
+
+        total = sum(_entries(p, len(self._arches)) for p in self._pkgbases)
+        print('generated %i pkgbases, %i repo.db entries, %i package files in %s' % (
+            len(self._pkgbases), total, len(self._pkgfile_data), self._path))
+
+    def mutate(self, fraction, seed=0):
+        '''
+        rebuild a random fraction of the pkgbases with a bumped pkgrel, as an
+        update of the mirror between two runs. produces the number of rebuilt
+        pkgbases.
+        '''
+        self.load()
+        candidates = [p for p in self._pkgbases if p['name'] != 'parabola-keyring']
+        changed = self._random.sample(candidates, max(1, int(len(candidates) * fraction)))
+
+        for pkgbase in changed:
+            self._unlink(pkgbase)
+            self._counter += 1
+            pkgbase['pkgrel'] += 1
+            pkgbase['builddate'] = FIRST_BUILDDATE + self._counter
+
+        self._build(changed)
+        self._write_dbs(sorted(set(p['repo'] for p in changed)))
+        self._write_pkgbuilds(changed, 'rebuild %i synthetic packages' % len(changed))
+        self._save_manifest(seed)
+        print('rebuilt %i pkgbases in %s' % (len(changed), self._path))
+        return len(changed)
+
+
+def main():
+    ''' generate or update a synthetic mirror '''
+    parser = argparse.ArgumentParser(description='generate a synthetic parabola mirror')
+    parser.add_argument('dest', help='the directory to generate the mirror in')
+    parser.add_argument('-n', '--packages', type=int, default=1000,
+                        help='the approximate number of repo.db entries in all repos')
+    parser.add_argument('--repos', default='libre,pcr,nonprism',
+                        help='comma-separated list of parabola repos')
+    parser.add_argument('--arches', default='x86_64,i686',
+                        help='comma-separated list of architectures')
+    parser.add_argument('--compression', choices=['xz', 'gz'], default='xz',
+                        help='the compression of the package files')
+    parser.add_argument('--seed', type=int, default=0, help='the random seed')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='the number of processes building package files')
+    parser.add_argument('--mutate', type=float, default=None,
+                        help='rebuild this fraction of the pkgbases of an existing mirror')
+    args = parser.parse_args()
+
+    mirror = SyntheticMirror(args.dest, args.packages, args.repos.split(','), args.arches.split(','),
+                             args.seed, args.compression, args.jobs)
+    if args.mutate is not None:
+        mirror.mutate(args.mutate, args.seed)
+    else:
+        mirror.generate(args.seed)
+
+
+if __name__ == '__main__':
+    main()
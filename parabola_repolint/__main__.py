@@ -2,7 +2,10 @@
 entry point of parabloa-repolint
 '''
 
+import io
+import os
 import argparse
+import contextlib
 import logging
 import logging.config
 import sys
@@ -10,17 +13,46 @@ import sys
 from parabola_repolint.config import CONFIG
 from parabola_repolint.linter import Linter
 from parabola_repolint.fixer import Fixer
-from parabola_repolint.repocache import RepoCache
-from parabola_repolint.notify import etherpad_replace, send_mail, write_log
+from parabola_repolint.history import IssueHistory
+from parabola_repolint.report import TextSink, DeltaSink, NdjsonSink
+from parabola_repolint.dispatch import Dispatcher
+from parabola_repolint.metrics import METRICS, record_run
+from parabola_repolint.tracing import start_trace
+from parabola_repolint.profiling import start_profile, PROFILE_TOP
+from parabola_repolint.notify import etherpad_replace, send_mail, write_sidecar, open_sidecar, \
+    archive_digest, digest_archive
 
 
-def make_argparser(linter):
+def _parse_shard(arg):
+    ''' parse a shard specification of the form i/N '''
+    try:
+        index, count = [int(a) for a in arg.split('/')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected i/N, got %s' % arg)
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError('shard index out of range: %s' % arg)
+    return (index, count)
+
+
+class ArgumentParser(argparse.ArgumentParser):
+    '''
+    an argument parser listing all supported linter checks in its help. the
+    checks are loaded only when the help is shown.
+    '''
+
+    def format_help(self):
+        ''' produce the help, with the list of checks as the epilog '''
+        if self.epilog is None:
+            checks = "\n  " + "\n  ".join(sorted(map(str, Linter(None).checks)))
+            self.epilog = "list of all supported linter checks: %s" % checks
+        return super().format_help()
+
+
+def make_argparser():
     ''' produce the argparse object '''
-    checks = "\n  " + "\n  ".join(sorted(map(str, linter.checks)))
-    parser = argparse.ArgumentParser(
+    parser = ArgumentParser(
         description='parabola package linter',
         formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="list of all supported linter checks: %s" % checks
     )
 
     parser.add_argument(
@@ -41,8 +73,8 @@ def make_argparser(linter):
         '-c',
         '--checks',
         type=lambda a: set() if not a else set(s.strip() for s in a.split(',')),
-        default=','.join(map(str, linter.checks)),
-        help='comma-separated list of checks to perform'
+        default=None,
+        help='comma-separated list of checks to perform, defaults to all checks'
     )
 
     parser.add_argument(
@@ -53,44 +85,323 @@ def make_argparser(linter):
         help='comma-separated list of checks to skip'
     )
 
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='reuse the issues of the previous run for objects whose inputs did not change'
+    )
+
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        default=1,
+        help='number of worker processes to run the linter checks in'
+    )
+
+    parser.add_argument(
+        '--delta-digest',
+        action='store_true',
+        help='only list the issues that are new or resolved since the previous run'
+    )
+
+    parser.add_argument(
+        '--ndjson',
+        default=None,
+        help='also write the issues as newline-delimited json to the given file'
+    )
+
+    parser.add_argument(
+        '--trace',
+        default=None,
+        help='write a timeline of the phases, commands and slow checks of the run as '
+             'chrome trace event json to the given file'
+    )
+
+    parser.add_argument(
+        '--profile',
+        default=None,
+        metavar='DIR',
+        help='profile each load phase and each check separately, and write their pstats '
+             'files and a summary of the hottest functions to the given directory'
+    )
+
+    parser.add_argument(
+        '--profile-top',
+        type=int,
+        default=PROFILE_TOP,
+        help='the number of functions listed per profile in the summary'
+    )
+
+    parser.add_argument(
+        '--memory-report',
+        action='store_true',
+        help='trace the memory allocations, and report the memory by phase and by object '
+             'type next to the digest'
+    )
+
+    parser.add_argument(
+        '--shard',
+        type=_parse_shard,
+        default=None,
+        help='only load and lint shard i of N (given as i/N) and write a partial result'
+    )
+
+    parser.add_argument(
+        '--shard-output',
+        default=None,
+        help='the partial result file written by a shard'
+    )
+
+    parser.add_argument(
+        '--index',
+        default=None,
+        help='the repo index shared by the shards, exported first if missing'
+    )
+
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.add_parser(
+        'status',
+        help='show the issue counts of the latest recorded run without loading any repos'
+    )
+
+    index_parser = subparsers.add_parser(
+        'index',
+        help='export the repo index shared by the shards'
+    )
+    index_parser.add_argument('file', help='the index file to write')
+
+    merge_parser = subparsers.add_parser(
+        'merge',
+        help='combine the partial results of all shards and publish the digest'
+    )
+    merge_parser.add_argument('files', nargs='+', help='the partial result files')
+
+    daemon_parser = subparsers.add_parser(
+        'daemon',
+        help='stay running, and relint incrementally whenever the mirror or abslibre change'
+    )
+    daemon_parser.add_argument(
+        '--settle',
+        type=float,
+        default=5.0,
+        help='the number of seconds without further changes to wait for before relinting'
+    )
+
+    digest_parser = subparsers.add_parser(
+        'digest',
+        help='list the archived digests, or show the one at or before a given time'
+    )
+    digest_parser.add_argument(
+        'time',
+        nargs='?',
+        default=None,
+        help='a timestamp of the form YYYYmmdd_HHMM, defaults to the latest digest'
+    )
+    digest_parser.add_argument(
+        '--list',
+        action='store_true',
+        help='list the archived digests instead'
+    )
+
     return parser
 
 
 def checked_main(args):
     ''' the main function '''
+    args = make_argparser().parse_args(args)
+
+    if args.command == 'status':
+        history = IssueHistory()
+        logging.info(history.format_status())
+        history.close()
+        return
+
+    if args.command == 'digest':
+        archive = digest_archive()
+        if args.list:
+            sys.stdout.write(archive.format_index() + '\n')
+            return
+        res = archive.get(args.time)
+        if res is None:
+            logging.error('no archived digest at or before %s', args.time)
+            return
+        sys.stdout.write(res[1] + '\n')
+        return
+
+    # the repo cache and the checks depending on it query makepkg when they
+    # are imported, which the status and digest commands above do without
+    # pylint: disable=import-outside-toplevel
+    from parabola_repolint.repocache import RepoCache
+    from parabola_repolint.daemon import Daemon
+    from parabola_repolint.memory import start_memory_report
+
     cache = RepoCache()
     linter = Linter(cache)
+    if args.checks is None:
+        args.checks = set(map(str, linter.checks))
+
+    if args.command == 'index':
+        cache.update_repos(args.noupdate, args.ignore_cache)
+        cache.export_index(args.file)
+        return
 
-    args = make_argparser(linter).parse_args(args)
+    if args.command == 'merge':
+        linter.merge_shards(args.files)
+        publish(linter, cache, args)
+        return
 
     diff = args.checks.union(args.skip_checks).difference(map(str, linter.checks))
     if diff:
         logging.warning("unrecognized linter checks: %s", ', '.join(diff))
 
+    if args.shard is not None and args.index is None:
+        logging.error('--shard requires an --index shared by all shards')
+        return
+
     checks = args.checks.intersection(map(str, linter.checks)).difference(args.skip_checks)
+    tracer = start_trace() if args.trace else None
+    profiler = start_profile(args.profile, args.profile_top) if args.profile else None
+    memory = start_memory_report() if args.memory_report else None
+
+    if args.command == 'daemon':
+        def publish_run():
+            ''' publish the results of a daemon run, and its trace and profiles '''
+            publish(linter, cache, args)
+            if tracer is not None:
+                tracer.write(args.trace)
+                tracer.clear()
+            if profiler is not None:
+                profiler.write()
+                profiler.clear()
+            if memory is not None:
+                write_memory_report(memory, linter, cache)
+                memory.clear()
+
+        cache.load_repos(args.noupdate, args.ignore_cache)
+        linter.enable_incremental(os.path.join(cache.cache_dir, 'incremental.json'))
+        daemon = Daemon(cache, linter, checks, publish_run, jobs=args.jobs, settle=args.settle)
+        daemon.run()
+        return
+
     linter.load_checks(checks)
-    cache.load_repos(args.noupdate, args.ignore_cache)
-    linter.run_checks()
+    cache.load_repos(args.noupdate, args.ignore_cache, args.shard, args.index)
+    if args.incremental:
+        linter.enable_incremental(os.path.join(cache.cache_dir, 'incremental.json'))
+    linter.run_checks(args.jobs)
+
+    if args.shard is not None:
+        output = args.shard_output
+        if output is None:
+            output = 'repolint-shard-%i-of-%i.json' % args.shard
+        linter.write_shard(output, args.shard)
+        write_metrics(linter, cache)
+    else:
+        publish(linter, cache, args)
+
+    if tracer is not None:
+        tracer.write(args.trace)
+    if profiler is not None:
+        profiler.write()
+    if memory is not None:
+        write_memory_report(memory, linter, cache)
+
+
+def publish(linter, cache, args):
+    ''' record, fix and publish the linter results '''
+    history = IssueHistory()
+    linter.record_history(history)
+    history.close()
 
-    res = linter.format()
+    res, digest = write_reports(linter, args)
     logging.info(res)
 
     if CONFIG.fixhooks.enabled:
         fixer = Fixer(cache)
         fixer.run_fixes(linter.triggered_checks)
+        if CONFIG.notify.logfile_dest:
+            filename = 'repolint-fixhooks-%s.json' % linter.end_time.strftime("%Y%m%d_%H%M")
+            write_sidecar(filename, {c: s.to_dict() for c, s in fixer.stats.items()})
 
+    timeouts = CONFIG.notify.get('timeouts', None) or {}
+    dispatcher = Dispatcher(
+        timeout=CONFIG.notify.get('timeout', 300),
+        retries=CONFIG.notify.get('retries', 2),
+        backoff=CONFIG.notify.get('backoff', 1.0),
+    )
     if CONFIG.notify.etherpad_url:
-        etherpad_replace(res)
+        dispatcher.add('etherpad', etherpad_replace, res, timeout=timeouts.get('etherpad'))
     if CONFIG.notify.smtp_host:
         subject = 'repolint digest at %s :: %i issues' % (linter.end_time, linter.total_issues)
-        send_mail(subject, res)
+        dispatcher.add('mail', send_mail, subject, res, timeout=timeouts.get('mail'))
+    if CONFIG.notify.logfile_dest:
+        dispatcher.add('archive', archive_digest, linter.end_time, digest,
+                       timeout=timeouts.get('archive'))
+    results = dispatcher.run()
+
     if CONFIG.notify.logfile_dest:
-        filename = 'repolint-digest-%s.log' % linter.end_time.strftime("%Y%m%d_%H%M")
-        write_log(filename, res)
+        report = linter.timing_report()
+        report['notify'] = {n: r.to_dict() for n, r in results.items()}
+        filename = 'repolint-timing-%s.json' % linter.end_time.strftime("%Y%m%d_%H%M")
+        write_sidecar(filename, report)
 
+    write_metrics(linter, cache)
     logging.warning(linter.short_format())
 
 
+def write_memory_report(memory, linter, cache):
+    ''' log the memory report of the run, and write it next to the logfiles '''
+    report = memory.report(cache)
+    text = memory.format(report)
+    logging.info(text)
+
+    if CONFIG.notify.logfile_dest:
+        stamp = linter.end_time.strftime("%Y%m%d_%H%M")
+        write_sidecar('repolint-memory-%s.json' % stamp, report)
+        with open_sidecar('repolint-memory-%s.txt' % stamp) as outfile:
+            outfile.write(text)
+
+
+def write_metrics(linter, cache):
+    ''' export the metrics of the run for the prometheus textfile collector, if configured '''
+    path = CONFIG.notify.get('metrics_textfile', None)
+    if not path:
+        return
+
+    record_run(linter, cache)
+    METRICS.write_textfile(path)
+
+
+def write_reports(linter, args):
+    '''
+    stream the linter issues to the digest, the delta digest and the ndjson
+    outputs in a single pass, and produce the digest to publish and the full
+    digest to archive
+    '''
+    digest = io.StringIO()
+    sinks = [TextSink(digest)]
+    delta = None
+    if args.delta_digest:
+        delta = io.StringIO()
+        sinks.append(DeltaSink(delta))
+
+    with contextlib.ExitStack() as stack:
+        if CONFIG.notify.logfile_dest:
+            stamp = linter.end_time.strftime("%Y%m%d_%H%M")
+            outfile = stack.enter_context(open_sidecar('repolint-issues-%s.ndjson' % stamp))
+            sinks.append(NdjsonSink(outfile))
+        if args.ndjson:
+            outfile = stack.enter_context(open(args.ndjson, 'w'))
+            sinks.append(NdjsonSink(outfile))
+
+        linter.write_report(sinks)
+
+    digest = digest.getvalue()
+    if delta is not None:
+        return delta.getvalue(), digest
+    return digest, digest
+
+
 def main(args=None):
     ''' a catchall exception handler '''
     logging.config.dictConfig(CONFIG.logging)
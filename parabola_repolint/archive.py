@@ -0,0 +1,169 @@
+'''
+an archive of past digests, stored as periodic full snapshots and compact
+line-based deltas between consecutive digests
+'''
+
+import os
+import json
+import lzma
+import bisect
+import difflib
+import logging
+import datetime
+
+
+# the format of the timestamps identifying archived digests
+TIME_FORMAT = '%Y%m%d_%H%M'
+
+
+def make_delta(old, new):
+    '''
+    produce the operations transforming the lines old into the lines new: a
+    positive int copies that many lines, a negative int skips that many, and
+    a list inserts its lines
+    '''
+    res = []
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            res.append(i2 - i1)
+            continue
+        if i2 > i1:
+            res.append(i1 - i2)
+        if j2 > j1:
+            res.append(new[j1:j2])
+    return res
+
+
+def apply_delta(old, delta):
+    ''' produce the lines of a digest from the lines of its base and a delta '''
+    res = []
+    pos = 0
+    for op in delta:
+        if isinstance(op, list):
+            res.extend(op)
+        elif op > 0:
+            res.extend(old[pos:pos + op])
+            pos += op
+        else:
+            pos -= op
+    return res
+
+
+class DigestArchive():
+    '''
+    the archived digests, with an index by timestamp. every snapshot_interval
+    digests a full snapshot is stored, the others are stored as deltas to the
+    previous digest. digests older than retention_days are removed, together
+    with the snapshot chain they belong to.
+    '''
+
+    def __init__(self, path, snapshot_interval=24, retention_days=None):
+        ''' constructor '''
+        self._path = path
+        self._snapshot_interval = max(1, snapshot_interval)
+        self._retention_days = retention_days
+        self._index = []
+
+        index_file = os.path.join(path, 'index.json')
+        if os.path.isfile(index_file):
+            with open(index_file, 'r') as infile:
+                self._index = json.loads(infile.read())
+
+    @property
+    def index(self):
+        ''' produce the archived entries, oldest first '''
+        return self._index
+
+    def _read(self, entry):
+        ''' produce the stored data of an index entry '''
+        with lzma.open(os.path.join(self._path, entry['file']), 'rt') as infile:
+            return json.loads(infile.read())
+
+    def _write(self, filename, data):
+        ''' store the data of an index entry '''
+        os.makedirs(self._path, exist_ok=True)
+        with lzma.open(os.path.join(self._path, filename), 'wt') as outfile:
+            outfile.write(json.dumps(data))
+
+    def _save_index(self):
+        ''' persist the index '''
+        index_file = os.path.join(self._path, 'index.json')
+        with open(index_file + '.tmp', 'w') as outfile:
+            outfile.write(json.dumps(self._index, indent=4))
+        os.replace(index_file + '.tmp', index_file)
+
+    def _lines(self, pos):
+        ''' reconstruct the lines of the digest at the given index position '''
+        start = pos
+        while self._index[start]['kind'] != 'snapshot':
+            start -= 1
+
+        lines = self._read(self._index[start])
+        for entry in self._index[start + 1:pos + 1]:
+            lines = apply_delta(lines, self._read(entry))
+        return lines
+
+    def add(self, time, digest):
+        ''' archive the digest of a run at the given time '''
+        stamp = time.strftime(TIME_FORMAT)
+        lines = digest.split('\n')
+
+        if self._index and self._index[-1]['time'] == stamp:
+            self._index.pop()
+
+        since_snapshot = 0
+        for entry in reversed(self._index):
+            if entry['kind'] == 'snapshot':
+                break
+            since_snapshot += 1
+
+        if not self._index or since_snapshot + 1 >= self._snapshot_interval:
+            entry = {'time': stamp, 'kind': 'snapshot', 'file': '%s.snapshot.json.xz' % stamp}
+            self._write(entry['file'], lines)
+        else:
+            base = self._lines(len(self._index) - 1)
+            entry = {'time': stamp, 'kind': 'delta', 'file': '%s.delta.json.xz' % stamp}
+            self._write(entry['file'], make_delta(base, lines))
+
+        self._index.append(entry)
+        self._expire(time)
+        self._save_index()
+        logging.info('archived digest %s as %s', stamp, entry['kind'])
+
+    def _expire(self, now):
+        ''' remove the snapshot chains that end before the retention period '''
+        if self._retention_days is None:
+            return
+
+        cutoff = (now - datetime.timedelta(days=self._retention_days)).strftime(TIME_FORMAT)
+        snapshots = [i for i, e in enumerate(self._index) if e['kind'] == 'snapshot']
+        keep = 0
+        for end in snapshots[1:]:
+            if self._index[end - 1]['time'] >= cutoff:
+                break
+            keep = end
+
+        for entry in self._index[:keep]:
+            try:
+                os.remove(os.path.join(self._path, entry['file']))
+            except FileNotFoundError:
+                pass
+        self._index = self._index[keep:]
+
+    def get(self, stamp=None):
+        '''
+        reconstruct the latest archived digest at or before the given
+        timestamp, or the latest one. produces (timestamp, digest), or None.
+        '''
+        times = [e['time'] for e in self._index]
+        pos = len(times) - 1 if stamp is None else bisect.bisect_right(times, stamp) - 1
+        if pos < 0:
+            return None
+        return times[pos], '\n'.join(self._lines(pos))
+
+    def format_index(self):
+        ''' produce a short formatted listing of the archived digests '''
+        if not self._index:
+            return 'no archived digests'
+        return '\n'.join('%s  %s' % (e['time'], e['kind']) for e in self._index)
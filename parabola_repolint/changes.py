@@ -0,0 +1,107 @@
+'''
+the changes made to the package mirror by an update, as itemized by rsync
+'''
+
+import os
+import json
+import logging
+
+
+# the kinds of changes recorded per file
+KINDS = ['added', 'updated', 'deleted']
+
+
+class ChangeFeed():
+    ''' the added, updated and deleted files of the mirror, by repo and arch '''
+
+    def __init__(self, data=None):
+        ''' constructor '''
+        self._data = data if data is not None else {}
+        self._complete = True
+
+    @classmethod
+    def parse(cls, output, prefix=''):
+        '''
+        produce the changes listed in the output of rsync --itemize-changes,
+        for the files of the form <repo>/os/<arch>/<filename>. the prefix is
+        prepended to the listed paths, for transfers of a single repo.
+        '''
+        res = cls()
+        for line in output.splitlines():
+            if line.startswith('*deleting'):
+                kind = 'deleted'
+                path = line[len('*deleting'):].strip()
+            elif len(line) > 12 and line[11] == ' ':
+                flags, path = line[:11], line[12:].strip()
+                if flags[0] not in '<>c' or flags[1] not in 'fL':
+                    continue
+                kind = 'added' if flags[2:].startswith('+++') else 'updated'
+            else:
+                continue
+
+            path = prefix + path.split(' -> ', 1)[0]
+
+            parts = path.split('/')
+            if len(parts) != 4 or parts[1] != 'os' or not parts[3]:
+                continue
+            res.add(parts[0], parts[2], kind, parts[3])
+        return res
+
+    @classmethod
+    def load(cls, path):
+        ''' produce the changes stored in a file, or no changes if there is none '''
+        if not os.path.isfile(path):
+            return cls()
+        try:
+            with open(path, 'r') as infile:
+                return cls(json.loads(infile.read()))
+        except ValueError:
+            logging.exception('discarding corrupt change feed %s', path)
+            return cls()
+
+    def save(self, path):
+        ''' persist the changes to a file '''
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as outfile:
+            outfile.write(json.dumps(self._data, indent=4, sort_keys=True))
+        os.replace(tmp, path)
+
+    def add(self, repo, arch, kind, filename):
+        ''' record a single changed file '''
+        changes = self._data.setdefault(repo, {}).setdefault(arch, {k: [] for k in KINDS})
+        for other in KINDS:
+            if filename in changes[other]:
+                changes[other].remove(filename)
+        changes[kind].append(filename)
+
+    def merge(self, other):
+        ''' add the later changes of another feed to this one '''
+        if not other.complete:
+            self.mark_incomplete()
+        for repo, arches in other.data.items():
+            for arch, changes in arches.items():
+                for kind in KINDS:
+                    for filename in changes[kind]:
+                        self.add(repo, arch, kind, filename)
+
+    def mark_incomplete(self):
+        ''' record that files may have changed without being listed '''
+        self._complete = False
+
+    @property
+    def complete(self):
+        ''' indicate whether every changed file is listed '''
+        return self._complete
+
+    @property
+    def data(self):
+        ''' produce the changes by repo, arch and kind '''
+        return self._data
+
+    def for_repo(self, repo):
+        ''' produce the changes of a repo by arch and kind '''
+        return self._data.get(repo, {})
+
+    def __len__(self):
+        ''' produce the number of changed files '''
+        return sum(len(c[k]) for a in self._data.values() for c in a.values() for k in KINDS)
@@ -0,0 +1,42 @@
+'''
+timed execution of external commands with configurable timeouts
+'''
+
+import os
+import time
+
+import sh
+
+from parabola_repolint.config import CONFIG
+from parabola_repolint.timing import record_subprocess
+
+
+class CommandTimeout(Exception):
+    ''' raised when an external command exceeds its configured timeout '''
+
+
+def command_timeout(name):
+    ''' produce the configured timeout in seconds of a command, or None '''
+    return CONFIG.get('timeouts', {}).get(name, None)
+
+
+def _children_cpu():
+    ''' produce the cpu time consumed by terminated child processes '''
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def run(name, obj, cmd, *args, **kwargs):
+    '''
+    run an sh command on behalf of an object with the timeout configured for
+    name, and record its duration
+    '''
+    timeout = command_timeout(name)
+    wall = time.perf_counter()
+    cpu = _children_cpu()
+    try:
+        return cmd(*args, _timeout=timeout, **kwargs)
+    except sh.TimeoutException:
+        raise CommandTimeout('%s timed out after %is' % (name, timeout))
+    finally:
+        record_subprocess(name, obj, time.perf_counter() - wall, _children_cpu() - cpu)
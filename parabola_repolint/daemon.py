@@ -0,0 +1,147 @@
+'''
+a long-running linter that watches the mirror and abslibre with inotify, and
+relints incrementally whenever they change
+'''
+
+import os
+import time
+import logging
+
+from inotify_simple import INotify, flags
+
+from parabola_repolint.repocache import ARCH_REPOS, PKGFILE_SIDECARS
+from parabola_repolint.changes import ChangeFeed
+
+
+# the events signalling a changed file in a watched directory
+WATCH_FLAGS = flags.CREATE | flags.DELETE | flags.MOVED_TO | flags.MOVED_FROM | flags.CLOSE_WRITE
+
+# the files in the abslibre git directory that change when the checkout is updated
+ABSLIBRE_TRIGGERS = {'HEAD', 'ORIG_HEAD', 'index'}
+
+# the target of the watched directories of the shared package pool
+POOL = 'pool'
+
+
+class Daemon():
+    '''
+    keep the repo cache and the linter in memory, and reload the affected repos,
+    rerun the checks incrementally and publish the results after each change
+    '''
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, cache, linter, checks, publish, jobs=1, settle=5.0):
+        ''' constructor. publish is called after every run of the checks. '''
+        self._cache = cache
+        self._linter = linter
+        self._checks = checks
+        self._publish = publish
+        self._jobs = jobs
+        self._settle = settle
+
+        self._inotify = INotify()
+        self._watches = {}
+
+    def _watch(self, path, target):
+        ''' watch a directory, with the given target for its events '''
+        if os.path.isdir(path):
+            self._watches[self._inotify.add_watch(path, WATCH_FLAGS)] = target
+
+    def _add_watches(self):
+        '''
+        watch the arch directories of all repos, the package pool their
+        symlinks point to, and the abslibre checkout
+        '''
+        for repo in self._cache.repo_names:
+            arches_dir = os.path.join(self._cache.pkgfiles_dir, repo, 'os')
+            if not os.path.isdir(arches_dir):
+                continue
+            for arch in os.scandir(arches_dir):
+                self._watch(arch.path, (repo, arch.name))
+
+        pool_dir = os.path.join(self._cache.pkgfiles_dir, 'pool')
+        if os.path.isdir(pool_dir):
+            for pool in os.scandir(pool_dir):
+                self._watch(pool.path, POOL)
+
+        self._watch(os.path.join(self._cache.abslibre_dir, '.git'), None)
+        logging.info('watching %i directories', len(self._watches))
+
+    def _collect(self, events, changes, repos):
+        ''' record the changed files and the affected repos of the given events '''
+        for event in events:
+            if event.mask & flags.Q_OVERFLOW:
+                logging.warning('inotify queue overflow, reloading all repos')
+                repos.update(self._cache.repo_names)
+                changes.mark_incomplete()
+                continue
+
+            target = self._watches.get(event.wd, None)
+            if target is None:
+                if event.name in ABSLIBRE_TRIGGERS:
+                    repos.update(r for r in self._cache.repo_names if r not in ARCH_REPOS)
+                continue
+
+            if event.name.startswith('.') or event.name.endswith(tuple(PKGFILE_SIDECARS)):
+                continue
+
+            deleted = event.mask & (flags.DELETE | flags.MOVED_FROM)
+            if target == POOL:
+                # a pool file changes in place, behind the unchanged symlinks of the repos
+                targets = self._pool_links(event.name)
+            else:
+                targets = [target]
+            for repo, arch in targets:
+                changes.add(repo, arch, 'deleted' if deleted else 'updated', event.name)
+                repos.add(repo)
+
+    def _pool_links(self, filename):
+        ''' produce the (repo, arch) of the arch directories linking to a pool file '''
+        res = []
+        for target in self._watches.values():
+            if isinstance(target, tuple):
+                repo, arch = target
+                link = os.path.join(self._cache.pkgfiles_dir, repo, 'os', arch, filename)
+                if os.path.lexists(link):
+                    res.append(target)
+        return res
+
+    def _wait_for_changes(self):
+        '''
+        block until files change, then gather further events until none arrive
+        for settle seconds. produces the change feed and the affected repos.
+        '''
+        changes = ChangeFeed()
+        repos = set()
+
+        self._collect(self._inotify.read(), changes, repos)
+        while True:
+            events = self._inotify.read(timeout=int(self._settle * 1000))
+            if not events:
+                break
+            self._collect(events, changes, repos)
+
+        return changes, repos
+
+    def _run_checks(self):
+        ''' run the checks incrementally and publish the results '''
+        self._linter.load_checks(self._checks)
+        self._linter.run_checks(self._jobs)
+        self._publish()
+
+    def run(self):
+        ''' lint and publish once, then again after every change, forever '''
+        self._add_watches()
+        self._run_checks()
+
+        while True:
+            changes, repos = self._wait_for_changes()
+            if not repos:
+                continue
+
+            start = time.perf_counter()
+            names = [r for r in self._cache.repo_names if r in repos]
+            logging.info('reloading %s after %i changed files', ', '.join(names), len(changes))
+            self._cache.reload_repos(names, changes)
+            self._run_checks()
+            logging.info('relinted in %.1fs', time.perf_counter() - start)
@@ -0,0 +1,113 @@
+'''
+concurrent, fault-isolated delivery of the linter results to all configured
+notification sinks
+'''
+
+import time
+import logging
+import threading
+
+
+class PermanentError(Exception):
+    ''' raised by notification sinks for failures that retrying cannot fix '''
+
+
+class SinkResult():
+    ''' the outcome of delivering to a single notification sink '''
+
+    def __init__(self, name):
+        ''' constructor '''
+        self.name = name
+        self.success = False
+        self.attempts = 0
+        self.latency = None
+        self.error = None
+
+    def to_dict(self):
+        ''' produce a machine-readable representation of the result '''
+        return {
+            'success': self.success,
+            'attempts': self.attempts,
+            'latency': self.latency,
+            'error': self.error,
+        }
+
+    def __repr__(self):
+        ''' produce a short human-readable summary '''
+        if self.success:
+            return 'delivered in %.2fs (%i attempts)' % (self.latency, self.attempts)
+        return 'failed after %.2fs (%i attempts): %s' % (self.latency, self.attempts, self.error)
+
+
+class Dispatcher():
+    '''
+    run notification sinks concurrently, each in its own thread, retried with
+    exponential backoff until it succeeds or its timeout expires. a failing or
+    hanging sink never delays or aborts the others. this is the only layer
+    retrying a sink, a retry calls the whole sink again.
+    '''
+
+    def __init__(self, timeout=300, retries=2, backoff=1.0):
+        ''' constructor. timeout is the default timeout of a sink in seconds '''
+        self._timeout = timeout
+        self._retries = retries
+        self._backoff = backoff
+        self._sinks = []
+
+    def add(self, name, func, *args, timeout=None):
+        ''' register a sink to deliver to, with an optional timeout of its own '''
+        self._sinks.append((name, func, args, timeout or self._timeout))
+
+    def _deliver(self, result, deadline, func, args):
+        ''' call a sink until it succeeds, its retries are exhausted, or time runs out '''
+        start = time.perf_counter()
+        while True:
+            result.attempts += 1
+            try:
+                func(*args)
+                result.success = True
+                result.error = None
+                break
+            except PermanentError as e:
+                result.error = '%s: %s' % (type(e).__name__, e)
+                logging.error('notification sink %s failed: %s', result.name, result.error)
+                break
+            except Exception as e: # pylint: disable=broad-except
+                result.error = '%s: %s' % (type(e).__name__, e)
+                logging.warning('notification sink %s failed: %s', result.name, result.error)
+
+            delay = self._backoff * 2 ** (result.attempts - 1)
+            if result.attempts > self._retries or time.monotonic() + delay > deadline:
+                break
+            time.sleep(delay)
+        result.latency = time.perf_counter() - start
+
+    def run(self):
+        ''' deliver to all registered sinks, and produce their results by name '''
+        start = time.perf_counter()
+
+        threads = []
+        results = {}
+        for name, func, args, timeout in self._sinks:
+            result = SinkResult(name)
+            results[name] = result
+            deadline = time.monotonic() + timeout
+            thread = threading.Thread(
+                target=self._deliver,
+                args=(result, deadline, func, args),
+                name='notify-%s' % name,
+                daemon=True,
+            )
+            thread.start()
+            threads.append((thread, result, deadline, timeout))
+
+        for thread, result, deadline, timeout in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+            if thread.is_alive():
+                result.latency = time.perf_counter() - start
+                result.error = 'timed out after %ss' % timeout
+
+        for name, result in sorted(results.items()):
+            logging.info('notification sink %s: %s', name, result)
+
+        return results
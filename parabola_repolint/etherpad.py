@@ -0,0 +1,79 @@
+'''
+a minimal client for the etherpad http api
+'''
+
+import json
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from parabola_repolint.dispatch import PermanentError
+
+
+# the api version used for all calls, the first one to support appendText
+API_VERSION = '1.2.13'
+
+
+class EtherpadError(Exception):
+    ''' raised when the etherpad api is unreachable, or fails to answer in time '''
+
+
+class EtherpadApiError(EtherpadError, PermanentError):
+    ''' raised when the etherpad api rejects a call, or the client is not configured '''
+
+
+def split_pad_url(url):
+    ''' split a pad url of the form <base>/p/<padID> into base and pad id '''
+    base, sep, pad_id = url.rstrip('/').rpartition('/p/')
+    if not sep or not pad_id:
+        raise ValueError('not an etherpad pad url: %s' % url)
+    return base, urllib.parse.unquote(pad_id)
+
+
+class EtherpadClient():
+    '''
+    call the etherpad api with a timeout. failed calls are not retried here,
+    the caller retries the whole operation, see Dispatcher.
+    '''
+
+    def __init__(self, base_url, apikey, timeout=10):
+        ''' constructor '''
+        if not apikey:
+            raise EtherpadApiError('no etherpad api key configured, set notify.etherpad_apikey')
+        self._base_url = base_url.rstrip('/')
+        self._apikey = apikey
+        self._timeout = timeout
+
+    def call(self, method, **params):
+        ''' call an api method and produce its data '''
+        url = '%s/api/%s/%s' % (self._base_url, API_VERSION, method)
+        data = urllib.parse.urlencode(dict(params, apikey=self._apikey)).encode()
+
+        try:
+            with urllib.request.urlopen(url, data, timeout=self._timeout) as response:
+                res = json.loads(response.read().decode())
+        except urllib.error.HTTPError as e:
+            if e.code < 500:
+                raise EtherpadApiError('%s failed: %s' % (method, e))
+            raise EtherpadError('%s failed: %s' % (method, e))
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise EtherpadError('%s failed: %s' % (method, e))
+
+        if res.get('code', None) != 0:
+            raise EtherpadApiError('%s failed: %s' % (method, res.get('message', res)))
+        return res.get('data', None)
+
+    def set_text(self, pad_id, text, chunk_size=None):
+        '''
+        replace the text of a pad. large texts are uploaded in chunks of at
+        most chunk_size characters, the first with setText, and the remaining
+        ones with appendText. appendText is not idempotent, so after a failed
+        chunk the whole text must be set again, starting with setText.
+        '''
+        if not chunk_size:
+            chunk_size = max(len(text), 1)
+
+        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)] or ['']
+        self.call('setText', padID=pad_id, text=chunks[0])
+        for chunk in chunks[1:]:
+            self.call('appendText', padID=pad_id, text=chunk)
@@ -0,0 +1,220 @@
+'''
+a compact, memory-mapped inverted index from file paths to the packages of
+all repos of an architecture, built from the <repo>.files databases
+
+paths are kept as 64 bit hashes only. the index file holds, in this order:
+
+- a header: magic, number of paths, number of packages, number of buckets
+- the start of every hash bucket in the sorted arrays, by the top hash bits
+- the sorted path hashes
+- the start of every package in the forward array
+- the forward array: the positions of the paths of each package in the sorted arrays
+- the package id of every sorted path hash
+
+the package names are kept in a json file next to the index.
+'''
+
+import os
+import json
+import mmap
+import array
+import bisect
+import struct
+import hashlib
+import logging
+import tarfile
+
+from parabola_repolint.metrics import record_cache
+
+
+MAGIC = b'RLFIDX01'
+HEADER = struct.Struct('=8sQQQ')
+
+# the number of top hash bits selecting the bucket of a path
+BUCKET_BITS = 12
+
+
+def _path_hash(path):
+    ''' produce the 64 bit hash of a path, given as bytes '''
+    return int.from_bytes(hashlib.blake2b(path, digest_size=8).digest(), 'little')
+
+
+def _pkgname(dirname):
+    ''' produce the package name of a <pkgname>-<pkgver>-<pkgrel> database entry '''
+    return dirname.rsplit('-', 2)[0]
+
+
+def _read_files_db(path):
+    '''
+    produce the package names and the file lists, as lists of path hashes,
+    of the entries in a <repo>.files database. directories are left out, as
+    they are shared between packages.
+    '''
+    with tarfile.open(path, 'r|*') as tar:
+        for member in tar:
+            dirname, basename = os.path.split(member.name)
+            if basename != 'files' or not member.isfile():
+                continue
+
+            hashes = array.array('Q')
+            for line in tar.extractfile(member).read().split(b'\n'):
+                if line and not line.endswith(b'/') and line != b'%FILES%':
+                    hashes.append(_path_hash(line))
+            yield _pkgname(dirname), hashes
+
+
+class FileIndex():
+    ''' the inverted file path index of an architecture, mapped from disk '''
+
+    def __init__(self, path):
+        ''' constructor, mapping an index written by build '''
+        with open(path + '.json', 'r') as infile:
+            meta = json.loads(infile.read())
+        self._sources = meta['sources']
+        self._packages = [tuple(p) for p in meta['packages']]
+        self._ids = {p: i for i, p in enumerate(self._packages)}
+
+        with open(path, 'rb') as infile:
+            self._mmap = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, npaths, npkgs, nbuckets = HEADER.unpack_from(view)
+        if magic != MAGIC or npkgs != len(self._packages):
+            raise ValueError('%s: not a valid file index' % path)
+
+        def take(offset, typecode, count):
+            ''' produce a typed view of count items at offset, and the offset after them '''
+            end = offset + array.array(typecode).itemsize * count
+            return view[offset:end].cast(typecode), end
+
+        offset = HEADER.size
+        self._buckets, offset = take(offset, 'Q', nbuckets + 1)
+        self._hashes, offset = take(offset, 'Q', npaths)
+        self._offsets, offset = take(offset, 'Q', npkgs + 1)
+        self._forward, offset = take(offset, 'I', npaths)
+        self._pkgids, offset = take(offset, 'I', npaths)
+
+    @property
+    def sources(self):
+        ''' produce the modification times of the .files databases indexed, by repo '''
+        return self._sources
+
+    @property
+    def packages(self):
+        ''' produce the (repo, pkgname) of the packages in the index '''
+        return self._packages
+
+    def __len__(self):
+        ''' produce the number of indexed paths '''
+        return len(self._hashes)
+
+    def lookup(self, path):
+        ''' produce the (repo, pkgname) of the packages containing a path '''
+        key = _path_hash(path.encode())
+        bucket = key >> (64 - BUCKET_BITS)
+        lo, hi = self._buckets[bucket], self._buckets[bucket + 1]
+
+        res = []
+        pos = bisect.bisect_left(self._hashes, key, lo, hi)
+        while pos < hi and self._hashes[pos] == key:
+            res.append(self._packages[self._pkgids[pos]])
+            pos += 1
+        return res
+
+    def overlaps(self, repo, pkgname):
+        '''
+        produce the number of paths the package shares with each other
+        package, by (repo, pkgname) of the other package
+        '''
+        pkgid = self._ids.get((repo, pkgname), None)
+        if pkgid is None:
+            return {}
+
+        hashes = self._hashes
+        pkgids = self._pkgids
+        counts = {}
+        for pos in self._forward[self._offsets[pkgid]:self._offsets[pkgid + 1]]:
+            key = hashes[pos]
+            other = pos - 1
+            while other >= 0 and hashes[other] == key:
+                counts[pkgids[other]] = counts.get(pkgids[other], 0) + 1
+                other -= 1
+            other = pos + 1
+            while other < len(hashes) and hashes[other] == key:
+                counts[pkgids[other]] = counts.get(pkgids[other], 0) + 1
+                other += 1
+
+        return {self._packages[i]: c for i, c in counts.items() if i != pkgid}
+
+    @staticmethod
+    def build(path, sources):
+        '''
+        write the index of the given .files databases, by repo. the paths
+        are hashed into buckets while the databases are read, and sorted one
+        bucket at a time.
+        '''
+        nbuckets = 1 << BUCKET_BITS
+        bucket_hashes = [array.array('Q') for _ in range(nbuckets)]
+        bucket_paths = [array.array('I') for _ in range(nbuckets)]
+
+        packages = []
+        pkg_of_path = array.array('I')
+        offsets = array.array('Q', [0])
+        for repo, files_db in sorted(sources.items()):
+            try:
+                for pkgname, hashes in _read_files_db(files_db):
+                    pkgid = len(packages)
+                    packages.append((repo, pkgname))
+                    for key in hashes:
+                        bucket = key >> (64 - BUCKET_BITS)
+                        bucket_hashes[bucket].append(key)
+                        bucket_paths[bucket].append(len(pkg_of_path))
+                        pkg_of_path.append(pkgid)
+                    offsets.append(len(pkg_of_path))
+            except (OSError, EOFError, tarfile.TarError) as e:
+                logging.error('%s: %s, not indexing its files', files_db, e)
+
+        npaths = len(pkg_of_path)
+        buckets = array.array('Q', [0])
+        hashes = array.array('Q')
+        pkgids = array.array('I')
+        forward = array.array('I', [0]) * npaths
+        for bucket in range(nbuckets):
+            keys, paths = bucket_hashes[bucket], bucket_paths[bucket]
+            for i in sorted(range(len(keys)), key=keys.__getitem__):
+                forward[paths[i]] = len(hashes)
+                hashes.append(keys[i])
+                pkgids.append(pkg_of_path[paths[i]])
+            buckets.append(len(hashes))
+            bucket_hashes[bucket] = bucket_paths[bucket] = None
+
+        tmp = '%s.%i.tmp' % (path, os.getpid())
+        with open(tmp, 'wb') as out:
+            out.write(HEADER.pack(MAGIC, npaths, len(packages), nbuckets))
+            for data in [buckets, hashes, offsets, forward, pkgids]:
+                data.tofile(out)
+        os.replace(tmp, path)
+
+        mtimes = {r: os.path.getmtime(f) for r, f in sources.items()}
+        with open(tmp, 'w') as out:
+            out.write(json.dumps({'sources': mtimes, 'packages': packages}))
+        os.replace(tmp, path + '.json')
+
+    @classmethod
+    def load(cls, path, sources):
+        '''
+        produce the index of the given .files databases, by repo, rebuilding
+        it if any of them changed since it was written
+        '''
+        mtimes = {r: os.path.getmtime(f) for r, f in sources.items()}
+        try:
+            index = cls(path)
+            if index.sources == mtimes:
+                record_cache('fileindex', True)
+                return index
+        except (OSError, ValueError, KeyError) as e:
+            logging.debug('%s: %s, rebuilding', path, e)
+
+        record_cache('fileindex', False)
+        cls.build(path, sources)
+        return cls(path)
@@ -4,9 +4,54 @@ this module provides the linter issue autofixer
 
 import os
 import sh
+import time
 import logging
+import threading
+import concurrent.futures
 
 from parabola_repolint.config import CONFIG
+from parabola_repolint.commands import command_timeout
+
+
+# the name of the optional hook of a check that receives all of its issues
+BATCH_HOOK = 'batch'
+
+
+class FixhookStats():
+    ''' accumulate the run times and failures of the fixhooks of a check '''
+
+    def __init__(self):
+        ''' constructor '''
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.failures = 0
+        self.wall = 0.0
+        self.slowest = (0.0, None)
+
+    def record(self, fixbase, wall, failed):
+        ''' record a single fixhook invocation '''
+        with self._lock:
+            self.runs += 1
+            self.failures += int(failed)
+            self.wall += wall
+            if wall > self.slowest[0]:
+                self.slowest = (wall, fixbase)
+
+    def to_dict(self):
+        ''' produce a machine-readable representation of the statistics '''
+        return {
+            'runs': self.runs,
+            'failures': self.failures,
+            'wall': self.wall,
+            'slowest': {'fixbase': self.slowest[1], 'wall': self.slowest[0]},
+        }
+
+    def __repr__(self):
+        ''' produce a short human-readable summary '''
+        res = '%i runs, %i failed, %.2fs wall' % (self.runs, self.failures, self.wall)
+        if self.slowest[1] is not None:
+            res += ', slowest: %s (%.2fs)' % (self.slowest[1], self.slowest[0])
+        return res
 
 
 class Fixer():
@@ -15,23 +60,146 @@ class Fixer():
     def __init__(self, repo_cache):
         ''' constructor '''
         self._cache = repo_cache
+        self._stats = {}
+
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    @property
+    def stats(self):
+        ''' produce the fixhook statistics by check name '''
+        return self._stats
 
     def run_fixes(self, checks):
-        ''' run the fixes for the given issues '''
-        for check in checks:
-            base_path = os.path.join(CONFIG.fixhooks.scriptroot, str(check))
-            if not os.path.exists(base_path):
-                continue
-
-            for issue in check.issues:
-                fixbase = check.fixhook_base(issue)
-                fixargs = check.fixhook_args(issue)
-
-                path = os.path.join(base_path, fixbase)
-                if not os.path.exists(path):
+        '''
+        run the fixes for the given issues. checks with a batch hook get all
+        their issues on its stdin in a single invocation, the per-package hooks
+        of the other checks run in a pool of CONFIG.fixhooks.jobs workers.
+        '''
+        jobs = CONFIG.fixhooks.get('jobs', 1) or 1
+
+        with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+            futures = []
+            for check in checks:
+                base_path = os.path.join(CONFIG.fixhooks.scriptroot, str(check))
+                if not os.path.exists(base_path):
+                    continue
+
+                stats = self._stats.setdefault(str(check), FixhookStats())
+
+                batch_path = os.path.join(base_path, BATCH_HOOK)
+                if os.path.exists(batch_path):
+                    futures.append(pool.submit(self._run_batch, check, batch_path, stats))
                     continue
 
-                try:
-                    sh.bash(path, fixbase, fixargs, _cwd=CONFIG.fixhooks.abslibre)
-                except sh.ErrorReturnCode:
-                    logging.exception('%s fixhook failed for %s (%s)', check, fixbase, ', '.join(fixargs))
+                for issue in check.issues:
+                    fixbase = check.fixhook_base(issue)
+                    fixargs = check.fixhook_args(issue)
+
+                    path = os.path.join(base_path, fixbase)
+                    if not os.path.exists(path):
+                        continue
+
+                    keys = self._lock_keys(issue, fixbase)
+                    futures.append(pool.submit(self._run_hook, check, path, fixbase, fixargs,
+                                               keys, stats))
+
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+
+        for check, stats in sorted(self._stats.items()):
+            logging.info('fixhooks of %s: %s', check, stats)
+
+    def _pkgentries(self, name):
+        ''' produce the repo.db entries of a name of the form <repo>/<arch>/<pkgname> '''
+        parts = name.split('/')
+        if len(parts) != 3:
+            return []
+        repo = self._cache.repos.get(parts[0], None) or self._cache.arch_repos.get(parts[0], None)
+        if repo is None:
+            return []
+        return repo.pkgentries_cache.get(parts[1], {}).get(parts[2], [])
+
+    def _lock_keys(self, issue, fixbase):
+        '''
+        produce the PKGBUILD directories, as <repo>/<pkgbase>, the fixhook of an
+        issue works on. repo.db entries and package files are resolved to the
+        PKGBUILDs producing them, so that the hooks of the split packages of a
+        pkgbase never run at the same time. issues about anything else are
+        serialized by their fixbase.
+        '''
+        obj = issue[1] if len(issue) > 1 else None
+        name = str(obj)
+        if name.endswith('/PKGBUILD'):
+            return [os.path.dirname(name)]
+
+        pkgbuilds = getattr(obj, 'pkgbuilds', None)
+        if pkgbuilds is None and isinstance(obj, str):
+            pkgbuilds = [p for e in self._pkgentries(name) for p in getattr(e, 'pkgbuilds', [])]
+        if pkgbuilds:
+            return sorted(set(os.path.dirname(str(p)) for p in pkgbuilds))
+        return [fixbase]
+
+    def _locks_of(self, keys):
+        ''' produce the locks of the given keys, in the order they must be acquired in '''
+        with self._locks_lock:
+            for key in keys:
+                if key not in self._locks:
+                    self._locks[key] = threading.Lock()
+            return [self._locks[key] for key in sorted(set(keys))]
+
+    def _run_hook(self, check, path, fixbase, fixargs, keys, stats):
+        ''' run the fixhook of a single issue, holding the locks of its PKGBUILDs '''
+        locks = self._locks_of(keys)
+        for lock in locks:
+            lock.acquire()
+
+        failed = False
+        wall = time.perf_counter()
+        try:
+            sh.bash(path, fixbase, fixargs, _cwd=CONFIG.fixhooks.abslibre,
+                    _timeout=command_timeout('fixhook'))
+        except sh.ErrorReturnCode:
+            failed = True
+            logging.exception('%s fixhook failed for %s (%s)', check, fixbase, ', '.join(fixargs))
+        except sh.TimeoutException:
+            failed = True
+            logging.error('%s fixhook timed out for %s (%s)', check, fixbase, ', '.join(fixargs))
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+        stats.record(fixbase, time.perf_counter() - wall, failed)
+
+    def _run_batch(self, check, path, stats):
+        '''
+        run the batch hook of a check, writing one line per issue to its stdin,
+        with the fixhook base and arguments separated by tabs. the locks of all
+        affected PKGBUILDs are held while it runs.
+        '''
+        lines = []
+        keys = []
+        for issue in check.issues:
+            fixbase = check.fixhook_base(issue)
+            fixargs = check.fixhook_args(issue)
+            keys.extend(self._lock_keys(issue, fixbase))
+            lines.append('\t'.join([fixbase, *map(str, fixargs)]) + '\n')
+
+        locks = self._locks_of(keys)
+        for lock in locks:
+            lock.acquire()
+
+        failed = False
+        wall = time.perf_counter()
+        try:
+            sh.bash(path, _in=''.join(sorted(lines)), _cwd=CONFIG.fixhooks.abslibre,
+                    _timeout=command_timeout('fixhook'))
+        except sh.ErrorReturnCode:
+            failed = True
+            logging.exception('%s batch fixhook failed', check)
+        except sh.TimeoutException:
+            failed = True
+            logging.error('%s batch fixhook timed out', check)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+        stats.record(BATCH_HOOK, time.perf_counter() - wall, failed)
@@ -6,8 +6,10 @@ from urllib.parse import unquote
 import logging
 
 import gnupg
+import sh
 
 from parabola_repolint.config import CONFIG
+from parabola_repolint import commands
 
 
 GPG_PACMAN = gnupg.GPG(gnupghome=CONFIG.gnupg.gpgdir)
@@ -21,3 +23,19 @@ def get_uid(key_id):
         return unquote(key.uids[0])
     logging.warning('%s: error in key resolution: (%s)', key_id, key.__dict__)
     return key_id
+
+
+def verify_file(sigfile, path, obj=None):
+    '''
+    verify a detached signature against the pacman keyring, with the gpg
+    timeout applied. produces a gnupg.Verify result.
+    '''
+    result = gnupg.Verify(GPG_PACMAN)
+    gpg = sh.Command(GPG_PACMAN.gpgbinary)
+    out = commands.run('gpg', obj, gpg, '--homedir', CONFIG.gnupg.gpgdir, '--batch', '--no-tty',
+                       '--status-fd', '1', '--verify', sigfile, path, _ok_code=range(256))
+    for line in str(out).splitlines():
+        if line.startswith('[GNUPG:] '):
+            keyword, _, value = line[9:].partition(' ')
+            result.handle_status(keyword, value)
+    return result
@@ -0,0 +1,150 @@
+'''
+a local database of the issues found over time
+'''
+
+import os
+import sqlite3
+
+from xdg import BaseDirectory
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    time TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS issues (
+    check_name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    message TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    resolved TEXT,
+    PRIMARY KEY (check_name, key)
+);
+CREATE INDEX IF NOT EXISTS issues_open ON issues (resolved, check_name);
+CREATE INDEX IF NOT EXISTS issues_first_seen ON issues (first_seen);
+'''
+
+
+def default_path():
+    ''' produce the default location of the history database '''
+    return os.path.join(BaseDirectory.xdg_data_home, 'parabola-repolint', 'history.sqlite')
+
+
+class IssueDelta():
+    ''' the new and resolved issues of a check in a run '''
+
+    def __init__(self):
+        ''' constructor '''
+        self.new = []
+        self.resolved = []
+
+    def __bool__(self):
+        ''' indicate whether anything changed '''
+        return bool(self.new or self.resolved)
+
+
+class IssueHistory():
+    ''' record linter issues by their stable identities over time '''
+
+    def __init__(self, path=None):
+        ''' constructor '''
+        if path is None:
+            path = default_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+
+    def record(self, time, checks):
+        '''
+        record the issues of the given checks found at the given time, and
+        produce a dict of IssueDelta objects by check name
+        '''
+        time = str(time)
+        res = {}
+
+        with self._db:
+            self._db.execute('INSERT OR REPLACE INTO runs (time) VALUES (?)', (time,))
+
+            for check in checks:
+                name = str(check)
+                delta = IssueDelta()
+                res[name] = delta
+
+                current = {}
+                for issue in check.issues:
+                    current[check.issue_key(issue)] = issue[0] % issue[1:]
+
+                known = {}
+                for key, message in self._db.execute(
+                        'SELECT key, message FROM issues WHERE check_name = ? AND resolved IS NULL',
+                        (name,)):
+                    known[key] = message
+
+                for key, message in current.items():
+                    if key in known:
+                        self._db.execute(
+                            'UPDATE issues SET message = ?, last_seen = ? '
+                            'WHERE check_name = ? AND key = ?',
+                            (message, time, name, key))
+                    else:
+                        delta.new.append(message)
+                        self._db.execute(
+                            'INSERT OR REPLACE INTO issues '
+                            '(check_name, key, message, first_seen, last_seen, resolved) '
+                            'VALUES (?, ?, ?, ?, ?, NULL)',
+                            (name, key, message, time, time))
+
+                for key, message in known.items():
+                    if key not in current:
+                        delta.resolved.append(message)
+                        self._db.execute(
+                            'UPDATE issues SET resolved = ? WHERE check_name = ? AND key = ?',
+                            (time, name, key))
+
+                delta.new.sort()
+                delta.resolved.sort()
+
+        return res
+
+    def latest_run(self):
+        ''' produce the time of the latest recorded run, or None '''
+        row = self._db.execute('SELECT MAX(time) FROM runs').fetchone()
+        return row[0]
+
+    def status(self):
+        '''
+        produce the number of open, new and resolved issues per check as of
+        the latest recorded run
+        '''
+        latest = self.latest_run()
+        res = {}
+        for name, total, new in self._db.execute(
+                'SELECT check_name, COUNT(*), SUM(first_seen = ?) FROM issues '
+                'WHERE resolved IS NULL GROUP BY check_name', (latest,)):
+            res[name] = [total, new, 0]
+        for name, resolved in self._db.execute(
+                'SELECT check_name, COUNT(*) FROM issues WHERE resolved = ? '
+                'GROUP BY check_name', (latest,)):
+            res.setdefault(name, [0, 0, 0])[2] = resolved
+        return latest, res
+
+    def format_status(self):
+        ''' produce a short formatted string of the latest recorded state '''
+        latest, status = self.status()
+        if latest is None:
+            return 'no recorded repolint runs'
+
+        out = 'repolint status at %s' % latest
+        total = 0
+        for name in sorted(status):
+            issues, new, resolved = status[name]
+            total += issues
+            out += '\n  %s: %i (+%i, -%i)' % (name, issues, new, resolved)
+        out += '\ntotal issues: %i' % total
+        return out
+
+    def close(self):
+        ''' close the database '''
+        self._db.close()
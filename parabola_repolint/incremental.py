@@ -0,0 +1,167 @@
+'''
+persistent state for incremental linting, reusing the issues of objects whose
+inputs have not changed since the previous run
+'''
+
+import os
+import json
+import logging
+
+from parabola_repolint.parallel import pack_issue, unpack_issue
+
+
+# bump when the stored state changes its meaning, to discard older states
+FORMAT = 2
+
+
+def object_key(obj):
+    ''' produce a stable key identifying a checked object across runs '''
+    if isinstance(obj, dict):
+        return obj.get('keyid', None)
+    return str(obj)
+
+
+def object_fingerprint(obj):
+    ''' produce the fingerprint of an object, or None if it has none '''
+    return getattr(obj, 'fingerprint', None)
+
+
+class IncrementalState():
+    ''' the fingerprints and issues of all (check, object) pairs of a run '''
+
+    def __init__(self, path):
+        ''' constructor '''
+        self._path = path
+        self._previous = {'format': FORMAT, 'objects': {}, 'checks': {}}
+        self._current = {'format': FORMAT, 'objects': {}, 'checks': {}}
+        self._updates = []
+        self.track_updates = False
+
+        self._keys = {}
+        self._objects = {}
+
+        self._reused = 0
+        self._checked = 0
+
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r') as infile:
+                    previous = json.loads(infile.read())
+                if previous.get('format', None) == FORMAT:
+                    self._previous = previous
+                else:
+                    logging.info('discarding incremental state %s of an older format', path)
+            except ValueError:
+                logging.exception('discarding corrupt incremental state %s', path)
+
+    def register_objects(self, objects):
+        '''
+        set the loaded objects other objects' issues may refer to, so that
+        reused issues refer to the current objects instead of their strings
+        '''
+        self._keys = {}
+        self._objects = {}
+        for obj in objects:
+            key = object_key(obj)
+            if key is not None:
+                self._keys[id(obj)] = key
+                self._objects[key] = obj
+
+    def _check_state(self, state, check):
+        ''' produce the stored state of a check, if its version matches '''
+        res = state['checks'].get(str(check), None)
+        if res is None or res['version'] != check.version:
+            return None
+        return res
+
+    def _current_check_state(self, check):
+        ''' produce the state of a check in the current run '''
+        name = str(check)
+        if name not in self._current['checks']:
+            self._current['checks'][name] = {'version': check.version, 'extra': {}, 'issues': {}}
+        return self._current['checks'][name]
+
+    def lookup(self, check, key, fingerprint, extra):
+        '''
+        produce the packed issues of the previous run for the given check and
+        object, or None if the object needs to be checked again
+        '''
+        if self._previous['objects'].get(key, None) != fingerprint:
+            return None
+        state = self._check_state(self._previous, check)
+        if state is None:
+            return None
+        if extra is not None and state['extra'].get(key, None) != extra:
+            return None
+        return state['issues'].get(key, [])
+
+    def store(self, check, key, fingerprint, extra, packed):
+        ''' record the fingerprints and packed issues of a check on an object '''
+        self._current['objects'][key] = fingerprint
+        state = self._current_check_state(check)
+        if extra is not None:
+            state['extra'][key] = extra
+        if packed:
+            state['issues'][key] = packed
+        if self.track_updates:
+            self._updates.append((str(check), check.version, key, fingerprint, extra, packed))
+
+    def run(self, check, obj, func):
+        '''
+        run func to check the object, unless the issues of the previous run
+        can be reused. produces the list of issues.
+        '''
+        key = object_key(obj)
+        fingerprint = object_fingerprint(obj)
+        if not check.incremental or key is None or fingerprint is None:
+            return func()
+
+        extra = check.fingerprint(obj)
+        packed = self.lookup(check, key, fingerprint, extra)
+        if packed is not None:
+            try:
+                issues = [unpack_issue(p, obj, self._objects) for p in packed]
+                self._reused += 1
+                self.store(check, key, fingerprint, extra, packed)
+                return issues
+            except KeyError as e:
+                logging.debug('%s: %s: %s is gone, checking again', check, key, e)
+
+        self._checked += 1
+        issues = func()
+        packed = [pack_issue(i, obj, self._keys) for i in issues]
+        self.store(check, key, fingerprint, extra, packed)
+        return issues
+
+    def take_updates(self):
+        ''' produce and forget the records stored since the last call, if tracked '''
+        res = self._updates
+        self._updates = []
+        return res
+
+    def merge_updates(self, updates):
+        ''' apply records taken from another process '''
+        for name, version, key, fingerprint, extra, packed in updates:
+            self._current['objects'][key] = fingerprint
+            if name not in self._current['checks']:
+                self._current['checks'][name] = {'version': version, 'extra': {}, 'issues': {}}
+            state = self._current['checks'][name]
+            if extra is not None:
+                state['extra'][key] = extra
+            if packed:
+                state['issues'][key] = packed
+
+    def save(self):
+        ''' persist the state of the current run, and start a new one '''
+        logging.info('incremental linting: %i reused, %i checked', self._reused, self._checked)
+
+        tmp = self._path + '.tmp'
+        with open(tmp, 'w') as outfile:
+            outfile.write(json.dumps(self._current))
+        os.replace(tmp, self._path)
+
+        self._previous = self._current
+        self._current = {'format': FORMAT, 'objects': {}, 'checks': {}}
+        self._updates = []
+        self._reused = 0
+        self._checked = 0
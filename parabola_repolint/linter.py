@@ -2,13 +2,39 @@
 this module provides the linter orchestrator
 '''
 
+import io
+import os
 import importlib
 import pkgutil
+import json
 import logging
 import datetime
 import socket
+import time
 import enum
 
+from parabola_repolint import parallel
+from parabola_repolint.parallel import pack_issue, unpack_issue
+from parabola_repolint.timing import CheckTiming, SUBPROCESS_TIMINGS, LISTENERS, phase
+from parabola_repolint.incremental import IncrementalState
+from parabola_repolint.report import TextSink, DeltaSink
+
+
+def object_identity(obj):
+    '''
+    produce the identity of an issue object that is stable across upgrades:
+    <repo>/<arch>/<pkgname> for repo.db entries and package files, also when
+    given as the string of a package file, and the string of anything else
+    '''
+    if hasattr(obj, 'pkgname') and hasattr(obj, 'arch') and hasattr(obj, 'repo'):
+        return '%s/%s/%s' % (obj.repo.name, obj.arch, obj.pkgname)
+
+    name = str(obj)
+    if '.pkg.tar.' in name and '/' in name:
+        path, filename = name.rsplit('/', 1)
+        return '%s/%s' % (path, filename.rsplit('-', 3)[0])
+    return name
+
 
 class LinterCheckMeta(type):
     ''' a meta class for linter checks '''
@@ -21,23 +47,65 @@ class LinterCheckMeta(type):
 class LinterCheckBase(metaclass=LinterCheckMeta):
     ''' a base class for linter checks '''
 
+    # bump to invalidate stored issues of incremental runs when the logic changes
+    version = 1
+
+    # whether the issues of an unchanged object can be reused in later runs
+    incremental = True
+
     def __init__(self, linter, cache):
         ''' a default constructor '''
         self._linter = linter
         self._cache = cache
         self._issues = []
+        self._timing = CheckTiming()
 
     @property
     def issues(self):
         ''' produce the list of issues generated by this check '''
         return self._issues
 
+    @property
+    def timing(self):
+        ''' produce the run time statistics of this check '''
+        return self._timing
+
+    def sorted_issues(self):
+        ''' produce the found issues and their formatted messages, sorted by message '''
+        res = [(issue[0] % issue[1:], issue) for issue in self._issues]
+        res.sort(key=lambda r: r[0])
+        return [(issue, message) for message, issue in res]
+
     def format(self):
         ''' a default formatter for found issues '''
+        return "\n".join('    ' + message for _, message in self.sorted_issues())
+
+    # pylint: disable=no-self-use,unused-argument
+    def fingerprint(self, obj):
+        '''
+        produce a digest of inputs beyond the object and its neighbours that
+        the check depends on, for incremental runs. None if there are none.
+        '''
+        return None
+
+    def issue_key(self, issue):
+        ''' produce the stable identity of an issue within this check '''
+        return object_identity(issue[1])
+
+    # pylint: disable=no-self-use
+    def merge_issues(self, issue_lists):
+        '''
+        combine the issues found by several shards, dropping the duplicates
+        reported by shards sharing an object
+        '''
         res = []
-        for issue in self._issues:
-            res.append('    ' + issue[0] % issue[1:])
-        return "\n".join(sorted(res))
+        seen = set()
+        for issues in issue_lists:
+            for issue in issues:
+                if issue not in seen:
+                    seen.add(issue)
+                    res.append(issue)
+        return res
 
     def fixhook_base(self, issue):
         ''' produce the default fixhook base path '''
@@ -53,7 +121,11 @@ class LinterCheckBase(metaclass=LinterCheckMeta):
 
 
 class LinterIssue(Exception):
-    ''' raised by linter checks to indicate problems '''
+    '''
+    raised by linter checks to indicate problems. checks that may find more
+    than one problem per object instead yield tuples of the same shape from
+    their check method.
+    '''
 
 
 class LinterCheckType(enum.Enum):
@@ -64,6 +136,7 @@ class LinterCheckType(enum.Enum):
     SIGNING_KEY = 4
     MASTER_KEY = 5
     ALL_PKGFILE = 6
+    QUARANTINED = 7
 
 
 def _is_linter_check(cls):
@@ -92,28 +165,52 @@ def _load_linter_checks_from(package_name):
     return result
 
 
+# the number of slowest checks listed in the short digest
+TIMING_SUMMARY = 5
+
+
 class Linter():
     ''' the master linter class '''
 
-    def __init__(self, repo_cache):
+    def __init__(self, repo_cache, checks=None):
         ''' constructor '''
-        self._checks = _load_linter_checks_from('parabola_repolint.linter_checks')
+        if checks is None:
+            checks = _load_linter_checks_from('parabola_repolint.linter_checks')
+        self._checks = checks
         self._enabled_checks = []
 
         self._cache = repo_cache
 
         self._start_time = None
         self._end_time = None
+        self._type_timing = {}
+
+        self._incremental = None
+        self._delta = {}
 
     @property
     def checks(self):
         ''' return the names of all supported linter checks '''
         return self._checks
 
+    @property
+    def enabled_checks(self):
+        ''' produce the checks enabled for this run '''
+        return self._enabled_checks
+
     def register_repo_cache(self, cache):
         ''' store a reference to the repo cache '''
         self._cache = cache
 
+    @property
+    def incremental(self):
+        ''' produce the incremental linting state, if enabled '''
+        return self._incremental
+
+    def enable_incremental(self, path):
+        ''' reuse the issues of unchanged objects from the state stored in path '''
+        self._incremental = IncrementalState(path)
+
     def load_checks(self, checks):
         ''' initialize the set of enabled linter checks '''
         self._start_time = datetime.datetime.now()
@@ -121,8 +218,80 @@ class Linter():
         self._enabled_checks = [c(self, self._cache) for c in self._checks if c.name in checks]
         logging.debug('initialized enabled checks %s', self._enabled_checks)
 
-    def run_checks(self):
+    def write_shard(self, path, shard):
+        ''' write the issues found by this shard (i, n) to a partial result file '''
+        res = {
+            'shard': shard,
+            'start_time': self._start_time.isoformat(),
+            'end_time': self._end_time.isoformat(),
+            'checks': {},
+            'timing': {},
+        }
+        for check in self._enabled_checks:
+            res['checks'][str(check)] = [pack_issue(i, None) for i in check.issues]
+            res['timing'][str(check)] = check.timing.to_dict()
+
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as out:
+            out.write(json.dumps(res))
+        os.replace(tmp, path)
+        logging.info('wrote shard %i/%i results to %s', shard[0], shard[1], path)
+
+    def merge_shards(self, paths):
+        ''' combine the partial result files of shards as if from a single run '''
+        shards = []
+        for path in paths:
+            with open(path, 'r') as infile:
+                shards.append(json.loads(infile.read()))
+
+        counts = set(s['shard'][1] for s in shards)
+        found = sorted(s['shard'][0] for s in shards)
+        if len(counts) != 1 or found != list(range(counts.pop())):
+            logging.warning('incomplete set of shards: %s', found)
+
+        checks = set(c for s in shards for c in s['checks'])
+        self.load_checks(checks)
+
+        for check in self._enabled_checks:
+            name = str(check)
+            issue_lists = []
+            for shard in shards:
+                if name in shard['checks']:
+                    issue_lists.append([unpack_issue(i, None) for i in shard['checks'][name]])
+                    check.timing.merge(CheckTiming.from_dict(shard['timing'][name]))
+            check.issues.extend(check.merge_issues(issue_lists))
+
+        parse = datetime.datetime.fromisoformat
+        self._start_time = min(parse(s['start_time']) for s in shards)
+        self._end_time = max(parse(s['end_time']) for s in shards)
+
+    def run_checks(self, jobs=1):
         ''' run the previuosly initialized enabled checks '''
+        if self._incremental is not None:
+            self._incremental.register_objects(self._loaded_objects())
+
+        with phase('checks'):
+            if jobs > 1:
+                self._run_checks_parallel(jobs)
+            else:
+                self._run_checks_sequential()
+
+        if self._incremental is not None:
+            self._incremental.save()
+
+        self._end_time = datetime.datetime.now()
+
+    def _enabled_checks_by_type(self):
+        ''' produce the enabled checks grouped by check type, in run order '''
+        res = {}
+        for check_type in LinterCheckType:
+            checks = [c for c in self._enabled_checks if c.check_type == check_type]
+            if checks:
+                res[check_type] = checks
+        return res
+
+    def _run_checks_sequential(self):
+        ''' run the enabled checks, one pass over the objects per check type '''
         check_funcs = {
             LinterCheckType.PKGBUILD: self._run_check_pkgbuild,
             LinterCheckType.PKGENTRY: self._run_check_pkgentry,
@@ -130,86 +299,200 @@ class Linter():
             LinterCheckType.SIGNING_KEY: self._run_check_signing_key,
             LinterCheckType.MASTER_KEY: self._run_check_master_key,
             LinterCheckType.ALL_PKGFILE: self._run_check_all_pkgfile,
+            LinterCheckType.QUARANTINED: self._run_check_quarantined,
         }
 
-        for check_type in LinterCheckType:
-            check_func = check_funcs[check_type]
-            for check in [c for c in self._enabled_checks if c.check_type == check_type]:
-                logging.info('running check %s', check)
-                check_func(check)
-
-        self._end_time = datetime.datetime.now()
-
-    def _run_check_pkgbuild(self, check):
-        ''' run a PKGBUILD type check '''
-        for pkgbuild in self._cache.pkgbuilds:
-            self._try_check(check, pkgbuild)
-
-    def _run_check_pkgentry(self, check):
-        ''' run a PKGENTRY type check '''
-        for pkgentry in self._cache.pkgentries:
-            self._try_check(check, pkgentry)
-
-    def _run_check_pkgfile(self, check):
-        ''' run a PKGFILE type check '''
-        for pkgfile in self._cache.pkgfiles:
-            self._try_check(check, pkgfile)
-
-    def _run_check_signing_key(self, check):
-        ''' run a SIGNING_KEY type check '''
-        for key in self._cache.key_cache.values():
-            self._try_check(check, key)
-
-    def _run_check_master_key(self, check):
-        ''' run a MASTER_KEY type check '''
-        for key in self._cache.keyring:
-            self._try_check(check, key)
-
-    def _run_check_all_pkgfile(self, check):
-        ''' run a PKGFILE type check '''
-        for pkgfile in self._cache.pkgfiles + self._cache.arch_pkgfiles:
-            self._try_check(check, pkgfile)
+        for check_type, checks in self._enabled_checks_by_type().items():
+            logging.info('running checks %s', checks)
+            wall = time.perf_counter()
+            with phase('check_pass', type=check_type.name):
+                check_funcs[check_type](checks)
+            self._type_timing[check_type] = time.perf_counter() - wall
+
+    def _run_checks_parallel(self, jobs):
+        ''' run the enabled checks in a pool of forked workers '''
+        checks = self._enabled_checks_by_type()
+        objects = {}
+        for check_type in checks:
+            logging.info('running checks %s', checks[check_type])
+            objects[check_type] = self._check_objects(check_type)
+
+        self._type_timing = parallel.run_checks(self, checks, objects, jobs, self._loaded_objects())
+
+    def _loaded_objects(self):
+        ''' produce the objects of all check types, issues may refer to '''
+        return [o for t in LinterCheckType for o in self._check_objects(t)]
+
+    def _check_objects(self, check_type):
+        ''' produce the list of objects checks of the given type run on '''
+        if check_type == LinterCheckType.PKGBUILD:
+            return self._cache.pkgbuilds
+        if check_type == LinterCheckType.PKGENTRY:
+            return self._cache.pkgentries
+        if check_type == LinterCheckType.PKGFILE:
+            return self._cache.pkgfiles
+        if check_type == LinterCheckType.SIGNING_KEY:
+            return list(self._cache.key_cache.values())
+        if check_type == LinterCheckType.MASTER_KEY:
+            return self._cache.keyring
+        if check_type == LinterCheckType.ALL_PKGFILE:
+            return self._cache.pkgfiles + self._cache.arch_pkgfiles
+        if check_type == LinterCheckType.QUARANTINED:
+            return self._cache.quarantined
+        raise ValueError('unknown check type: %s' % check_type)
+
+    def _run_check_pkgbuild(self, checks):
+        ''' run the PKGBUILD type checks '''
+        self._run_fused(checks, self._check_objects(LinterCheckType.PKGBUILD))
+
+    def _run_check_pkgentry(self, checks):
+        ''' run the PKGENTRY type checks '''
+        self._run_fused(checks, self._check_objects(LinterCheckType.PKGENTRY))
+
+    def _run_check_pkgfile(self, checks):
+        ''' run the PKGFILE type checks '''
+        self._run_fused(checks, self._check_objects(LinterCheckType.PKGFILE))
+
+    def _run_check_signing_key(self, checks):
+        ''' run the SIGNING_KEY type checks '''
+        self._run_fused(checks, self._check_objects(LinterCheckType.SIGNING_KEY))
+
+    def _run_check_master_key(self, checks):
+        ''' run the MASTER_KEY type checks '''
+        self._run_fused(checks, self._check_objects(LinterCheckType.MASTER_KEY))
+
+    def _run_check_all_pkgfile(self, checks):
+        ''' run the ALL_PKGFILE type checks '''
+        self._run_fused(checks, self._check_objects(LinterCheckType.ALL_PKGFILE))
+
+    def _run_check_quarantined(self, checks):
+        ''' run the QUARANTINED type checks '''
+        self._run_fused(checks, self._check_objects(LinterCheckType.QUARANTINED))
+
+    def _run_fused(self, checks, objects):
+        ''' visit each object once, running all given checks on it in turn '''
+        for obj in objects:
+            for check in checks:
+                self._try_check(check, obj)
+
+    def _try_check(self, check, obj):
+        ''' run a check on an object, reusing previous issues if possible '''
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        for listener in LISTENERS:
+            listener.check_started(check, obj)
+        if self._incremental is not None:
+            issues = self._incremental.run(check, obj, lambda: self._collect_issues(check, obj))
+        else:
+            issues = self._collect_issues(check, obj)
+        elapsed = time.perf_counter() - wall
+        for listener in LISTENERS:
+            listener.check_ended(check, obj, wall, elapsed)
+        check.issues.extend(issues)
+        check.timing.record(obj, elapsed, time.process_time() - cpu)
 
     # pylint: disable=no-self-use
-    def _try_check(self, check, *args, **kwargs):
-        ''' run a check and catch any LinterIssue '''
+    def _collect_issues(self, check, obj):
+        '''
+        run a check and collect its issues, either yielded as tuples or raised
+        as a LinterIssue
+        '''
+        res = []
         try:
-            check.check(*args, **kwargs)
+            issues = check.check(obj)
+            if issues is not None:
+                for issue in issues:
+                    res.append(tuple(issue))
         except LinterIssue as i:
-            check.issues.append(i.args)
+            res.append(i.args)
+        return res
 
     @property
     def triggered_checks(self):
         ''' produce a list of all checks with issues '''
         return [ check for check in self._enabled_checks if check.issues ]
 
-    def format(self):
-        ''' return a formatted string of the linter issues '''
+    def record_history(self, history):
+        ''' record the issues of the run in the history and remember the delta '''
+        self._delta = history.record(self._end_time, self._enabled_checks)
+
+    def write_report(self, sinks):
+        '''
+        stream the linter issues to the given report sinks, check by check,
+        formatting and sorting the issues of each check only once
+        '''
+        for sink in sinks:
+            sink.begin(self)
+
+        for check in self._enabled_checks:
+            for sink in sinks:
+                sink.begin_check(check)
+            for issue, message in check.sorted_issues():
+                for sink in sinks:
+                    sink.issue(check, issue, message)
+            for sink in sinks:
+                sink.end_check(check)
+
+        for sink in sinks:
+            sink.end()
+
+    def format(self, delta_only=False):
+        '''
+        return a formatted string of the linter issues, or of only the new and
+        resolved issues since the previous recorded run
+        '''
+        out = io.StringIO()
+        self.write_report([DeltaSink(out) if delta_only else TextSink(out)])
+        return out.getvalue()
+
+    def format_header(self):
+        ''' return the header of the formatted digest '''
         now = self._end_time.strftime("%Y-%m-%d %H:%M:%S")
-        out = '''
+        return '''
 ==============================================================================
 This is an auto-generated list of issues in the parabola package repository.
 Generated by parabola-repolint on %s at %s
 ==============================================================================
 ''' % (socket.gethostname(), now)
 
-        for check in self.triggered_checks:
-            header = '%s:\n%s' % (check.header, '-' * (len(check.header) + 1))
-            out += '\n\n\n%s\n%s\nissues:\n' % (header, check.__doc__)
-            out += check.format()
-        return out
-
     def short_format(self):
         ''' return a (short) formatted string of the linter issues '''
         now = self._end_time.strftime("%Y-%m-%d %H:%M:%S")
         out = 'repolint digest at %s' % now
 
-        for check in self.triggered_checks:
-            out += '\n  %s: %i' % (check, len(check.issues))
+        for check in self._enabled_checks:
+            delta = self._delta.get(str(check), None)
+            if delta is not None and (check.issues or delta):
+                out += '\n  %s: %i (+%i, -%i)' % (
+                    check, len(check.issues), len(delta.new), len(delta.resolved))
+            elif check.issues:
+                out += '\n  %s: %i' % (check, len(check.issues))
         out += '\ntotal issues: %i' % self.total_issues
 
+        slowest = sorted(self._enabled_checks, key=lambda c: -c.timing.wall)[:TIMING_SUMMARY]
+        if slowest:
+            out += '\nslowest checks:'
+        for check in slowest:
+            out += '\n  %s: %s' % (check, check.timing)
+
+        commands = sorted(SUBPROCESS_TIMINGS.items(), key=lambda c: -c[1].wall)
+        if commands:
+            out += '\nslowest commands:'
+        for name, timing in commands[:TIMING_SUMMARY]:
+            out += '\n  %s: %s' % (name, timing)
+
         return out
 
+    def timing_report(self):
+        ''' produce a machine-readable report of the run time statistics '''
+        return {
+            'start_time': str(self._start_time),
+            'end_time': str(self._end_time),
+            'check_types': {t.name: w for t, w in self._type_timing.items()},
+            'checks': {str(c): c.timing.to_dict() for c in self._enabled_checks},
+            'subprocesses': {n: t.to_dict() for n, t in SUBPROCESS_TIMINGS.items()},
+        }
+
     @property
     def total_issues(self):
         ''' produce the total number of found issues '''
@@ -218,6 +501,11 @@ Generated by parabola-repolint on %s at %s
             res += len(check.issues)
         return res
 
+    @property
+    def delta(self):
+        ''' produce the new and resolved issues since the previous recorded run, by check name '''
+        return self._delta
+
     @property
     def start_time(self):
         ''' produce the start time of the linter '''
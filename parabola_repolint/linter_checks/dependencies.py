@@ -2,10 +2,11 @@
 linter checks for repo dependency integrity
 '''
 
+import hashlib
 import operator
 
 from parabola_repolint.repocache import PkgVersion
-from parabola_repolint.linter import LinterIssue, LinterCheckBase, LinterCheckType
+from parabola_repolint.linter import LinterCheckBase, LinterCheckType, object_identity
 
 
 def _candidate_contains_depends(depend, candidate, version):
@@ -62,6 +63,20 @@ def _repos_contain_depends(depend, repos, arch):
     return matches
 
 
+def _depends_fingerprint(depends, repos, arch):
+    ''' produce a digest of all candidates that may satisfy the dependencies '''
+    candidates = []
+    for depend in sorted(depends):
+        for split in ['==', '>=', '<=', '>', '<', '=']:
+            if split in depend:
+                depend = depend.split(split)[0]
+                break
+        for repo in repos:
+            for candidate in repo.provides_cache.get(arch, {}).get(depend, []):
+                candidates.append((depend, candidate.input_digest))
+    return hashlib.blake2b(repr(candidates).encode(), digest_size=8).hexdigest()
+
+
 class UnsatisfiableDepends(LinterCheckBase):
     '''
   for the list of entries in the repo.db's check that all entries in the
@@ -76,18 +91,22 @@ class UnsatisfiableDepends(LinterCheckBase):
 
     header = 'repo.db entries with unsatisfiable depends'
 
+    def fingerprint(self, pkgentry):
+        ''' produce a digest of the candidates for the dependencies '''
+        repos = list(self._cache.repos.values()) + list(self._cache.arch_repos.values())
+        return _depends_fingerprint(pkgentry.depends, repos, pkgentry.arch)
+
     def check(self, pkgentry):
         ''' run the check '''
         repos = list(self._cache.repos.values()) + list(self._cache.arch_repos.values())
-        missing = []
 
-        for depend in pkgentry.depends:
-            matches = _repos_contain_depends(depend, repos, pkgentry.arch)
-            if not matches:
-                missing.append(depend)
+        for depend in sorted(pkgentry.depends):
+            if not _repos_contain_depends(depend, repos, pkgentry.arch):
+                yield ('%s (%s)', pkgentry, depend)
 
-        if missing:
-            raise LinterIssue('%s (%s)', pkgentry, ','.join(missing))
+    def issue_key(self, issue):
+        ''' identify issues by entry and dependency '''
+        return '%s %s' % (object_identity(issue[1]), issue[2])
 
     def fixhook_base(self, issue):
         ''' produce a custom fixhook base '''
@@ -112,18 +131,22 @@ class UnsatisfiableMakedepends(LinterCheckBase):
 
     header = 'repo.db entries with unsatisfiable makedepends'
 
+    def fingerprint(self, pkgentry):
+        ''' produce a digest of the candidates for the dependencies '''
+        repos = list(self._cache.repos.values()) + list(self._cache.arch_repos.values())
+        return _depends_fingerprint(pkgentry.makedepends, repos, pkgentry.arch)
+
     def check(self, pkgentry):
         ''' run the check '''
         repos = list(self._cache.repos.values()) + list(self._cache.arch_repos.values())
-        missing = []
 
-        for depend in pkgentry.makedepends:
-            matches = _repos_contain_depends(depend, repos, pkgentry.arch)
-            if not matches:
-                missing.append(depend)
+        for depend in sorted(pkgentry.makedepends):
+            if not _repos_contain_depends(depend, repos, pkgentry.arch):
+                yield ('%s (%s)', pkgentry, depend)
 
-        if missing:
-            raise LinterIssue('%s (%s)', pkgentry, ','.join(missing))
+    def issue_key(self, issue):
+        ''' identify issues by entry and dependency '''
+        return '%s %s' % (object_identity(issue[1]), issue[2])
 
 
 class UnsatisfiableCheckdepends(LinterCheckBase):
@@ -140,15 +163,19 @@ class UnsatisfiableCheckdepends(LinterCheckBase):
 
     header = 'repo.db entries with unsatisfiable makedepends'
 
+    def fingerprint(self, pkgentry):
+        ''' produce a digest of the candidates for the dependencies '''
+        repos = list(self._cache.repos.values()) + list(self._cache.arch_repos.values())
+        return _depends_fingerprint(pkgentry.checkdepends, repos, pkgentry.arch)
+
     def check(self, pkgentry):
         ''' run the check '''
         repos = list(self._cache.repos.values()) + list(self._cache.arch_repos.values())
-        missing = []
 
-        for depend in pkgentry.checkdepends:
-            matches = _repos_contain_depends(depend, repos, pkgentry.arch)
-            if not matches:
-                missing.append(depend)
+        for depend in sorted(pkgentry.checkdepends):
+            if not _repos_contain_depends(depend, repos, pkgentry.arch):
+                yield ('%s (%s)', pkgentry, depend)
 
-        if missing:
-            raise LinterIssue('%s (%s)', pkgentry, ','.join(missing))
+    def issue_key(self, issue):
+        ''' identify issues by entry and dependency '''
+        return '%s %s' % (object_identity(issue[1]), issue[2])
@@ -0,0 +1,88 @@
+'''
+linter checks for files shared between the packages of different repos
+'''
+
+import hashlib
+
+from parabola_repolint.linter import LinterCheckBase, LinterCheckType, object_identity
+
+
+def _strip_version(name):
+    ''' produce a conflicts(), replaces() or provides() entry without its version '''
+    for split in ['==', '>=', '<=', '>', '<', '=']:
+        if split in name:
+            return name.split(split)[0]
+    return name
+
+
+def _declares_conflict(pkgentry, pkgname, others):
+    '''
+    test whether a pkgentry conflicts with or replaces the package of the
+    given name, or one of the names provided by its entries
+    '''
+    names = set([pkgname])
+    for other in others:
+        names.update(_strip_version(p) for p in other.provides)
+    declared = pkgentry.conflicts.union(pkgentry.replaces)
+    return any(_strip_version(d) in names for d in declared)
+
+
+class FileConflict(LinterCheckBase):
+    '''
+  for the list of entries in the repo.db's, check whether the package contains
+  files that a package in a different repo of the same architecture contains as
+  well, using the file lists of the .files databases of all repos. Directories,
+  packages of the same name, and packages of which one conflicts with or
+  replaces the other or one of its provides() entries are not considered. The
+  check reports an issue for every pair of conflicting packages, once, on the
+  entry of the first repo in alphabetical order if both are parabola packages.
+'''
+
+    name = 'file_conflict'
+    check_type = LinterCheckType.PKGENTRY
+    version = 2
+
+    header = 'repo.db entries with files conflicting with packages in other repos'
+
+    def _overlaps(self, pkgentry):
+        ''' produce the packages sharing files with the pkgentry, and the number of shared files '''
+        index = self._cache.file_indexes.get(pkgentry.arch, None)
+        if index is None:
+            return {}
+        return index.overlaps(pkgentry.repo.name, pkgentry.pkgname)
+
+    def _pkgentries(self, repo, arch, pkgname):
+        ''' produce the pkgentries of the given name in a repo '''
+        repo = self._cache.repos.get(repo, None) or self._cache.arch_repos.get(repo, None)
+        if repo is None:
+            return []
+        return repo.pkgentries_cache.get(arch, {}).get(pkgname, [])
+
+    def fingerprint(self, pkgentry):
+        ''' produce a digest of the packages sharing files with the pkgentry '''
+        candidates = []
+        for (repo, pkgname), count in sorted(self._overlaps(pkgentry).items()):
+            for other in self._pkgentries(repo, pkgentry.arch, pkgname):
+                candidates.append((repo, pkgname, count, other.input_digest))
+        return hashlib.blake2b(repr(candidates).encode(), digest_size=8).hexdigest()
+
+    def check(self, pkgentry):
+        ''' run the check '''
+        for (repo, pkgname), count in sorted(self._overlaps(pkgentry).items()):
+            if repo == pkgentry.repo.name or pkgname == pkgentry.pkgname:
+                continue
+            # the entry of the other parabola package reports the pair
+            if repo in self._cache.repos and (repo, pkgname) < (pkgentry.repo.name, pkgentry.pkgname):
+                continue
+
+            others = self._pkgentries(repo, pkgentry.arch, pkgname)
+            if _declares_conflict(pkgentry, pkgname, others):
+                continue
+            if any(_declares_conflict(o, pkgentry.pkgname, [pkgentry]) for o in others):
+                continue
+
+            yield ('%s (%s/%s/%s: %i files)', pkgentry, repo, pkgentry.arch, pkgname, count)
+
+    def issue_key(self, issue):
+        ''' identify issues by entry and conflicting package '''
+        return '%s %s/%s' % (object_identity(issue[1]), issue[2], issue[4])
@@ -2,7 +2,6 @@
 this are linter checks for package signatures
 '''
 
-import base64
 import logging
 import datetime
 
@@ -22,6 +21,9 @@ class SigningKeyExpiry(LinterCheckBase):
     name = 'signing_key_expiry'
     check_type = LinterCheckType.SIGNING_KEY
 
+    # depends on the current date
+    incremental = False
+
     header = 'signing keys expired or about to expire'
 
     # pylint: disable=no-self-use
@@ -47,6 +49,17 @@ class SigningKeyExpiry(LinterCheckBase):
                 reason += ' (subkey of %s)' % key['master_key']
             raise LinterIssue('%s: %s (signed %i)', key['keyid'], reason, len(key['packages']))
 
+    def merge_issues(self, issue_lists):
+        ''' add up the signed package counts of the shards '''
+        res = {}
+        for issues in issue_lists:
+            for issue in issues:
+                if issue[1:3] in res:
+                    res[issue[1:3]] += issue[3]
+                else:
+                    res[issue[1:3]] = issue[3]
+        return [('%s: %s (signed %i)', keyid, reason, count) for (keyid, reason), count in res.items()]
+
 
 class MasterKeyExpiry(LinterCheckBase):
     '''
@@ -60,6 +73,9 @@ class MasterKeyExpiry(LinterCheckBase):
     name = 'master_key_expiry'
     check_type = LinterCheckType.MASTER_KEY
 
+    # depends on the current date
+    incremental = False
+
     header = 'master keys expired or about to expire'
 
     # pylint: disable=no-self-use
@@ -102,27 +118,13 @@ class PkgEntrySignatureMismatch(LinterCheckBase):
         if not pkgentry.pkgfile:
             return
 
-        key1 = pkgentry.pkgfile.siginfo['key_id'].upper()
-        key2 = base64.b64decode(pkgentry.pgpsig)
-
-        # quick & dirty gpg packet parser
-        # https://tools.ietf.org/search/rfc4880
-        header = key2[0]
-        assert header & 0x80 == 0x80
-        assert header & 0x40 == 0x00
-        assert header & 0x03 == 0x01
-        assert header & 0x1C == 0x08
-
-        version = key2[3]
-        assert version == 0x04
-
-        hashed_len = key2[7] * 256 + key2[8]
-        unhashed_len = key2[9 + hashed_len] * 256 + key2[10 + hashed_len]
-
-        data = key2[11 + hashed_len:11 + hashed_len + unhashed_len]
-        assert data[1] == 0x10 # issuer
-        key2 = data[2:10].hex().upper()
+        signature1 = pkgentry.pkgfile.signature
+        signature2 = pkgentry.signature
+        if signature1 is None or signature2 is None:
+            return
 
+        key1 = signature1.key_id
+        key2 = signature2.key_id
         if key1 != key2:
             raise LinterIssue('%s: %s != %s', pkgentry, key1, key2)
 
@@ -137,6 +139,9 @@ class PkgFileInvalidSignature(LinterCheckBase):
     name = 'pkgfile_invalid_signature'
     check_type = LinterCheckType.PKGFILE
 
+    # depends on the current date and the keyring
+    incremental = False
+
     header = 'packages with invalid signatures'
 
     def check(self, package):
@@ -9,6 +9,11 @@ from parabola_repolint.config import CONFIG
 KNOWN_ARCHES = CONFIG.parabola.arches
 
 
+def _format_unsupported(unsup):
+    ''' produce the unsupported arches by package, sorted '''
+    return '; '.join(['%s: %s' % (p, ','.join(sorted(u))) for p, u in sorted(unsup.items())])
+
+
 class InvalidPkgbuild(LinterCheckBase):
     '''
   this check tests for syntactical problems with the PKGBUILD file itself,
@@ -43,6 +48,8 @@ class UnsupportedArches(LinterCheckBase):
     name = 'unsupported_arches'
     check_type = LinterCheckType.PKGBUILD
 
+    version = 2
+
     header = 'PKGBUILDs with unsupported arches'
 
     # pylint: disable=no-self-use
@@ -68,5 +75,18 @@ class UnsupportedArches(LinterCheckBase):
                     unsup[pkgname] = unsup[pkgname].union(unsup_pkg)
 
         if unsup:
-            unsup_str = '; '.join(['%s: %s' % (p, ','.join(u)) for p, u in unsup.items()])
-            raise LinterIssue('%s (%s)', pkgbuild, unsup_str)
+            raise LinterIssue('%s (%s)', pkgbuild, _format_unsupported(unsup))
+
+    def merge_issues(self, issue_lists):
+        '''
+        combine the unsupported arches of the packages found by the shards of
+        different arches into one issue per PKGBUILD
+        '''
+        res = {}
+        for issues in issue_lists:
+            for issue in issues:
+                unsup = res.setdefault(issue[1], {})
+                for entry in issue[2].split('; '):
+                    pkgname, arches = entry.split(': ')
+                    unsup[pkgname] = unsup.get(pkgname, set()).union(arches.split(','))
+        return [('%s (%s)', pkgbuild, _format_unsupported(u)) for pkgbuild, u in res.items()]
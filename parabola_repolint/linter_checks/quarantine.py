@@ -0,0 +1,25 @@
+'''
+these are checks for objects that could not be checked at all.
+'''
+
+from parabola_repolint.linter import LinterIssue, LinterCheckBase, LinterCheckType
+
+
+class QuarantinedObject(LinterCheckBase):
+    '''
+  for the list of PKGBUILDs and package files that an external command (such as
+  makepkg, tar or gpg) timed out on, report that they are skipped by all other
+  checks. Quarantined objects are retried only once their inputs change. The
+  check reports an issue for every quarantined object.
+'''
+
+    name = 'quarantined_object'
+    check_type = LinterCheckType.QUARANTINED
+
+    header = 'objects skipped after external commands timed out on them'
+
+    incremental = False
+
+    def check(self, obj):
+        ''' run the check '''
+        raise LinterIssue('%s (%s)', obj, obj.quarantined)
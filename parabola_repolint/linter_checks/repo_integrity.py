@@ -2,7 +2,26 @@
 these are linter checks for PKGBUILD / .pkg.tar.xz / repo.db entry integrity
 '''
 
+import re
+
 from parabola_repolint.linter import LinterIssue, LinterCheckBase, LinterCheckType
+from parabola_repolint.config import CONFIG
+
+
+def _merge_arch_lists(issue_lists):
+    '''
+    combine the issues of a PKGBUILD found by the shards of different arches
+    into one, as reported by a single run: the sorted list of its per-arch
+    entries, each starting with the arch.
+    '''
+    arches = '|'.join(re.escape(a) for a in CONFIG.parabola.arches)
+    split = re.compile(r',(?=(?:%s)/)' % arches)
+
+    res = {}
+    for issues in issue_lists:
+        for issue in issues:
+            res.setdefault(issue[1], set()).update(split.split(issue[2]))
+    return [('%s (%s)', pkgbuild, ','.join(sorted(l))) for pkgbuild, l in res.items()]
 
 
 class PkgBuildMissingPkgEntries(LinterCheckBase):
@@ -16,6 +35,8 @@ class PkgBuildMissingPkgEntries(LinterCheckBase):
     name = 'pkgbuild_missing_pkgentries'
     check_type = LinterCheckType.PKGBUILD
 
+    version = 2
+
     header = 'PKGBUILDs with missing entries in repo.db'
 
     # pylint: disable=no-self-use
@@ -27,7 +48,11 @@ class PkgBuildMissingPkgEntries(LinterCheckBase):
                 if pkgname not in [p.pkgname for p in pkgbuild.pkgentries.get(arch, [])]:
                     missing.append('%s/%s' % (arch, pkgname))
         if missing:
-            raise LinterIssue('%s (%s)', pkgbuild, ','.join(missing))
+            raise LinterIssue('%s (%s)', pkgbuild, ','.join(sorted(missing)))
+
+    def merge_issues(self, issue_lists):
+        ''' combine the per-arch lists of the shards '''
+        return _merge_arch_lists(issue_lists)
 
 
 class PkgBuildDuplicatePkgEntries(LinterCheckBase):
@@ -41,6 +66,8 @@ class PkgBuildDuplicatePkgEntries(LinterCheckBase):
     name = 'pkgbuild_duplicate_pkgentries'
     check_type = LinterCheckType.PKGBUILD
 
+    version = 2
+
     header = 'PKGBUILDs with duplicate entries in repo.db'
 
     # pylint: disable=no-self-use
@@ -54,7 +81,11 @@ class PkgBuildDuplicatePkgEntries(LinterCheckBase):
                 if len(pkgentries) > 1:
                     duplicate.append('%s/%s: %s' % (arch, pkgname, ','.join(pkgentries)))
         if duplicate:
-            raise LinterIssue('%s (%s)', pkgbuild, ','.join(duplicate))
+            raise LinterIssue('%s (%s)', pkgbuild, ','.join(sorted(duplicate)))
+
+    def merge_issues(self, issue_lists):
+        ''' combine the per-arch lists of the shards '''
+        return _merge_arch_lists(issue_lists)
 
 
 class PkgBuildMissingPkgFiles(LinterCheckBase):
@@ -67,6 +98,8 @@ class PkgBuildMissingPkgFiles(LinterCheckBase):
     name = 'pkgbuild_missing_pkgfiles'
     check_type = LinterCheckType.PKGBUILD
 
+    version = 2
+
     header = 'PKGBUILDs with missing built packages'
 
     # pylint: disable=no-self-use
@@ -78,7 +111,11 @@ class PkgBuildMissingPkgFiles(LinterCheckBase):
                 if pkgname not in [p.pkgname for p in pkgbuild.pkgfiles.get(arch, [])]:
                     missing.append('%s/%s' % (arch, pkgname))
         if missing:
-            raise LinterIssue('%s (%s)', pkgbuild, ','.join(missing))
+            raise LinterIssue('%s (%s)', pkgbuild, ','.join(sorted(missing)))
+
+    def merge_issues(self, issue_lists):
+        ''' combine the per-arch lists of the shards '''
+        return _merge_arch_lists(issue_lists)
 
 
 class PkgEntryMissingPkgbuild(LinterCheckBase):
@@ -18,6 +18,17 @@ class RedundantPkgEntryPCR(LinterCheckBase):
 
     header = 'redundant packages in [pcr]'
 
+    def fingerprint(self, pkgentry):
+        ''' produce the arch repos containing an entry of the same name '''
+        if pkgentry.repo.name != 'pcr':
+            return None
+
+        res = []
+        for repo in self._cache.arch_repos.values():
+            if repo.pkgentries_cache.get(pkgentry.arch, {}).get(pkgentry.pkgname, None):
+                res.append(repo.name)
+        return ','.join(res)
+
     def check(self, pkgentry):
         ''' run the check '''
         if pkgentry.repo.name != 'pcr':
@@ -0,0 +1,217 @@
+'''
+accounting of the memory used by a run, per phase and per type of object
+'''
+
+import os
+import sys
+import resource
+import threading
+import tracemalloc
+
+from parabola_repolint.timing import LISTENERS, TimingListener
+from parabola_repolint.repocache import PkgFile, PkgEntry, PkgBuild, IndexEntry, Srcinfo, Repo, \
+    BUILDINFO_VALUE, BUILDINFO_SET, BUILDINFO_LIST, PKGINFO_VALUE, PKGINFO_SET, PKGINFO_LIST
+
+
+# the number of allocation sites listed per phase, and of the largest contributors
+MEMORY_TOP = 10
+
+# the classes that are accounted for separately, and not as part of an object referring to them
+ACCOUNTED_TYPES = (PkgFile, PkgEntry, PkgBuild, IndexEntry, Srcinfo, Repo)
+
+# the metadata fields that dict attributes are broken down by, besides the upper case repo.db fields
+FIELDS = set(BUILDINFO_VALUE + BUILDINFO_SET + BUILDINFO_LIST +
+             PKGINFO_VALUE + PKGINFO_SET + PKGINFO_LIST)
+
+
+def _deep_size(obj, seen):
+    '''
+    produce the size of an object and everything reachable from it, except
+    for objects already seen and objects of the separately accounted classes
+    '''
+    res = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        res += sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            children = list(obj.keys()) + list(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            children = obj
+        elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+            children = [obj.__dict__]
+        else:
+            continue
+        stack.extend(o for o in children if not isinstance(o, ACCOUNTED_TYPES))
+    return res
+
+
+def _format_size(size):
+    ''' produce a human-readable size '''
+    for unit in ['B', 'KiB', 'MiB']:
+        if abs(size) < 1024:
+            return '%.1f%s' % (size, unit)
+        size /= 1024
+    return '%.1fGiB' % size
+
+
+class MemoryReport(TimingListener):
+    '''
+    trace the allocations of the run, and record the traced and peak memory
+    and the allocation sites that grew the most at the end of every phase.
+    phases that run concurrently in threads share the allocations made in
+    between, so their attribution is approximate.
+    '''
+
+    def __init__(self, frames=1, top=MEMORY_TOP):
+        ''' constructor, starting to trace the allocations '''
+        self._top = top
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._phases = []
+        self._snapshot = None
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._snapshot = self._take_snapshot()
+
+    @staticmethod
+    def _take_snapshot():
+        ''' take a snapshot of the traced allocations, excluding the tracing itself '''
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+
+    def phase_ended(self, name, labels, wall):
+        ''' record the memory at the end of a phase, and the allocation sites that grew '''
+        if os.getpid() != self._pid:
+            return
+
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            snapshot = self._take_snapshot()
+            growth = snapshot.compare_to(self._snapshot, 'lineno')[:self._top]
+            self._snapshot = snapshot
+
+            self._phases.append({
+                'phase': name,
+                'labels': {k: str(v) for k, v in labels.items()},
+                'wall': wall,
+                'current': current,
+                'peak': peak,
+                'maxrss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+                'growth': [{
+                    'where': str(s.traceback[0]),
+                    'size_diff': s.size_diff,
+                    'count_diff': s.count_diff,
+                } for s in growth],
+            })
+
+    def clear(self):
+        ''' forget the recorded phases, to start the report of the next run '''
+        with self._lock:
+            self._phases = []
+
+    @staticmethod
+    def account_objects(cache):
+        '''
+        produce the number and deep size of the loaded objects per class, and
+        the sizes of their attributes by name, with dict attributes such as
+        the BUILDINFO of package files broken down by key
+        '''
+        objects = []
+        for repo in list(cache.arch_repos.values()) + list(cache.repos.values()):
+            caches = [repo.pkgbuild_cache, repo.pkgentries_cache, repo.provides_cache]
+            objects.extend(('lookup caches', c, False) for c in caches)
+            for obj in repo.pkgbuilds + repo.pkgentries + repo.pkgfiles + repo.quarantined:
+                objects.append((type(obj).__name__, obj, True))
+                if isinstance(obj, PkgBuild):
+                    objects.extend(('Srcinfo', s, True) for s in obj.srcinfo.values())
+            for pkgentries in repo.pkgentries_cache.values():
+                objects.extend(('IndexEntry', o, True) for entries in pkgentries.values()
+                               for o in entries if isinstance(o, IndexEntry))
+        objects.extend(('keyring entries', k, False) for k in cache.keyring)
+        objects.append(('key cache', cache.key_cache, False))
+
+        seen = set()
+        classes = {}
+        contributors = {}
+
+        def account(label, value):
+            ''' add the deep size of an attribute to its contributor '''
+            size = _deep_size(value, seen)
+            contributors[label] = contributors.get(label, 0) + size
+            return size
+
+        for name, obj, breakdown in objects:
+            entry = classes.setdefault(name, {'count': 0, 'size': 0})
+            entry['count'] += 1
+            if not breakdown:
+                entry['size'] += account(name, obj)
+                continue
+
+            attrs = vars(obj)
+            entry['size'] += sys.getsizeof(obj) + sys.getsizeof(attrs)
+            for attr, value in attrs.items():
+                if isinstance(value, dict):
+                    entry['size'] += sys.getsizeof(value)
+                    for key, item in value.items():
+                        field = isinstance(key, str) and (key in FIELDS or key.isupper())
+                        label = '%s.%s[%s]' % (name, attr, key) if field else '%s.%s' % (name, attr)
+                        entry['size'] += account(label, item)
+                else:
+                    entry['size'] += account('%s.%s' % (name, attr), value)
+
+        return classes, contributors
+
+    def report(self, cache):
+        ''' produce the machine-readable memory report of the run '''
+        current, peak = tracemalloc.get_traced_memory()
+        classes, contributors = self.account_objects(cache)
+        largest = sorted(contributors.items(), key=lambda c: -c[1])
+        with self._lock:
+            phases = list(self._phases)
+        return {
+            'current': current,
+            'peak': max([peak] + [p['peak'] for p in phases]),
+            'maxrss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            'phases': phases,
+            'classes': classes,
+            'contributors': [{'name': n, 'size': s} for n, s in largest[:self._top * 3]],
+        }
+
+    def format(self, report):
+        ''' produce a human-readable summary of a memory report '''
+        out = ['memory: %s traced, %s peak, %s max rss' % (
+            _format_size(report['current']), _format_size(report['peak']),
+            _format_size(report['maxrss']))]
+
+        out.append('\nby phase:')
+        for phase in report['phases']:
+            labels = ' '.join(phase['labels'].values())
+            out.append('  %-12s %-10s %10s traced %10s peak' % (
+                phase['phase'], labels, _format_size(phase['current']), _format_size(phase['peak'])))
+            for growth in phase['growth'][:3]:
+                out.append('      %+10s  %s' % (_format_size(growth['size_diff']), growth['where']))
+
+        out.append('\nby object type:')
+        for name, entry in sorted(report['classes'].items(), key=lambda c: -c[1]['size']):
+            out.append('  %-16s %9i objects %10s' % (name, entry['count'], _format_size(entry['size'])))
+
+        out.append('\nlargest contributors:')
+        for contributor in report['contributors'][:self._top]:
+            out.append('  %10s  %s' % (_format_size(contributor['size']), contributor['name']))
+        return '\n'.join(out) + '\n'
+
+
+def start_memory_report():
+    ''' produce a memory report, registered to record the memory at every phase boundary '''
+    report = MemoryReport()
+    LISTENERS.append(report)
+    return report
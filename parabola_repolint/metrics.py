@@ -0,0 +1,168 @@
+'''
+counters, gauges and histograms of the runs, exported in the text format of
+the prometheus node exporter textfile collector
+'''
+
+import os
+import math
+import time
+import threading
+
+from parabola_repolint.timing import LISTENERS, TimingListener
+
+
+# the upper bounds of the histogram buckets, in seconds
+PHASE_BUCKETS = [0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800]
+COMMAND_BUCKETS = [0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60, 300]
+
+
+def _format_value(value):
+    ''' produce a sample value in the exposition format '''
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    ''' produce the label set of a sample in the exposition format '''
+    if not labels:
+        return ''
+    escape = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{%s}' % ','.join('%s="%s"' % (k, escape(v)) for k, v in labels)
+
+
+class Metrics():
+    ''' a registry of labelled counters, gauges and histograms '''
+
+    def __init__(self):
+        ''' constructor '''
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._values = {}
+
+    def describe(self, name, kind, text, buckets=None):
+        ''' declare a metric of the given kind: counter, gauge or histogram '''
+        self._meta[name] = (kind, text, buckets)
+        self._values[name] = {}
+
+    def inc(self, name, value=1, **labels):
+        ''' increase a counter '''
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self._values[name]
+            values[key] = values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        ''' set a gauge '''
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[name][key] = value
+
+    def observe(self, name, value, **labels):
+        ''' record an observation in a histogram '''
+        key = tuple(sorted(labels.items()))
+        buckets = self._meta[name][2]
+        with self._lock:
+            values = self._values[name]
+            if key not in values:
+                values[key] = [[0] * len(buckets), 0.0, 0]
+            counts, _, _ = entry = values[key]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def clear(self, name):
+        ''' forget all samples of a metric, for gauges describing a single run '''
+        with self._lock:
+            self._values[name] = {}
+
+    def format(self):
+        ''' produce all metrics in the prometheus text exposition format '''
+        out = []
+        with self._lock:
+            for name, (kind, text, buckets) in sorted(self._meta.items()):
+                out.append('# HELP %s %s' % (name, text))
+                out.append('# TYPE %s %s' % (name, kind))
+                for key, value in sorted(self._values[name].items()):
+                    if kind != 'histogram':
+                        out.append('%s%s %s' % (name, _format_labels(key), _format_value(value)))
+                        continue
+                    counts, total, count = value
+                    for bound, bucket in zip(buckets + [math.inf], counts + [count]):
+                        labels = key + (('le', _format_value(bound)),)
+                        out.append('%s_bucket%s %i' % (name, _format_labels(labels), bucket))
+                    out.append('%s_sum%s %s' % (name, _format_labels(key), _format_value(total)))
+                    out.append('%s_count%s %i' % (name, _format_labels(key), count))
+        return '\n'.join(out) + '\n'
+
+    def write_textfile(self, path):
+        '''
+        write the metrics to a file for the textfile collector, replacing it
+        atomically so that it is never scraped half written
+        '''
+        path = os.path.expanduser(path)
+        tmp = '%s.%i.tmp' % (path, os.getpid())
+        with open(tmp, 'w') as outfile:
+            outfile.write(self.format())
+        os.replace(tmp, path)
+
+
+METRICS = Metrics()
+METRICS.describe('repolint_phase_duration_seconds', 'histogram',
+                 'duration of the phases of a run, by phase and repo', PHASE_BUCKETS)
+METRICS.describe('repolint_command_duration_seconds', 'histogram',
+                 'duration of the external commands, by command', COMMAND_BUCKETS)
+METRICS.describe('repolint_cache_requests_total', 'counter',
+                 'lookups of cached package metadata, by cache and result')
+METRICS.describe('repolint_objects', 'gauge',
+                 'objects loaded in the latest run, by repo and type')
+METRICS.describe('repolint_check_objects_total', 'counter',
+                 'objects visited by the checks, by check')
+METRICS.describe('repolint_check_duration_seconds', 'gauge',
+                 'wall time spent in each check in the latest run')
+METRICS.describe('repolint_check_issues', 'gauge',
+                 'issues found by each check in the latest run')
+METRICS.describe('repolint_last_run_timestamp_seconds', 'gauge',
+                 'the end time of the latest run')
+
+
+class _MetricsListener(TimingListener):
+    ''' record the durations of the phases and external commands '''
+
+    def phase_ended(self, name, labels, wall):
+        ''' record the duration of a phase '''
+        METRICS.observe('repolint_phase_duration_seconds', wall, phase=name, **labels)
+
+    def command_ended(self, name, obj, wall, cpu):
+        ''' record the duration of an external command '''
+        METRICS.observe('repolint_command_duration_seconds', wall, command=name)
+
+
+LISTENERS.append(_MetricsListener())
+
+
+def record_cache(cache, hit):
+    ''' record a lookup of cached metadata '''
+    METRICS.inc('repolint_cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+
+def record_run(linter, cache):
+    ''' record the loaded objects and the check results of a finished run '''
+    METRICS.clear('repolint_objects')
+    repos = list(cache.arch_repos.values()) + list(cache.repos.values())
+    for repo in repos:
+        for kind in ['pkgbuilds', 'pkgentries', 'pkgfiles', 'quarantined']:
+            METRICS.set('repolint_objects', len(getattr(repo, kind)), repo=repo.name, type=kind)
+    METRICS.set('repolint_objects', len(cache.keyring), repo='', type='keys')
+
+    METRICS.clear('repolint_check_duration_seconds')
+    METRICS.clear('repolint_check_issues')
+    for check in linter.enabled_checks:
+        METRICS.inc('repolint_check_objects_total', check.timing.visited, check=check.name)
+        METRICS.set('repolint_check_duration_seconds', check.timing.wall, check=check.name)
+        METRICS.set('repolint_check_issues', len(check.issues), check=check.name)
+
+    end_time = linter.end_time.timestamp() if linter.end_time else time.time()
+    METRICS.set('repolint_last_run_timestamp_seconds', end_time)
@@ -3,99 +3,24 @@ repolint results publishing helpers
 '''
 
 import os
-import time
-import lzma
-import tempfile
+import json
 import smtplib
-import datetime
-
-import selenium
-import splinter
-
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
 
 from parabola_repolint.config import CONFIG
+from parabola_repolint.etherpad import EtherpadClient, split_pad_url
+from parabola_repolint.archive import DigestArchive
 
 
 def etherpad_replace(content):
-    ''' replace the pads content with the given data '''
-    pad = CONFIG.notify.etherpad_url
-
-    browser = splinter.Browser(headless=True)
-    browser.visit(pad)
-
-    with tempfile.NamedTemporaryFile('w', suffix=".txt") as tmp:
-
-        tmp.write(content)
-        tmp.flush()
-
-        WebDriverWait(browser.driver, 10).until(
-            EC.presence_of_element_located((By.NAME, "ace_outer"))
-        )
-
-        outer = browser.driver.find_element_by_name('ace_outer')
-        browser.driver.switch_to.frame(outer)
-
-        WebDriverWait(browser.driver, 10).until(
-            EC.presence_of_element_located((By.NAME, "ace_inner"))
-        )
-
-        inner = browser.driver.find_element_by_name('ace_inner')
-        browser.driver.switch_to.frame(inner)
-
-        WebDriverWait(browser.driver, 10).until(
-            EC.presence_of_element_located((By.ID, "innerdocbody"))
-        )
-
-        browser.driver.switch_to.default_content()
-        outer = browser.driver.find_element_by_name('ace_outer')
-        browser.driver.switch_to.frame(outer)
-
-        e = browser.driver.find_element_by_name('ace_inner')
-        e.click()
-
-        action = ActionChains(browser.driver)
-        action.key_down(Keys.CONTROL)
-        action.send_keys("a")
-        action.key_up(Keys.CONTROL)
-        action.send_keys(Keys.BACKSPACE)
-        action.send_keys("update incoming...\n")
-        action.perform();
-
-        time.sleep(0.2)
-
-        browser.driver.switch_to.default_content()
+    ''' replace the pads content with the given data through the etherpad api '''
+    base_url, pad_id = split_pad_url(CONFIG.notify.etherpad_url)
 
-        #browser.screenshot("/tmp/%s.png" % datetime.datetime.now())
-
-        btn = browser.driver.find_element_by_class_name('buttonicon-import_export')
-        btn.click()
-
-        time.sleep(1)
-        #browser.screenshot("/tmp/%s.png" % datetime.datetime.now())
-
-        fileinput = browser.driver.find_element_by_id('importfileinput')
-        fileinput.send_keys(tmp.name)
-
-        time.sleep(1)
-        #browser.screenshot("/tmp/%s.png" % datetime.datetime.now())
-
-        WebDriverWait(browser.driver, 10).until(
-            EC.visibility_of_element_located((By.ID, "importsubmitinput"))
-        )
-
-        submit = browser.driver.find_element_by_id('importsubmitinput')
-        submit.click()
-
-        time.sleep(1)
-        browser.driver.switch_to_alert().accept()
-
-        time.sleep(1)
-        browser.quit()
+    client = EtherpadClient(
+        base_url,
+        CONFIG.notify.get('etherpad_apikey', None),
+        timeout=CONFIG.notify.get('etherpad_timeout', 10),
+    )
+    client.set_text(pad_id, content, CONFIG.notify.get('etherpad_chunk_size', 100000))
 
 
 def send_mail(subject, body):
@@ -123,10 +48,30 @@ Subject: %s
         smtp.sendmail(sender, [receiver], message)
 
 
-def write_log(filename, contents):
-    ''' produce a logfile with linter results '''
+def digest_archive():
+    ''' produce the archive of past digests below the logfile destination '''
+    dst = os.path.expanduser(CONFIG.notify.logfile_dest)
+    return DigestArchive(
+        os.path.join(dst, 'archive'),
+        snapshot_interval=CONFIG.notify.get('archive_snapshot_interval', 24),
+        retention_days=CONFIG.notify.get('archive_retention_days', None),
+    )
+
+
+def archive_digest(time, contents):
+    ''' add the digest of a run to the archive of past digests '''
+    digest_archive().add(time, contents)
+
+
+def open_sidecar(filename):
+    ''' open a machine-readable file next to the logfiles '''
     dst = os.path.expanduser(CONFIG.notify.logfile_dest)
     os.makedirs(dst, exist_ok=True)
 
-    with lzma.open(os.path.join(dst, filename) + '.xz', 'wt') as logfile:
-        logfile.write(contents)
+    return open(os.path.join(dst, filename), 'w')
+
+
+def write_sidecar(filename, data):
+    ''' produce a machine-readable json file next to the logfiles '''
+    with open_sidecar(filename) as outfile:
+        outfile.write(json.dumps(data, indent=4, sort_keys=True, default=str))
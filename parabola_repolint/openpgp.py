@@ -0,0 +1,195 @@
+'''
+a minimal OpenPGP packet parser (RFC 4880 and its v5 extensions), extracting
+the issuer and creation time of signatures without running gpg
+'''
+
+import base64
+
+
+# packet tags
+TAG_SIGNATURE = 2
+
+# signature subpacket types
+SUBPACKET_CREATION_TIME = 2
+SUBPACKET_EXPIRATION_TIME = 3
+SUBPACKET_ISSUER = 16
+SUBPACKET_ISSUER_FINGERPRINT = 33
+
+
+class PacketError(ValueError):
+    ''' raised when data is not a well-formed OpenPGP packet sequence '''
+
+
+def _uint(data, pos, size):
+    ''' read a big endian unsigned integer of size octets at pos '''
+    if pos + size > len(data):
+        raise PacketError('truncated packet at offset %i' % pos)
+    return int.from_bytes(data[pos:pos + size], 'big')
+
+
+def _new_length(data, pos):
+    '''
+    read a new format packet length at pos. produces the length, the position
+    after it, and whether the length is a partial body length.
+    '''
+    first = _uint(data, pos, 1)
+    if first < 192:
+        return first, pos + 1, False
+    if first < 224:
+        return ((first - 192) << 8) + _uint(data, pos + 1, 1) + 192, pos + 2, False
+    if first == 255:
+        return _uint(data, pos + 1, 4), pos + 5, False
+    return 1 << (first & 0x1F), pos + 1, True
+
+
+def _read_body(data, pos, length):
+    ''' read a packet body of the given length at pos '''
+    if pos + length > len(data):
+        raise PacketError('truncated packet body at offset %i' % pos)
+    return data[pos:pos + length], pos + length
+
+
+def iter_packets(data):
+    ''' produce the (tag, body) pairs of the packets in old or new format in data '''
+    pos = 0
+    while pos < len(data):
+        header = data[pos]
+        if not header & 0x80:
+            raise PacketError('invalid packet header 0x%02x at offset %i' % (header, pos))
+
+        if header & 0x40:
+            tag = header & 0x3F
+            length, pos, partial = _new_length(data, pos + 1)
+            body, pos = _read_body(data, pos, length)
+            while partial:
+                length, pos, partial = _new_length(data, pos)
+                chunk, pos = _read_body(data, pos, length)
+                body += chunk
+        else:
+            tag = (header >> 2) & 0x0F
+            length_type = header & 0x03
+            if length_type == 3:
+                length, pos = len(data) - pos - 1, pos + 1
+            else:
+                size = 1 << length_type
+                length, pos = _uint(data, pos + 1, size), pos + 1 + size
+            body, pos = _read_body(data, pos, length)
+
+        yield tag, bytes(body)
+
+
+def _iter_subpackets(data):
+    ''' produce the (type, body) pairs of a signature subpacket area '''
+    pos = 0
+    while pos < len(data):
+        length, pos, partial = _new_length(data, pos)
+        if partial or length < 1:
+            raise PacketError('invalid subpacket length at offset %i' % pos)
+        if pos + length > len(data):
+            raise PacketError('truncated subpacket at offset %i' % pos)
+        yield data[pos] & 0x7F, data[pos + 1:pos + length]
+        pos += length
+
+
+class Signature():
+    ''' the metadata of a signature packet '''
+
+    def __init__(self, body):
+        ''' constructor, parsing the body of a signature packet '''
+        self.version = _uint(body, 0, 1)
+        self.created = None
+        self.expires = None
+        self.issuer = None
+        self.issuer_fingerprint = None
+
+        if self.version == 3:
+            self.sig_type = _uint(body, 2, 1)
+            self.created = _uint(body, 3, 4)
+            self.issuer = body[7:15].hex().upper()
+            self.pubkey_algo = _uint(body, 15, 1)
+            self.hash_algo = _uint(body, 16, 1)
+            return
+
+        if self.version not in (4, 5):
+            raise PacketError('unsupported signature version %i' % self.version)
+
+        self.sig_type = _uint(body, 1, 1)
+        self.pubkey_algo = _uint(body, 2, 1)
+        self.hash_algo = _uint(body, 3, 1)
+
+        hashed_len = _uint(body, 4, 2)
+        hashed = body[6:6 + hashed_len]
+        unhashed_len = _uint(body, 6 + hashed_len, 2)
+        unhashed = body[8 + hashed_len:8 + hashed_len + unhashed_len]
+
+        for area in (hashed, unhashed):
+            for kind, data in _iter_subpackets(area):
+                if kind == SUBPACKET_CREATION_TIME and self.created is None:
+                    self.created = _uint(data, 0, 4)
+                elif kind == SUBPACKET_EXPIRATION_TIME and self.expires is None:
+                    self.expires = _uint(data, 0, 4)
+                elif kind == SUBPACKET_ISSUER and self.issuer is None:
+                    self.issuer = data[:8].hex().upper()
+                elif kind == SUBPACKET_ISSUER_FINGERPRINT and self.issuer_fingerprint is None:
+                    self.issuer_fingerprint = data[1:].hex().upper()
+
+    @property
+    def key_id(self):
+        '''
+        produce the long id of the issuing key, from the issuer subpacket or
+        else derived from the issuer fingerprint, or None
+        '''
+        if self.issuer is not None:
+            return self.issuer
+        if self.issuer_fingerprint is None:
+            return None
+        if len(self.issuer_fingerprint) == 64:
+            return self.issuer_fingerprint[:16]
+        return self.issuer_fingerprint[-16:]
+
+    def __repr__(self):
+        ''' produce a short human-readable summary '''
+        return 'v%i signature by %s at %s' % (self.version, self.key_id, self.created)
+
+
+def dearmor(data):
+    ''' produce the binary packets of ascii armored data, or data if it is binary '''
+    if not data.lstrip().startswith(b'-----BEGIN PGP'):
+        return data
+
+    lines = data.decode('ascii').strip().splitlines()
+    body = []
+    in_body = False
+    for line in lines[1:]:
+        if line.startswith('-----END') or line.startswith('='):
+            break
+        if in_body:
+            body.append(line.strip())
+        elif not line.strip():
+            in_body = True
+    return base64.b64decode(''.join(body))
+
+
+def read_signatures(data):
+    ''' produce the signatures in binary or ascii armored data '''
+    return [Signature(body) for tag, body in iter_packets(dearmor(data)) if tag == TAG_SIGNATURE]
+
+
+def read_signature(data):
+    ''' produce the first signature in binary or ascii armored data '''
+    signatures = read_signatures(data)
+    if not signatures:
+        raise PacketError('no signature packet found')
+    return signatures[0]
+
+
+def read_signature_file(path):
+    ''' produce the first signature in a detached signature file '''
+    with open(path, 'rb') as infile:
+        return read_signature(infile.read())
+
+
+def read_pgpsig(pgpsig):
+    ''' produce the signature of a base64 encoded repo.db PGPSIG field '''
+    return read_signature(base64.b64decode(pgpsig))
+
@@ -0,0 +1,197 @@
+'''
+parallel execution of linter checks in forked worker processes
+'''
+
+import gc
+import time
+import pickle
+import logging
+import multiprocessing
+
+from parabola_repolint.timing import CheckTiming, LISTENERS, phase
+from parabola_repolint.timing import take_subprocess_timings, merge_subprocess_timings
+
+
+# the number of tasks each worker gets on average, to balance uneven objects
+CHUNKS_PER_JOB = 8
+
+
+# the state shared with the forked workers, set up before the fork
+_STATE = None
+
+
+def pack_issue(issue, obj, keys=None):
+    '''
+    convert an issue into a plain tuple that can be stored as json, for later
+    runs or other processes not sharing the loaded objects. the checked
+    object is replaced by a reference, other loaded objects found in keys,
+    by id, are replaced by their stable key, and any other non-trivial
+    argument is replaced by its string representation.
+    '''
+    refs = []
+    args = []
+    objects = []
+    for i, arg in enumerate(issue):
+        if arg is obj:
+            refs.append(i)
+            args.append(None)
+        elif isinstance(arg, (str, int, float)) or arg is None:
+            args.append(arg)
+        elif keys is not None and id(arg) in keys:
+            objects.append((i, keys[id(arg)]))
+            args.append(None)
+        else:
+            args.append(str(arg))
+    if objects:
+        return (refs, args, objects)
+    return (refs, args)
+
+
+def unpack_issue(packed, obj, objects=None):
+    '''
+    restore an issue packed by pack_issue with the given object, and the
+    loaded objects by stable key. raises KeyError if an object is missing.
+    '''
+    refs, args = packed[0], list(packed[1])
+    for i in refs:
+        args[i] = obj
+    for i, key in (packed[2] if len(packed) > 2 else []):
+        args[i] = objects[key]
+    return tuple(args)
+
+
+def _pack_result(issue, obj, registry):
+    '''
+    convert an issue found in a worker into a tuple to send to the parent.
+    the checked object and any other loaded object are replaced by
+    references, resolved by _unpack_result in the parent. other arguments
+    are sent as they are.
+    '''
+    refs = []
+    args = []
+    for i, arg in enumerate(issue):
+        if arg is obj:
+            refs.append((i, None))
+            args.append(None)
+        elif isinstance(arg, (str, int, float)) or arg is None:
+            args.append(arg)
+        elif id(arg) in registry:
+            refs.append((i, registry[id(arg)]))
+            args.append(None)
+        else:
+            try:
+                pickle.dumps(arg)
+                args.append(arg)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                logging.warning('%s: cannot send issue argument %r, sending its string', issue[0], arg)
+                args.append(str(arg))
+    return (refs, args)
+
+
+def _unpack_result(packed, obj, shared):
+    ''' restore an issue packed by _pack_result with the checked and loaded objects '''
+    refs, args = packed
+    args = list(args)
+    for i, pos in refs:
+        args[i] = obj if pos is None else shared[pos]
+    return tuple(args)
+
+
+def _run_task(task):
+    ''' run all checks of a type on a slice of objects in a worker process '''
+    linter, checks, objects, _, registry = _STATE
+    check_type, start, stop = task
+    wall = time.perf_counter()
+
+    # pylint: disable=protected-access
+    for check in checks[check_type]:
+        check._timing = CheckTiming()
+    # drop the statistics inherited from the parent, or of the previous task
+    take_subprocess_timings()
+    if linter.incremental is not None:
+        linter.incremental.track_updates = True
+
+    res = []
+    with phase('check_pass', type=check_type.name, objects='%i-%i' % (start, stop)):
+        for i in range(start, stop):
+            obj = objects[check_type][i]
+            for idx, check in enumerate(checks[check_type]):
+                before = len(check.issues)
+                linter._try_check(check, obj)
+                for issue in check.issues[before:]:
+                    res.append((idx, i, _pack_result(issue, obj, registry)))
+                del check.issues[before:]
+
+    index = {id(objects[check_type][i]): i for i in range(start, stop)}
+    timings = [c.timing.map_objects(lambda o: index[id(o)]) for c in checks[check_type]]
+    updates = linter.incremental.take_updates() if linter.incremental is not None else []
+    listener_updates = [listener.take_updates() for listener in LISTENERS]
+    subprocesses = {
+        n: t.map_objects(lambda o: registry.get(id(o), str(o)))
+        for n, t in take_subprocess_timings().items()
+    }
+    return res, timings, updates, listener_updates, subprocesses, time.perf_counter() - wall
+
+
+def make_tasks(checks, objects, jobs):
+    ''' split the work of all check types into slices of objects '''
+    tasks = []
+    for check_type in checks:
+        count = len(objects[check_type])
+        size = max(1, -(-count // (jobs * CHUNKS_PER_JOB)))
+        for start in range(0, count, size):
+            tasks.append((check_type, start, min(start + size, count)))
+    return tasks
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def run_checks(linter, checks, objects, jobs, shared=()):
+    '''
+    run the given checks, grouped by check type, on the objects of their type
+    in a pool of forked workers, and merge the found issues back into the
+    checks in the order a sequential run would have produced them. issue
+    arguments found in shared, the loaded objects of all check types, are
+    resolved to the same objects a sequential run refers to. produces the
+    time the workers spent on each check type.
+    '''
+    global _STATE # pylint: disable=global-statement
+
+    tasks = make_tasks(checks, objects, jobs)
+    type_timing = {t: 0.0 for t in checks}
+    logging.info('running checks in %i tasks on %i workers', len(tasks), jobs)
+
+    shared = list(shared)
+    registry = {}
+    for pos, obj in enumerate(shared):
+        registry.setdefault(id(obj), pos)
+    _STATE = (linter, checks, objects, shared, registry)
+
+    def resolve(ref):
+        ''' produce the object of a reference taken by a worker '''
+        return shared[ref] if isinstance(ref, int) else ref
+
+    # move the loaded object graph out of reach of the garbage collector, so
+    # that the workers do not touch, and thereby copy, the shared pages
+    gc.freeze()
+    try:
+        with multiprocessing.get_context('fork').Pool(jobs) as pool:
+            results = pool.imap(_run_task, tasks)
+            for task, result in zip(tasks, results):
+                res, timings, updates, listener_updates, subprocesses, wall = result
+                check_type = task[0]
+                objs = objects[check_type]
+                for idx, i, packed in res:
+                    checks[check_type][idx].issues.append(_unpack_result(packed, objs[i], shared))
+                for check, timing in zip(checks[check_type], timings):
+                    check.timing.merge(timing.map_objects(lambda i, o=objs: o[i]))
+                type_timing[check_type] += wall
+                if linter.incremental is not None:
+                    linter.incremental.merge_updates(updates)
+                for listener, update in zip(LISTENERS, listener_updates):
+                    listener.merge_updates(update)
+                merge_subprocess_timings({n: t.map_objects(resolve) for n, t in subprocesses.items()})
+    finally:
+        gc.unfreeze()
+        _STATE = None
+
+    return type_timing
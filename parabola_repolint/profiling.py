@@ -0,0 +1,183 @@
+'''
+cProfile profiles scoped to the load phases of a run and to the single checks
+'''
+
+import os
+import io
+import re
+import pstats
+import cProfile
+import logging
+import threading
+
+from parabola_repolint.timing import LISTENERS, TimingListener
+
+
+# the default number of functions listed per scope in the summary
+PROFILE_TOP = 15
+
+
+class _RawStats():
+    ''' the raw stats of a profile, in the form pstats.Stats loads them from '''
+
+    def __init__(self, stats):
+        ''' constructor '''
+        self.stats = stats
+
+    def create_stats(self):
+        ''' nothing to do, the stats are already there '''
+
+
+def _enable(profile):
+    '''
+    enable a profile in the current thread. produces whether that worked, as
+    only one profiler may be active at a time on pythons using sys.monitoring.
+    '''
+    try:
+        profile.enable()
+        return True
+    except ValueError:
+        return False
+
+
+class Profiler(TimingListener):
+    '''
+    profile each phase and each check separately. nested scopes pause the
+    profile of the enclosing scope, so that every profile covers the time
+    spent in its own scope only, e.g. the profile of a check pass excludes the
+    checks themselves.
+    '''
+
+    def __init__(self, directory, top=PROFILE_TOP):
+        ''' constructor '''
+        self._dir = directory
+        self._top = top
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._raw = []
+        self._checks = {}
+
+    def _stack(self):
+        ''' produce the stack of active profiles of the current thread '''
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _push(self, profile):
+        ''' pause the enclosing profile and start the given one '''
+        stack = self._stack()
+        if stack and stack[-1] is not None:
+            stack[-1].disable()
+        stack.append(profile if _enable(profile) else None)
+
+    def _pop(self):
+        '''
+        stop the innermost profile and resume the enclosing one. produces the
+        stopped profile.
+        '''
+        stack = self._stack()
+        profile = stack.pop()
+        if profile is not None:
+            profile.disable()
+        if stack and stack[-1] is not None:
+            _enable(stack[-1])
+        return profile
+
+    def _record(self, scope, profile):
+        ''' keep the stats of a finished profile '''
+        profile.create_stats()
+        with self._lock:
+            self._raw.append((os.getpid(), scope, profile.stats))
+
+    def phase_started(self, name, labels):
+        ''' start the profile of a phase '''
+        self._push(cProfile.Profile())
+
+    def phase_ended(self, name, labels, wall):
+        ''' stop and keep the profile of a phase '''
+        profile = self._pop()
+        if profile is not None:
+            labels = [str(v) for k, v in sorted(labels.items()) if k != 'objects']
+            self._record('-'.join(['phase', name] + labels), profile)
+
+    def check_started(self, check, obj):
+        ''' resume the profile of a check '''
+        key = (os.getpid(), check)
+        if key not in self._checks:
+            self._checks[key] = cProfile.Profile()
+        self._push(self._checks[key])
+
+    def check_ended(self, check, obj, start, wall):
+        ''' pause the profile of a check '''
+        self._pop()
+
+    def _collect_checks(self):
+        ''' move the check profiles of this process to the finished profiles '''
+        pid = os.getpid()
+        for key in [k for k in self._checks if k[0] == pid]:
+            self._record('check-%s' % key[1].name, self._checks.pop(key))
+
+    def take_updates(self):
+        ''' produce and forget the profiles recorded in this worker process '''
+        self._collect_checks()
+        pid = os.getpid()
+        with self._lock:
+            res = [r for r in self._raw if r[0] == pid]
+            self._raw = [r for r in self._raw if r[0] != pid]
+        return res
+
+    def merge_updates(self, updates):
+        ''' add the profiles recorded in a worker process '''
+        with self._lock:
+            self._raw.extend(updates)
+
+    def clear(self):
+        ''' forget all recorded profiles, to start the profiles of the next run '''
+        with self._lock:
+            self._raw = []
+            self._checks = {}
+
+    def stats(self):
+        ''' produce the merged pstats.Stats of all recorded profiles by scope '''
+        self._collect_checks()
+        res = {}
+        with self._lock:
+            for _, scope, raw in self._raw:
+                if scope in res:
+                    res[scope].add(_RawStats(dict(raw)))
+                else:
+                    res[scope] = pstats.Stats(_RawStats(dict(raw)))
+        return res
+
+    def _format_top(self, scope, stats):
+        ''' produce the hottest functions of a scope by own time '''
+        out = io.StringIO()
+        out.write('%s: %.3fs, %i calls\n' % (scope, stats.total_tt, stats.total_calls))
+        rows = sorted(stats.stats.items(), key=lambda s: -s[1][2])[:self._top]
+        for (filename, line, func), (_, calls, tottime, cumtime, _) in rows:
+            out.write('  %9.3fs %9.3fs %9i  %s:%i(%s)\n' % (
+                tottime, cumtime, calls, os.path.basename(filename), line, func))
+        return out.getvalue()
+
+    def write(self):
+        ''' write a pstats file per scope and a summary of the hottest functions '''
+        os.makedirs(self._dir, exist_ok=True)
+        stats = self.stats()
+
+        summary = []
+        for scope, scope_stats in sorted(stats.items(), key=lambda s: -s[1].total_tt):
+            filename = re.sub(r'[^\w.-]', '_', scope) + '.pstats'
+            scope_stats.dump_stats(os.path.join(self._dir, filename))
+            summary.append(self._format_top(scope, scope_stats))
+
+        with open(os.path.join(self._dir, 'summary.txt'), 'w') as outfile:
+            outfile.write('\n'.join(summary))
+        logging.info('wrote %i profiles to %s, hottest scopes:\n%s', len(stats), self._dir,
+                     '\n'.join(summary[:5]))
+
+
+def start_profile(directory, top=PROFILE_TOP):
+    ''' produce a profiler, registered to profile the phases and checks of the run '''
+    profiler = Profiler(directory, top)
+    LISTENERS.append(profiler)
+    return profiler
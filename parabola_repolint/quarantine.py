@@ -0,0 +1,65 @@
+'''
+a persistent list of objects that are skipped after external commands on them
+timed out, until their inputs change
+'''
+
+import os
+import json
+import logging
+import datetime
+
+
+class Quarantine():
+    ''' the quarantined objects by key, with the input digest they failed on '''
+
+    def __init__(self, path=None):
+        ''' constructor. without a path, the quarantine is not persisted '''
+        self._path = path
+        self._previous = {}
+        self._current = {}
+
+        if path is not None and os.path.isfile(path):
+            try:
+                with open(path, 'r') as infile:
+                    self._previous = json.loads(infile.read())
+            except ValueError:
+                logging.exception('discarding corrupt quarantine %s', path)
+
+    def get(self, key, digest):
+        '''
+        produce the reason an object is quarantined for, or None if it is not,
+        or if its inputs changed since
+        '''
+        entry = self._previous.get(key, None)
+        if entry is None or entry['digest'] != digest:
+            return None
+        self._current[key] = entry
+        return entry['reason']
+
+    def add(self, key, digest, reason):
+        ''' quarantine an object until its inputs change '''
+        self._current[key] = {
+            'digest': digest,
+            'reason': reason,
+            'since': datetime.datetime.now().isoformat(),
+        }
+
+    def discard(self, key):
+        ''' drop an object from the quarantine '''
+        self._previous.pop(key, None)
+        self._current.pop(key, None)
+
+    def __len__(self):
+        ''' produce the number of quarantined objects in the current run '''
+        return len(self._current)
+
+    def save(self):
+        ''' persist the objects quarantined in the current run '''
+        if self._path is None:
+            return
+
+        logging.info('quarantined objects: %i', len(self._current))
+        tmp = self._path + '.tmp'
+        with open(tmp, 'w') as outfile:
+            outfile.write(json.dumps(self._current, indent=4, sort_keys=True))
+        os.replace(tmp, self._path)
@@ -5,16 +5,27 @@ repo cache management classes
 import os
 import sys
 import json
+import time
 import shutil
+import hashlib
 import logging
 import datetime
+import threading
+import concurrent.futures
 
 import sh
 from pyalpm import vercmp
 from xdg import BaseDirectory
 
 from parabola_repolint.config import CONFIG
-from parabola_repolint.gnupg import GPG_PACMAN
+from parabola_repolint.gnupg import GPG_PACMAN, verify_file
+from parabola_repolint.openpgp import PacketError, read_pgpsig, read_signature_file
+from parabola_repolint.fileindex import FileIndex
+from parabola_repolint.commands import CommandTimeout, run
+from parabola_repolint.timing import phase
+from parabola_repolint.metrics import record_cache
+from parabola_repolint.quarantine import Quarantine
+from parabola_repolint.changes import ChangeFeed, KINDS
 
 
 class PkgVersion():
@@ -79,6 +90,11 @@ class PkgVersion():
         return self._version_str
 
 
+def _digest(*parts):
+    ''' produce a short digest of the given parts '''
+    return hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+
+
 BUILDINFO_VALUE = [
     'format',
     'pkgname',
@@ -129,76 +145,84 @@ PKGINFO_LIST = [
 ]
 
 
+# the extensions of the cached metadata files stored next to a package file
+PKGFILE_SIDECARS = ['.pkginfo', '.buildinfo', '.siginfo']
+
+
+def _stat_sig(path):
+    ''' produce the modification time and size of the detached signature of a package, or None '''
+    try:
+        stat = os.stat(path + '.sig')
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime, stat.st_size)
+
+
+def _is_pkgfile(filename):
+    ''' test whether a file name is the name of a package file '''
+    for ext in ['gz', 'bz2', 'xz', 'zst', 'Z']:
+        if filename.endswith('.pkg.tar.%s' % ext):
+            return True
+    return False
+
+
+def _changed_package(filename):
+    ''' produce the package file a changed file belongs to, the package of a detached signature '''
+    if filename.endswith('.sig'):
+        return filename[:-len('.sig')]
+    return filename
+
+
+def _repodb_changed(name, change):
+    ''' test whether the repo.db of the named repo is among the changed files of an arch '''
+    if change is None:
+        return False
+    changed = change['added'] + change['updated'] + change['deleted']
+    return any(f.startswith('%s.db' % name) for f in changed)
+
+
 class PkgFile():
     ''' represent a parabola pkg.tar.xz file '''
 
-    def __init__(self, repo, path, repoarch):
-        ''' constructor '''
+    def __init__(self, repo, path, repoarch, previous=None):
+        '''
+        constructor. the metadata of a previous pkgfile of the same path,
+        unchanged since it was loaded, is reused without touching the files.
+        '''
         self._repo = repo
         self._path = path
 
         self._repoarch = repoarch
+        self._repr = None
+        self._signature = None
 
         self._pkginfo = {}
         self._buildinfo = {}
         self._siginfo = {}
 
         self._fs_error = None
-
-        try:
-            mtime = os.path.getmtime(self._path)
-
-            pkginfo = self._cached_pkginfo(path + '.pkginfo', mtime)
-            for line in pkginfo.splitlines():
-                if line.startswith('#'):
-                    continue
-
-                key, value = line.split('=', 1)
-                key = key.strip()
-                value = value.strip()
-
-                if key in PKGINFO_VALUE:
-                    self._pkginfo[key] = value
-                elif key in PKGINFO_SET:
-                    if key not in self._pkginfo:
-                        self._pkginfo[key] = set()
-                    self._pkginfo[key].add(value)
-                elif key in PKGINFO_LIST:
-                    if key not in self._pkginfo:
-                        self._pkginfo[key] = list()
-                    self._pkginfo[key].append(value)
-                else:
-                    logging.warning('unhandled PKGINFO key: %s', key)
-
-            buildinfo = self._cached_buildinfo(path + '.buildinfo', mtime)
-            for line in buildinfo.splitlines():
-                key, value = line.split('=', 1)
-                key = key.strip()
-                value = value.strip()
-
-                if key in BUILDINFO_VALUE:
-                    self._buildinfo[key] = value
-                elif key in BUILDINFO_SET:
-                    if key not in self._buildinfo:
-                        self._buildinfo[key] = set()
-                    self._buildinfo[key].add(value)
-                elif key in BUILDINFO_LIST:
-                    if key not in self._buildinfo:
-                        self._buildinfo[key] = list()
-                    self._buildinfo[key].append(value)
-                else:
-                    logging.warning('unhandled BUILDINFO key: %s', key)
-
-            self._siginfo = self._cached_siginfo(path + '.siginfo', mtime)
-        except FileNotFoundError as e:
-            self._fs_error = e
-            if 'pkgname' not in self._pkginfo:
-                filename = os.path.basename(self._path)
-                *pkgname, pkgver, pkgrel, pkgext  = filename.split('-')
-                pkgname = '-'.join(pkgname)
-                pkgext = pkgext.split('.')[0]
-                self._pkginfo['pkgname'] = pkgname
-            logging.exception(e)
+        self._mtime = None
+        self._sig_stat = None
+        self._fingerprint = None
+
+        self._quarantined = None
+
+        if previous is not None:
+            self._reuse(previous)
+        else:
+            self._load(repo)
+
+        if 'pkgname' not in self._pkginfo:
+            filename = os.path.basename(self._path)
+            *pkgname, pkgver, pkgrel, pkgext  = filename.split('-')
+            pkgname = '-'.join(pkgname)
+            pkgext = pkgext.split('.')[0]
+            self._pkginfo['pkgname'] = pkgname
+
+        if self._quarantined is not None:
+            self._pkgbuilds = []
+            self._pkgentries = []
+            return
 
         pkgbuild_cache = repo.pkgbuild_cache.get(repoarch, {})
         self._pkgbuilds = pkgbuild_cache.get(self.pkgname, [])
@@ -210,15 +234,94 @@ class PkgFile():
         for pkgentry in self._pkgentries:
             pkgentry.register_pkgfile(self, repoarch)
 
+    def _load(self, repo):
+        ''' load the package from disk, unless it is quarantined '''
+        try:
+            mtime = os.path.getmtime(self._path)
+            self._mtime = mtime
+            self._sig_stat = _stat_sig(self._path)
+
+            self._quarantined = repo.quarantine.get(str(self), self.input_digest)
+            if self._quarantined is None:
+                self._load_metadata(mtime)
+        except FileNotFoundError as e:
+            self._fs_error = e
+            logging.exception(e)
+        except CommandTimeout as e:
+            self._quarantined = str(e)
+            repo.quarantine.add(str(self), self.input_digest, self._quarantined)
+            logging.warning('%s: %s, quarantined', self, e)
+
+    # pylint: disable=protected-access
+    def _reuse(self, previous):
+        ''' take the metadata of the previous pkgfile of the same path '''
+        self._mtime = previous._mtime
+        self._sig_stat = previous._sig_stat
+        self._fs_error = previous._fs_error
+        self._quarantined = previous._quarantined
+        self._pkginfo = previous._pkginfo
+        self._buildinfo = previous._buildinfo
+        self._siginfo = previous._siginfo
+        self._signature = previous._signature
+
+    def _load_metadata(self, mtime):
+        ''' load the .PKGINFO, .BUILDINFO and signature of the package '''
+        path = self._path
+
+        pkginfo = self._cached_pkginfo(path + PKGFILE_SIDECARS[0], mtime)
+        for line in pkginfo.splitlines():
+            if line.startswith('#'):
+                continue
+
+            key, value = line.split('=', 1)
+            key = key.strip()
+            value = value.strip()
+
+            if key in PKGINFO_VALUE:
+                self._pkginfo[key] = value
+            elif key in PKGINFO_SET:
+                if key not in self._pkginfo:
+                    self._pkginfo[key] = set()
+                self._pkginfo[key].add(value)
+            elif key in PKGINFO_LIST:
+                if key not in self._pkginfo:
+                    self._pkginfo[key] = list()
+                self._pkginfo[key].append(value)
+            else:
+                logging.warning('unhandled PKGINFO key: %s', key)
+
+        buildinfo = self._cached_buildinfo(path + PKGFILE_SIDECARS[1], mtime)
+        for line in buildinfo.splitlines():
+            key, value = line.split('=', 1)
+            key = key.strip()
+            value = value.strip()
+
+            if key in BUILDINFO_VALUE:
+                self._buildinfo[key] = value
+            elif key in BUILDINFO_SET:
+                if key not in self._buildinfo:
+                    self._buildinfo[key] = set()
+                self._buildinfo[key].add(value)
+            elif key in BUILDINFO_LIST:
+                if key not in self._buildinfo:
+                    self._buildinfo[key] = list()
+                self._buildinfo[key].append(value)
+            else:
+                logging.warning('unhandled BUILDINFO key: %s', key)
+
+        self._siginfo = self._cached_siginfo(path + PKGFILE_SIDECARS[2], mtime)
+
     def _cached_pkginfo(self, cachefile, mtime):
         ''' get information from a package '''
         if os.path.isfile(cachefile) and os.path.getmtime(cachefile) > mtime:
+            record_cache('pkginfo', True)
             with open(cachefile, 'r') as infile:
                 return infile.read()
 
+        record_cache('pkginfo', False)
         res = ''
         try:
-            res = str(sh.tar('-xOf', self._path, '.PKGINFO'))
+            res = str(run('tar', self, sh.tar, '-xOf', self._path, '.PKGINFO'))
         except sh.ErrorReturnCode as ex:
             if b'.PKGINFO: Not found in archive' not in ex.stderr:
                 logging.exception('tar -xOf failed for %s', self)
@@ -231,12 +334,14 @@ class PkgFile():
     def _cached_buildinfo(self, cachefile, mtime):
         ''' get build information from a package '''
         if os.path.isfile(cachefile) and os.path.getmtime(cachefile) > mtime:
+            record_cache('buildinfo', True)
             with open(cachefile, 'r') as infile:
                 return infile.read()
 
+        record_cache('buildinfo', False)
         res = ''
         try:
-            res = str(sh.tar('-xOf', self._path, '.BUILDINFO'))
+            res = str(run('tar', self, sh.tar, '-xOf', self._path, '.BUILDINFO'))
         except sh.ErrorReturnCode as ex:
             if b'.BUILDINFO: Not found in archive' not in ex.stderr:
                 logging.exception('tar -xOf failed for %s', self)
@@ -249,12 +354,15 @@ class PkgFile():
     def _cached_siginfo(self, cachefile, mtime):
         ''' get signature information from a package '''
         if os.path.isfile(cachefile) and os.path.getmtime(cachefile) > mtime:
+            record_cache('siginfo', True)
             with open(cachefile, 'r') as infile:
                 return json.loads(infile.read())
 
+        record_cache('siginfo', False)
         sigfile = "%s.sig" % self._path
-        with open(sigfile, 'rb') as sig:
-            res = GPG_PACMAN.verify_file(sig, self._path).__dict__
+        if not os.path.isfile(sigfile):
+            raise FileNotFoundError(sigfile)
+        res = verify_file(sigfile, self._path, self).__dict__
 
         with open(cachefile, 'w') as outfile:
             outfile.write(json.dumps(res, default=str))
@@ -311,6 +419,38 @@ class PkgFile():
         ''' produce the signature info of the package '''
         return self._siginfo
 
+    @property
+    def signature(self):
+        ''' produce the parsed detached signature of the package, or None '''
+        if self._signature is None:
+            try:
+                self._signature = read_signature_file('%s.sig' % self._path)
+            except (OSError, PacketError) as e:
+                logging.warning('%s: unreadable signature: %s', self, e)
+                self._signature = False
+        return self._signature or None
+
+    @property
+    def quarantined(self):
+        ''' produce the reason the package is quarantined for, or None '''
+        return self._quarantined
+
+    @property
+    def input_digest(self):
+        ''' produce a digest of the inputs of the package itself, and of its detached signature '''
+        return _digest(self._path, self._mtime, self._sig_stat, str(self._fs_error))
+
+    @property
+    def fingerprint(self):
+        ''' produce a digest of the inputs of the package and its neighbours '''
+        if self._fingerprint is None:
+            self._fingerprint = _digest(
+                self.input_digest,
+                [p.input_digest for p in self._pkgentries],
+                [p.input_digest for p in self._pkgbuilds],
+            )
+        return self._fingerprint
+
     def link_keyring(self, key_cache):
         ''' link the package to its corresponding signing key '''
         signing_key = key_cache.get(self._siginfo['key_id'], None)
@@ -318,25 +458,53 @@ class PkgFile():
             signing_key['packages'].append(self)
 
     def __repr__(self):
-        ''' produce a string representation '''
-        path = self._path
-        path, pkgfile = os.path.split(path)
-        path, arch = os.path.split(path)
-        path, _ = os.path.split(path)
-        _, repo = os.path.split(path)
-        return "%s/%s/%s" % (repo, arch, pkgfile)
+        ''' produce a string representation, computed once '''
+        if self._repr is None:
+            path = self._path
+            path, pkgfile = os.path.split(path)
+            path, arch = os.path.split(path)
+            path, _ = os.path.split(path)
+            _, repo = os.path.split(path)
+            self._repr = "%s/%s/%s" % (repo, arch, pkgfile)
+        return self._repr
 
 
 class PkgEntry():
     ''' represent an entry in a repo.db '''
 
-    def __init__(self, repo, path, repoarch):
-        ''' constructor '''
+    def __init__(self, repo, path, repoarch, previous=None):
+        '''
+        constructor. the data of a previous pkgentry of the same path, from
+        an unchanged repo.db, is reused without reading the entry again.
+        '''
         self._repo = repo
         self._path = path
 
         self._repoarch = repoarch
+        self._repr = None
+        self._signature = None
+
+        if previous is not None:
+            # pylint: disable=protected-access
+            self._data = previous._data
+            self._signature = previous._signature
+        else:
+            self._data = self._read_data(path)
+
+        pkgbuild_cache = repo.pkgbuild_cache.get(repoarch, {})
+        self._pkgbuilds = pkgbuild_cache.get(self.pkgname, [])
+        for pkgbuild in self._pkgbuilds:
+            pkgbuild.register_pkgentry(self, repoarch)
+
+        self._pkgfiles = {}
+        self._pkgfile = None
 
+        self._input_digest = None
+        self._fingerprint = None
+
+    @staticmethod
+    def _read_data(path):
+        ''' read the desc and depends files of the entry '''
         with open(os.path.join(path, 'desc'), 'r') as infile:
             data = infile.read()
 
@@ -344,7 +512,7 @@ class PkgEntry():
             with open(os.path.join(path, 'depends'), 'r') as infile:
                 data += "\n" + infile.read()
 
-        self._data = {}
+        res = {}
         cur = None
         for line in data.splitlines():
             line = line.strip()
@@ -353,18 +521,11 @@ class PkgEntry():
             if line[0] == '%' and line[-1] == '%':
                 cur = line[1:-1]
                 continue
-            if cur in self._data:
-                self._data[cur] += ' ' + line
+            if cur in res:
+                res[cur] += ' ' + line
             else:
-                self._data[cur] = line
-
-        pkgbuild_cache = repo.pkgbuild_cache.get(repoarch, {})
-        self._pkgbuilds = pkgbuild_cache.get(self.pkgname, [])
-        for pkgbuild in self._pkgbuilds:
-            pkgbuild.register_pkgentry(self, repoarch)
-
-        self._pkgfiles = {}
-        self._pkgfile = None
+                res[cur] = line
+        return res
 
     def register_pkgfile(self, pkgfile, arch):
         ''' add a pkgfile to this pkgentry '''
@@ -374,6 +535,11 @@ class PkgEntry():
         if os.path.basename(pkgfile.path) == self._data['FILENAME']:
             self._pkgfile = pkgfile
 
+    @property
+    def path(self):
+        ''' produce the path to the extracted entry '''
+        return self._path
+
     @property
     def repo(self):
         ''' produce the repo of the package '''
@@ -394,11 +560,37 @@ class PkgEntry():
         ''' produce the base64 encoded pgp signature of the package '''
         return self._data['PGPSIG']
 
+    @property
+    def signature(self):
+        ''' produce the parsed pgp signature of the package, or None '''
+        if self._signature is None:
+            try:
+                self._signature = read_pgpsig(self._data['PGPSIG'])
+            except (KeyError, ValueError) as e:
+                logging.warning('%s: unreadable PGPSIG: %s', self, e)
+                self._signature = False
+        return self._signature or None
+
+    @property
+    def filename(self):
+        ''' produce the file name of the package the entry refers to '''
+        return self._data['FILENAME']
+
     @property
     def provides(self):
         ''' produce the names provided by the package '''
         return set(self._data.get('PROVIDES', '').split())
 
+    @property
+    def conflicts(self):
+        ''' produce the packages the package conflicts with '''
+        return set(self._data.get('CONFLICTS', '').split())
+
+    @property
+    def replaces(self):
+        ''' produce the packages the package replaces '''
+        return set(self._data.get('REPLACES', '').split())
+
     @property
     def depends(self):
         ''' produce the install time dependencies of the package '''
@@ -434,14 +626,110 @@ class PkgEntry():
         ''' produce the pkgfile matching this pkgentry exactly '''
         return self._pkgfile
 
+    @property
+    def input_digest(self):
+        ''' produce a digest of the repo.db entry itself '''
+        if self._input_digest is None:
+            self._input_digest = _digest(self._path, sorted(self._data.items()))
+        return self._input_digest
+
+    @property
+    def index_data(self):
+        ''' produce the data of the entry kept in an exported index '''
+        return {
+            'NAME': self.pkgname,
+            'VERSION': self._data['VERSION'],
+            'PROVIDES': self._data.get('PROVIDES', ''),
+            'CONFLICTS': self._data.get('CONFLICTS', ''),
+            'REPLACES': self._data.get('REPLACES', ''),
+            'FILENAME': self.filename,
+            'DIGEST': self.input_digest,
+        }
+
+    @property
+    def fingerprint(self):
+        ''' produce a digest of the repo.db entry and its neighbours '''
+        if self._fingerprint is None:
+            self._fingerprint = _digest(
+                self.input_digest,
+                self._pkgfile.input_digest if self._pkgfile else None,
+                sorted((a, p.input_digest) for a, l in self._pkgfiles.items() for p in l),
+                [p.input_digest for p in self._pkgbuilds],
+            )
+        return self._fingerprint
+
+    def __repr__(self):
+        ''' produce a string representation, computed once '''
+        if self._repr is None:
+            path = self._path
+            path, _ = os.path.split(path)
+            path, arch = os.path.split(path)
+            path, _ = os.path.split(path)
+            _, repo = os.path.split(path)
+            self._repr = "%s/%s/%s" % (repo, arch, self.pkgname)
+        return self._repr
+
+
+class IndexEntry():
+    '''
+    a lightweight stand-in for a repo.db entry of an architecture that is not
+    loaded, restored from an exported index
+    '''
+
+    def __init__(self, repo, repoarch, data):
+        ''' constructor '''
+        self._repo = repo
+        self._repoarch = repoarch
+        self._data = data
+
+    @property
+    def repo(self):
+        ''' produce the repo of the package '''
+        return self._repo
+
+    @property
+    def pkgname(self):
+        ''' produce the name of the package '''
+        return self._data['NAME']
+
+    @property
+    def pkgver(self):
+        ''' produce the pkgver of the package '''
+        return PkgVersion(self._data['VERSION'])
+
+    @property
+    def provides(self):
+        ''' produce the names provided by the package '''
+        return set(self._data['PROVIDES'].split())
+
+    @property
+    def conflicts(self):
+        ''' produce the packages the package conflicts with '''
+        return set(self._data.get('CONFLICTS', '').split())
+
+    @property
+    def replaces(self):
+        ''' produce the packages the package replaces '''
+        return set(self._data.get('REPLACES', '').split())
+
+    @property
+    def arch(self):
+        ''' produce the architecture of the package '''
+        return self._repoarch
+
+    @property
+    def filename(self):
+        ''' produce the file name of the package the entry refers to '''
+        return self._data['FILENAME']
+
+    @property
+    def input_digest(self):
+        ''' produce the digest of the repo.db entry, as exported '''
+        return self._data['DIGEST']
+
     def __repr__(self):
         ''' produce a string representation '''
-        path = self._path
-        path, _ = os.path.split(path)
-        path, arch = os.path.split(path)
-        path, _ = os.path.split(path)
-        _, repo = os.path.split(path)
-        return "%s/%s/%s" % (repo, arch, self.pkgname)
+        return "%s/%s/%s" % (self._repo.name, self._repoarch, self.pkgname)
 
 
 # pkgbuild_schema_strings
@@ -519,6 +807,7 @@ class PkgBuild():
         ''' constructor '''
         self._repo = repo
         self._path = path
+        self._repr = None
 
         self._valid = None
         self._srcinfo = {}
@@ -528,6 +817,11 @@ class PkgBuild():
         self._pkgentries = {}
         self._pkgfiles = {}
 
+        self._input_digest = None
+        self._fingerprint = None
+
+        self._quarantined = None
+
     def register_pkgentry(self, pkgentry, arch):
         ''' add a pkgentry to this pkgbuild '''
         if arch not in self._pkgentries:
@@ -578,6 +872,13 @@ class PkgBuild():
             self._load_metadata()
         return self._arches
 
+    @property
+    def quarantined(self):
+        ''' produce the reason the PKGBUILD is quarantined for, or None '''
+        if self._valid is None:
+            self._load_metadata()
+        return self._quarantined
+
     @property
     def pkgentries(self):
         ''' produce the list of pkgentries linked to this pkgbuild '''
@@ -588,13 +889,53 @@ class PkgBuild():
         ''' produce the list of pkgfiles linked to this pkgbuild '''
         return self._pkgfiles
 
+    @property
+    def input_digest(self):
+        ''' produce a digest of the PKGBUILD itself '''
+        if self._input_digest is None:
+            try:
+                mtime = os.path.getmtime(self._path)
+            except FileNotFoundError:
+                mtime = None
+            self._input_digest = _digest(self._path, mtime)
+        return self._input_digest
+
+    @property
+    def fingerprint(self):
+        ''' produce a digest of the PKGBUILD and its linked packages '''
+        if self._fingerprint is None:
+            self._fingerprint = _digest(
+                self.input_digest,
+                sorted((a, p.input_digest) for a, l in self._pkgentries.items() for p in l),
+                sorted((a, p.input_digest) for a, l in self._pkgfiles.items() for p in l),
+            )
+        return self._fingerprint
+
     def _load_metadata(self):
-        ''' attempt to parse the PKGBUILD '''
+        ''' attempt to parse the PKGBUILD, unless it is quarantined '''
+        self._quarantined = self._repo.quarantine.get(str(self), self.input_digest)
+        if self._quarantined is not None:
+            self._valid = False
+            return
+
+        try:
+            self._parse_metadata()
+        except CommandTimeout as e:
+            self._valid = False
+            self._srcinfo = {}
+            self._pkglist = {}
+            self._quarantined = str(e)
+            self._repo.quarantine.add(str(self), self.input_digest, self._quarantined)
+            logging.warning('%s: %s, quarantined', self, e)
+
+    def _parse_metadata(self):
+        ''' parse the PKGBUILD through makepkg '''
         mtime = os.path.getmtime(self._path)
 
-        os.environ.pop('CARCH', None)
+        env = dict(os.environ)
+        env.pop('CARCH', None)
         si_file = os.path.join(os.path.dirname(self._path), '.srcinfo')
-        si_str = self._cached_makepkg(si_file, mtime, '--printsrcinfo')
+        si_str = self._cached_makepkg(si_file, mtime, '--printsrcinfo', _env=env)
 
         if not si_str:
             self._valid = False
@@ -607,13 +948,15 @@ class PkgBuild():
             self._arches = set(self._arches).difference(['any'])
             self._arches = set(self._arches).union(CONFIG.parabola.arches)
 
-        for arch in set(self._arches).intersection(CONFIG.parabola.arches):
-            os.environ['CARCH'] = arch
+        # the validity must not depend on the arches loaded by a shard, so that
+        # merged shards report the same invalid PKGBUILDs as a single run
+        self._valid = bool(set(self._arches).intersection(CONFIG.parabola.arches))
+        for arch in set(self._arches).intersection(self._repo.arches):
+            env['CARCH'] = arch
             si_file = os.path.join(os.path.dirname(self._path), '.%s.srcinfo' % arch)
-            si_str = self._cached_makepkg(si_file, mtime, '--printsrcinfo')
+            si_str = self._cached_makepkg(si_file, mtime, '--printsrcinfo', _env=env)
             pl_file = os.path.join(os.path.dirname(self._path), '.%s.pkglist' % arch)
-            pl_str = self._cached_makepkg(pl_file, mtime, '--packagelist')
-            os.environ.pop('CARCH', None)
+            pl_str = self._cached_makepkg(pl_file, mtime, '--packagelist', _env=env)
 
             if not si_str or not pl_str:
                 self._valid = False
@@ -621,17 +964,20 @@ class PkgBuild():
 
             self._srcinfo[arch] = Srcinfo(si_str)
             self._pkglist[arch] = pl_str.split()
-            self._valid = True
 
     def _cached_makepkg(self, cachefile, mtime, *args, **kwargs):
         ''' speed up makepkg calls by caching results '''
+        kind = 'pkglist' if '--packagelist' in args else 'srcinfo'
         if os.path.isfile(cachefile) and os.path.getmtime(cachefile) > mtime:
+            record_cache(kind, True)
             with open(cachefile, 'r') as infile:
                 return infile.read()
 
+        record_cache(kind, False)
         res = ''
         try:
-            res = str(sh.makepkg(*args, **kwargs, _cwd=os.path.dirname(self._path)))
+            res = str(run('makepkg', self, sh.makepkg, *args, **kwargs,
+                          _cwd=os.path.dirname(self._path)))
         except sh.ErrorReturnCode:
             logging.exception('makepkg failed for %s', self)
 
@@ -641,26 +987,44 @@ class PkgBuild():
         return res
 
     def __repr__(self):
-        ''' a string representation '''
-        path = os.path.basename(os.path.dirname(self._path))
-        return '%s/%s/PKGBUILD' % (self._repo.name, path)
+        ''' a string representation, computed once '''
+        if self._repr is None:
+            path = os.path.basename(os.path.dirname(self._path))
+            self._repr = '%s/%s/PKGBUILD' % (self._repo.name, path)
+        return self._repr
 
 
 class Repo():
     ''' represent a single pacman repository '''
 
-    def __init__(self, name, pkgbuild_dir, pkgentries_dir, pkgfiles_dir):
-        ''' constructor '''
+    # pylint: disable=too-many-arguments
+    def __init__(self, name, pkgbuild_dir, pkgentries_dir, pkgfiles_dir, arches=None,
+                 index=None, load_pkgfiles=True, quarantine=None, changes=None, previous=None):
+        '''
+        constructor. arches restricts the architectures to load, entries of
+        other architectures are taken from the given exported index instead.
+        changes are the files of the repo changed by the latest update, by arch.
+        given the previous load of the repo, and changes listing every file
+        changed since, only the changed pkgentries and pkgfiles are loaded
+        from disk.
+        '''
         self._name = name
+        self._arches = CONFIG.parabola.arches if arches is None else arches
+        self._quarantine = Quarantine() if quarantine is None else quarantine
+        self._quarantined = []
 
         self._pkgbuild_dir = pkgbuild_dir
         self._pkgentries_dir = pkgentries_dir
         self._pkgfiles_dir = pkgfiles_dir
 
+        if changes:
+            self._apply_changes(changes)
+
         self._pkgbuilds = []
         self._pkgbuild_cache = {}
         if self._pkgbuild_dir is not None:
-            self._load_pkgbuilds()
+            with phase('pkgbuilds', repo=name):
+                self._load_pkgbuilds()
             logging.info('%s pkgbuilds: %i', name, len(self._pkgbuilds))
             with open(os.path.join(self._pkgbuild_dir, '.pkgbuilds'), 'w') as out:
                 out.write(json.dumps(self._pkgbuilds, indent=4, sort_keys=True, default=str))
@@ -670,7 +1034,10 @@ class Repo():
         self._pkgentries = []
         self._pkgentries_cache = {}
         self._provides_cache = {}
-        self._load_pkgentries()
+        with phase('pkgentries', repo=name):
+            self._load_pkgentries(previous, changes or {})
+            if index is not None:
+                self._load_index(index)
 
         logging.info('%s pkgentries: %i', name, len(self._pkgentries))
         with open(os.path.join(self._pkgentries_dir, '.pkgentries'), 'w') as out:
@@ -681,17 +1048,34 @@ class Repo():
             out.write(json.dumps(self._provides_cache, indent=4, sort_keys=True, default=str))
 
         self._pkgfiles = []
-        self._load_pkgfiles()
+        if load_pkgfiles:
+            with phase('pkgfiles', repo=name):
+                self._load_pkgfiles(previous, changes or {})
 
-        logging.info('%s pkgfiles: %i', name, len(self._pkgfiles))
-        with open(os.path.join(self._pkgfiles_dir, '.pkgfiles'), 'w') as out:
-            out.write(json.dumps(self._pkgfiles, indent=4, sort_keys=True, default=str))
+            logging.info('%s pkgfiles: %i', name, len(self._pkgfiles))
+            with open(os.path.join(self._pkgfiles_dir, '.pkgfiles'), 'w') as out:
+                out.write(json.dumps(self._pkgfiles, indent=4, sort_keys=True, default=str))
 
     @property
     def name(self):
         ''' produce the name of the repo '''
         return self._name
 
+    @property
+    def arches(self):
+        ''' produce the architectures loaded for the repo '''
+        return self._arches
+
+    @property
+    def quarantine(self):
+        ''' produce the quarantine of objects with timed out commands '''
+        return self._quarantine
+
+    @property
+    def quarantined(self):
+        ''' produce the list of quarantined pkgbuilds and pkgfiles in the repo '''
+        return self._quarantined
+
     @property
     def pkgbuilds(self):
         ''' produce the list of pkgbuilds in the repo '''
@@ -722,6 +1106,40 @@ class Repo():
         ''' produce the list of pkg.tar.xz files in the repo '''
         return self._pkgfiles
 
+    def _apply_changes(self, changes):
+        '''
+        invalidate the cached data of the files changed by an update: drop the
+        metadata sidecars of added, updated and deleted package files, and the
+        signature sidecar of packages whose detached signature changed, forget
+        deleted packages in the quarantine, and discard the extracted repo.db
+        entries of every arch whose repo.db changed
+        '''
+        for arch, change in changes.items():
+            if arch not in self._arches:
+                continue
+
+            arch_dir = os.path.join(self._pkgfiles_dir, 'os', arch)
+            changed = change['added'] + change['updated'] + change['deleted']
+            for filename in changed:
+                if filename.endswith('.sig'):
+                    sidecars = [_changed_package(filename) + PKGFILE_SIDECARS[2]]
+                else:
+                    sidecars = [filename + ext for ext in PKGFILE_SIDECARS]
+                for sidecar in sidecars:
+                    try:
+                        os.remove(os.path.join(arch_dir, sidecar))
+                    except FileNotFoundError:
+                        pass
+
+            for filename in change['deleted']:
+                self._quarantine.discard('%s/%s/%s' % (self._name, arch, filename))
+
+            if _repodb_changed(self._name, change):
+                shutil.rmtree(os.path.join(self._pkgentries_dir, 'os', arch), ignore_errors=True)
+
+            logging.info('%s %s: %i added, %i updated, %i deleted files', self, arch,
+                         len(change['added']), len(change['updated']), len(change['deleted']))
+
     def _load_pkgbuilds(self):
         ''' load the pkgbuilds from abslibre '''
         i = 0
@@ -734,8 +1152,12 @@ class Repo():
                     sys.stdout.write(' %s pkgbuilds: %i (%s)\n' % (self._name, i, pkgbuild))
                     sys.stdout.flush()
 
+                if pkgbuild.quarantined is not None:
+                    self._quarantined.append(pkgbuild)
+                    continue
+
                 self._pkgbuilds.append(pkgbuild)
-                for arch in set(pkgbuild.arches).intersection(CONFIG.parabola.arches):
+                for arch in set(pkgbuild.arches).intersection(self._arches):
                     if arch not in self._pkgbuild_cache:
                         self._pkgbuild_cache[arch] = {}
                     pkgname = '%s-debug' % pkgbuild.srcinfo[arch].pkgbase['pkgbase']
@@ -747,11 +1169,24 @@ class Repo():
                             self._pkgbuild_cache[arch][pkgname] = []
                         self._pkgbuild_cache[arch][pkgname].append(pkgbuild)
 
-    def _load_pkgentries(self):
-        ''' extract and then load the entries in the db.tar.xz '''
+    def _load_pkgentries(self, previous, changes):
+        '''
+        extract and then load the entries in the db.tar.xz. the entries of
+        arches whose repo.db is unchanged are taken from the previous load.
+        '''
+        reused = set()
+        if previous is not None:
+            reused = set(a for a in self._arches if a in previous.arches
+                         and not _repodb_changed(self._name, changes.get(a, None)))
+            for pkgentry in previous.pkgentries:
+                if pkgentry.arch in reused:
+                    pkgentry = PkgEntry(self, pkgentry.path, pkgentry.arch, previous=pkgentry)
+                    self._pkgentries.append(pkgentry)
+                    self._index_pkgentry(pkgentry)
+
         arches_dir = os.path.join(self._pkgfiles_dir, 'os')
         for arch in os.scandir(arches_dir):
-            if arch.name not in CONFIG.parabola.arches:
+            if arch.name not in self._arches or arch.name in reused:
                 continue
 
             repo_file = os.path.join(arch.path, '%s.db' % self._name)
@@ -760,18 +1195,24 @@ class Repo():
 
                 dst = os.path.join(self._pkgentries_dir, 'os', arch.name)
                 if os.path.isdir(dst) and os.path.getmtime(dst) > mtime:
+                    record_cache('repodb', True)
                     continue
 
+                record_cache('repodb', False)
                 os.makedirs(dst, exist_ok=True)
                 shutil.rmtree(dst)
                 os.makedirs(dst, exist_ok=True)
 
-                sh.tar('xf', repo_file, _cwd=dst)
+                try:
+                    run('tar', repo_file, sh.tar, 'xf', repo_file, _cwd=dst)
+                except CommandTimeout as e:
+                    shutil.rmtree(dst)
+                    logging.error('%s: %s, skipping', repo_file, e)
 
         i = 0
         arches_dir = os.path.join(self._pkgentries_dir, 'os')
         for arch in os.scandir(arches_dir):
-            if arch.name not in CONFIG.parabola.arches:
+            if arch.name not in self._arches or arch.name in reused:
                 continue
 
             for pkgentry_dir in os.scandir(arch.path):
@@ -783,50 +1224,103 @@ class Repo():
                     sys.stdout.flush()
 
                 self._pkgentries.append(pkgentry)
-                if pkgentry.arch not in self._pkgentries_cache:
-                    self._pkgentries_cache[pkgentry.arch] = {}
-                if pkgentry.pkgname not in self._pkgentries_cache[pkgentry.arch]:
-                    self._pkgentries_cache[pkgentry.arch][pkgentry.pkgname] = []
-                self._pkgentries_cache[pkgentry.arch][pkgentry.pkgname].append(pkgentry)
-
-                for provides in pkgentry.provides.union([pkgentry.pkgname]):
-                    if pkgentry.arch not in self._provides_cache:
-                        self._provides_cache[pkgentry.arch] = {}
-
-                    splits = ['==', '>=', '<=', '>', '<', '=']
-                    for split in splits:
-                        if split in provides:
-                            provides = provides.split(split)[0]
-                            break
-
-                    if provides not in self._provides_cache[pkgentry.arch]:
-                        self._provides_cache[pkgentry.arch][provides] = []
-                    self._provides_cache[pkgentry.arch][provides].append(pkgentry)
-
-    def _load_pkgfiles(self):
-        ''' load the pkg.tar.xz files from the repo '''
-        i = 0
-        arches_dir = os.path.join(self._pkgfiles_dir, 'os')
+                self._index_pkgentry(pkgentry)
+
+    def _index_pkgentry(self, pkgentry):
+        ''' add a pkgentry to the lookup caches by name and by provides '''
+        if pkgentry.arch not in self._pkgentries_cache:
+            self._pkgentries_cache[pkgentry.arch] = {}
+        if pkgentry.pkgname not in self._pkgentries_cache[pkgentry.arch]:
+            self._pkgentries_cache[pkgentry.arch][pkgentry.pkgname] = []
+        self._pkgentries_cache[pkgentry.arch][pkgentry.pkgname].append(pkgentry)
+
+        for provides in pkgentry.provides.union([pkgentry.pkgname]):
+            if pkgentry.arch not in self._provides_cache:
+                self._provides_cache[pkgentry.arch] = {}
+
+            splits = ['==', '>=', '<=', '>', '<', '=']
+            for split in splits:
+                if split in provides:
+                    provides = provides.split(split)[0]
+                    break
+
+            if provides not in self._provides_cache[pkgentry.arch]:
+                self._provides_cache[pkgentry.arch][provides] = []
+            self._provides_cache[pkgentry.arch][provides].append(pkgentry)
+
+    def _load_index(self, index):
+        ''' add lightweight entries of the architectures not loaded from the index '''
+        for arch, entries in index.items():
+            if arch in self._arches:
+                continue
+            for data in entries:
+                self._index_pkgentry(IndexEntry(self, arch, data))
 
-        def is_pkgfile(s):
-            for ext in ['gz', 'bz2', 'xz', 'zst', 'Z']:
-                if s.endswith('.pkg.tar.%s' % ext):
-                    return True
-            return False
+    def export_index(self):
+        ''' produce the lightweight index data of the loaded pkgentries '''
+        res = {}
+        for pkgentry in self._pkgentries:
+            if pkgentry.arch not in res:
+                res[pkgentry.arch] = []
+            res[pkgentry.arch].append(pkgentry.index_data)
+        return res
 
+    def _load_pkgfiles(self, previous, changes):
+        '''
+        load the pkg.tar.xz files from the repo. the arches loaded before are
+        not scanned again, only their changed files are loaded from disk.
+        '''
+        i = 0
+        arches_dir = os.path.join(self._pkgfiles_dir, 'os')
         for arch in os.scandir(arches_dir):
-            if arch.name not in CONFIG.parabola.arches:
+            if arch.name not in self._arches:
                 continue
 
-            for pkgfile_direntry in os.scandir(arch.path):
-                if is_pkgfile(pkgfile_direntry.name):
-                    self._pkgfiles.append(PkgFile(self, pkgfile_direntry.path, arch.name))
+            if previous is not None and arch.name in previous.arches:
+                candidates = self._changed_pkgfiles(previous, arch, changes.get(arch.name, None))
+            else:
+                candidates = [(e.path, None) for e in os.scandir(arch.path) if _is_pkgfile(e.name)]
 
-                    i += 1
-                    if sys.stdout.isatty():
-                        sys.stdout.write(' %s pkgfiles: %i\r' % (self._name, i))
-                        sys.stdout.flush()
+            for path, unchanged in candidates:
+                pkgfile = PkgFile(self, path, arch.name, previous=unchanged)
+                if pkgfile.quarantined is not None:
+                    self._quarantined.append(pkgfile)
+                else:
+                    self._pkgfiles.append(pkgfile)
 
+                i += 1
+                if sys.stdout.isatty():
+                    sys.stdout.write(' %s pkgfiles: %i\r' % (self._name, i))
+                    sys.stdout.flush()
+
+    @staticmethod
+    def _changed_pkgfiles(previous, arch, change):
+        '''
+        produce the paths of the pkgfiles of an arch, each with its previous
+        pkgfile if it is unchanged since the previous load. quarantined
+        pkgfiles, pkgfiles that failed to load, and changed files are loaded
+        again if they still exist.
+        '''
+        changed = set()
+        if change is not None:
+            changed = set(_changed_package(f) for k in KINDS for f in change[k])
+
+        known = [p for p in previous.pkgfiles + previous.quarantined
+                 if isinstance(p, PkgFile) and p.arch == arch.name]
+        res = []
+        for pkgfile in known:
+            filename = os.path.basename(pkgfile.path)
+            # pylint: disable=protected-access
+            if filename in changed or pkgfile.quarantined is not None or pkgfile._fs_error is not None:
+                changed.add(filename)
+            else:
+                res.append((pkgfile.path, pkgfile))
+
+        for filename in sorted(changed):
+            path = os.path.join(arch.path, filename)
+            if _is_pkgfile(filename) and os.path.exists(path):
+                res.append((path, None))
+        return res
 
     def __repr__(self):
         ''' produce a string representation of the repo '''
@@ -847,6 +1341,7 @@ class RepoCache():
         self._pkgentries_dir = os.path.join(self._cache_dir, 'pkgentries')
         self._pkgfiles_dir = os.path.join(self._cache_dir, 'pkgfiles')
         self._keyring_dir = os.path.join(self._cache_dir, 'keyring')
+        self._fileindex_dir = os.path.join(self._cache_dir, 'fileindex')
 
         self._repo_names = CONFIG.parabola.repos
         self._arches = CONFIG.parabola.arches
@@ -855,6 +1350,11 @@ class RepoCache():
         self._arch_repos = {}
         self._keyring = []
         self._key_cache = {}
+        self._file_indexes = {}
+        self._quarantine = None
+        self._changes_file = os.path.join(self._cache_dir, 'changes.json')
+        self._changes = ChangeFeed()
+        self._changes_lock = threading.Lock()
 
     @property
     def pkgbuilds(self):
@@ -886,6 +1386,32 @@ class RepoCache():
         ''' produce repo objects for core, extra and community '''
         return self._arch_repos
 
+    @property
+    def quarantined(self):
+        ''' produce the list of quarantined objects in all repos '''
+        repos = list(self._arch_repos.values()) + list(self._repos.values())
+        return [o for r in repos for o in r.quarantined]
+
+    @property
+    def repo_names(self):
+        ''' produce the names of all repos, arch repos first '''
+        return ARCH_REPOS + list(self._repo_names)
+
+    @property
+    def pkgfiles_dir(self):
+        ''' produce the base directory of the mirrored package files '''
+        return self._pkgfiles_dir
+
+    @property
+    def abslibre_dir(self):
+        ''' produce the directory of the abslibre checkout '''
+        return self._abslibre_dir
+
+    @property
+    def cache_dir(self):
+        ''' produce the base directory of the cached data '''
+        return self._cache_dir
+
     @property
     def keyring(self):
         ''' produce the entries in the parabola keyring '''
@@ -896,70 +1422,270 @@ class RepoCache():
         ''' produce a dict of signing (sub) keys in the parabola keyring '''
         return self._key_cache
 
-    def load_repos(self, noupdate, ignore_cache):
-        ''' update and load repo data from cache '''
+    @property
+    def file_indexes(self):
+        ''' produce the inverted file path index of all repos, by arch '''
+        return self._file_indexes
+
+    def shard_units(self, shard):
+        ''' produce the (repo, arch) pairs loaded by shard (i, n) '''
+        units = [(r, a) for r in ARCH_REPOS + list(self._repo_names) for a in self._arches]
+        index, count = shard
+        return [u for k, u in enumerate(units) if k % count == index]
+
+    def export_index(self, path):
+        '''
+        write the lightweight index of all repo.db entries needed by shards
+        for their cross-repo lookups
+        '''
+        res = {}
+        for repo in ARCH_REPOS + list(self._repo_names):
+            pkgentries_dir = os.path.join(self._pkgentries_dir, repo)
+            pkgfiles_dir = os.path.join(self._pkgfiles_dir, repo)
+            res[repo] = Repo(repo, None, pkgentries_dir, pkgfiles_dir, load_pkgfiles=False).export_index()
+
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as out:
+            out.write(json.dumps(res))
+        os.replace(tmp, path)
+        logging.info('exported repo index to %s', path)
+
+    def _prepare_cache_dir(self, ignore_cache):
+        ''' create the cache directory, or wipe it if the cache is ignored '''
         os.makedirs(self._cache_dir, exist_ok=True)
 
         if ignore_cache:
             shutil.rmtree(self._cache_dir)
             os.makedirs(self._cache_dir, exist_ok=True)
 
-        if not noupdate:
-            self._update_abslibre()
-            self._update_packages()
+    def _update_jobs(self):
+        ''' produce the number of concurrent transfers of the update phase '''
+        return CONFIG.parabola.get('update_jobs', None) or len(ARCH_REPOS) + len(self._repo_names) + 2
 
-        for repo in ARCH_REPOS:
-            pkgentries_dir = os.path.join(self._pkgentries_dir, repo)
-            pkgfiles_dir = os.path.join(self._pkgfiles_dir, repo)
-            repo = Repo(repo, None, pkgentries_dir, pkgfiles_dir)
-            self._arch_repos[repo.name] = repo
+    def update_repos(self, noupdate, ignore_cache):
+        '''
+        prepare the cache directory and update the repo data from the mirrors,
+        running the abslibre update, the rsync of the package pool and the
+        rsync of every repo concurrently
+        '''
+        self._prepare_cache_dir(ignore_cache)
+        self._changes = ChangeFeed.load(self._changes_file)
 
-        for repo in self._repo_names:
-            pkgbuild_dir = os.path.join(self._abslibre_dir, repo)
-            pkgentries_dir = os.path.join(self._pkgentries_dir, repo)
-            pkgfiles_dir = os.path.join(self._pkgfiles_dir, repo)
-            repo = Repo(repo, pkgbuild_dir, pkgentries_dir, pkgfiles_dir)
-            self._repos[repo.name] = repo
+        if not noupdate:
+            with concurrent.futures.ThreadPoolExecutor(self._update_jobs()) as pool:
+                futures = [pool.submit(self._update_abslibre), pool.submit(self._update_pool)]
+                for repo in ARCH_REPOS + list(self._repo_names):
+                    futures.append(pool.submit(self._update_packages, repo))
+                for future in futures:
+                    future.result()
+
+    def load_repos(self, noupdate, ignore_cache, shard=None, index=None):
+        '''
+        update and load repo data from cache. each repo is loaded as soon as
+        its own rsync and the rsync of the package pool its symlinks point to
+        have finished, while the other transfers are still in progress. if a shard (i, n) is given, only the pkgentries and pkgfiles
+        of the repos and arches of the shard are loaded, and the others are
+        taken from the exported index.
+        '''
+        units = None
+        index_data = {}
+        if shard is not None:
+            self.update_repos(noupdate, ignore_cache)
+            noupdate, ignore_cache = True, False
+
+            units = self.shard_units(shard)
+            logging.info('loading shard %i/%i: %s', *shard, units)
+            if not os.path.exists(index):
+                self.export_index(index)
+            with open(index, 'r') as infile:
+                index_data = json.loads(infile.read())
+
+        self._prepare_cache_dir(ignore_cache)
+        self._quarantine = Quarantine(os.path.join(self._cache_dir, 'quarantine.json'))
+        self._changes = ChangeFeed.load(self._changes_file)
+
+        def shard_arches(repo):
+            ''' produce the arches of the repo to load, None for all '''
+            if units is None:
+                return None
+            return [a for r, a in units if r == repo]
+
+        with concurrent.futures.ThreadPoolExecutor(self._update_jobs()) as pool:
+            abslibre = None if noupdate else pool.submit(self._update_abslibre)
+            packages = None if noupdate else pool.submit(self._update_pool)
+
+            futures = []
+            for repo in ARCH_REPOS + list(self._repo_names):
+                futures.append(pool.submit(
+                    self._update_and_load_repo, repo, noupdate, abslibre, packages,
+                    shard_arches(repo), index_data.get(repo, None)))
+
+            for future in futures:
+                repo = future.result()
+                if repo.name in ARCH_REPOS:
+                    self._arch_repos[repo.name] = repo
+                else:
+                    self._repos[repo.name] = repo
+
+        self._load_keyring()
+        self._load_file_indexes()
+        self._quarantine.save()
+
+        if shard is None and os.path.exists(self._changes_file):
+            os.remove(self._changes_file)
+
+    def reload_repos(self, names, changes):
+        '''
+        reload the given repos from the cache after files changed on disk,
+        invalidating the cached data of the changed files first. if the
+        changes list every changed file, the unchanged pkgentries and pkgfiles
+        are taken from the previous load instead of being loaded from disk.
+        '''
+        self._changes = changes
+        for name in names:
+            previous = None
+            if changes.complete:
+                previous = self._arch_repos.get(name, None) or self._repos.get(name, None)
+            repo = self._update_and_load_repo(name, True, None, None, None, None, previous)
+            if name in ARCH_REPOS:
+                self._arch_repos[name] = repo
+            else:
+                self._repos[name] = repo
+
+        self._load_keyring()
+        self._load_file_indexes()
+        self._quarantine.save()
 
-        self._extract_keyring()
+    def _load_keyring(self):
+        ''' load the parabola keyring and link the package files to their signing keys '''
+        self._keyring = []
+        self._key_cache = {}
+        with phase('keyring'):
+            self._extract_keyring()
         logging.info('keyring entries: %i', len(self._keyring))
         with open(os.path.join(self._keyring_dir, '.keyring'), 'w') as out:
             out.write(json.dumps(self._keyring, indent=4, sort_keys=True, default=str))
         with open(os.path.join(self._keyring_dir, '.key_cache'), 'w') as out:
             out.write(json.dumps(self._key_cache, indent=4, sort_keys=True, default=str))
 
-        for pkgfile in self.pkgfiles:
-            pkgfile.link_keyring(self._key_cache)
+        with phase('linking'):
+            for pkgfile in self.pkgfiles:
+                pkgfile.link_keyring(self._key_cache)
+
+    def _load_file_indexes(self):
+        ''' load the inverted file path index of each arch from the .files databases '''
+        os.makedirs(self._fileindex_dir, exist_ok=True)
+        for arch in self._arches:
+            sources = {}
+            for repo in ARCH_REPOS + list(self._repo_names):
+                files_db = os.path.join(self._pkgfiles_dir, repo, 'os', arch, '%s.files' % repo)
+                if os.path.exists(files_db):
+                    sources[repo] = files_db
+
+            with phase('fileindex', arch=arch):
+                index = FileIndex.load(os.path.join(self._fileindex_dir, arch), sources)
+            self._file_indexes[arch] = index
+            logging.info('%s file index: %i paths of %i packages', arch, len(index),
+                         len(index.packages))
+
+    # pylint: disable=too-many-arguments
+    def _update_and_load_repo(self, name, noupdate, abslibre, packages, arches, index,
+                              previous=None):
+        '''
+        update the packages of a repo and load it once the package pool
+        update has finished as well. the PKGBUILDs of parabola repos are
+        loaded once the abslibre update has finished too. previous is the
+        previous load of the repo, to take the unchanged objects from.
+        '''
+        if not noupdate:
+            self._update_packages(name)
+        if packages is not None:
+            packages.result()
+
+        pkgbuild_dir = None
+        if name not in ARCH_REPOS and arches != []:
+            if abslibre is not None:
+                abslibre.result()
+            pkgbuild_dir = os.path.join(self._abslibre_dir, name)
+
+        start = time.perf_counter()
+        repo = Repo(name, pkgbuild_dir,
+                    os.path.join(self._pkgentries_dir, name),
+                    os.path.join(self._pkgfiles_dir, name),
+                    arches=arches, index=index, quarantine=self._quarantine,
+                    changes=self._changes.for_repo(name), previous=previous)
+        logging.info('loaded %s in %.1fs', repo, time.perf_counter() - start)
+        return repo
 
     def _update_abslibre(self):
         ''' update the PKGBUILDs '''
-        if not os.path.exists(self._abslibre_dir):
+        start = time.perf_counter()
+        with phase('update', repo='abslibre'):
+            if CONFIG.parabola.get('abslibre_sparse', False):
+                self._update_abslibre_sparse()
+            else:
+                if not os.path.exists(self._abslibre_dir):
+                    giturl = CONFIG.parabola.abslibre
+                    run('git', giturl, sh.git.clone, giturl, 'abslibre', _cwd=self._cache_dir)
+                run('git', self._abslibre_dir, sh.git.pull, _cwd=self._abslibre_dir)
+        logging.info('updated abslibre in %.1fs', time.perf_counter() - start)
+
+    def _update_abslibre_sparse(self):
+        '''
+        update a shallow, blob-filtered checkout of abslibre that contains only
+        the directories of the configured repos
+        '''
+        abslibre = self._abslibre_dir
+        if not os.path.exists(abslibre):
             giturl = CONFIG.parabola.abslibre
-            sh.git.clone(giturl, 'abslibre', _cwd=self._cache_dir)
-        sh.git.pull(_cwd=self._abslibre_dir)
-
-    def _update_packages(self):
-        ''' update the package cache '''
-        remote = CONFIG.parabola.mirror
-        local = self._pkgfiles_dir
+            run('git', giturl, sh.git.clone, '--depth', '1', '--filter=blob:none', '--sparse',
+                giturl, 'abslibre', _cwd=self._cache_dir)
+        run('git', abslibre, sh.git, 'sparse-checkout', 'set', *self._repo_names, _cwd=abslibre)
+        run('git', abslibre, sh.git.fetch, '--depth', '1', 'origin', _cwd=abslibre)
+        run('git', abslibre, sh.git.reset, '--hard', 'FETCH_HEAD', _cwd=abslibre)
+
+    def _update_pool(self):
+        ''' update the package pool the package symlinks of all repos point to '''
+        start = time.perf_counter()
+        remote = '%s/pool/' % CONFIG.parabola.mirror.rstrip('/')
+        local = os.path.join(self._pkgfiles_dir, 'pool')
+        os.makedirs(local, exist_ok=True)
+        with phase('update', repo='pool'):
+            run('rsync', remote, sh.rsync, '-a', '--delete-after', remote, local + '/')
+        logging.info('updated the package pool in %.1fs', time.perf_counter() - start)
+
+    def _update_packages(self, repo):
+        ''' update the package cache of a repo, and record its changes '''
+        start = time.perf_counter()
+        remote = '%s/%s/' % (CONFIG.parabola.mirror.rstrip('/'), repo)
+        local = os.path.join(self._pkgfiles_dir, repo)
         os.makedirs(local, exist_ok=True)
-        sh.rsync('-a', '--delete-after', '--filter', 'P *.*info', remote, local)
+        with phase('update', repo=repo):
+            output = run('rsync', remote, sh.rsync, '-a', '--itemize-changes', '--delete-after',
+                         '--filter', 'P *.*info', remote, local + '/')
+
+        update = ChangeFeed.parse(str(output), prefix=repo + '/')
+        with self._changes_lock:
+            self._changes.merge(update)
+            self._changes.save(self._changes_file)
+        logging.info('updated [%s] in %.1fs: %i changed files', repo,
+                     time.perf_counter() - start, len(update))
 
     def _extract_keyring(self):
         ''' extract the parabola keyring '''
         cache = next(iter(self._repos['libre'].pkgentries_cache.values()))
         keyring_pkgentries = cache['parabola-keyring']
         keyring_pkgentry = keyring_pkgentries[0]
-        keyring_pkgfile = next(iter(keyring_pkgentry.pkgfiles.values()))[0]
 
-        src = keyring_pkgfile.path
+        src = os.path.join(self._pkgfiles_dir, 'libre', 'os', keyring_pkgentry.arch,
+                           keyring_pkgentry.filename)
         dst = self._keyring_dir
 
         if not os.path.isdir(dst) or os.path.getmtime(dst) <= os.path.getmtime(src):
             os.makedirs(dst, exist_ok=True)
             shutil.rmtree(dst)
             os.makedirs(dst, exist_ok=True)
-            sh.tar('xf', src, _cwd=dst)
+            run('tar', src, sh.tar, 'xf', src, _cwd=dst)
 
         keyring_file = os.path.join(
             dst, 'usr', 'share', 'pacman', 'keyrings', 'parabola.gpg'
@@ -0,0 +1,103 @@
+'''
+streaming linter reports, written issue by issue to a number of sinks
+'''
+
+import json
+
+
+class ReportSink():
+    ''' the base class of all consumers of a streamed linter report '''
+
+    def begin(self, linter):
+        ''' start the report of a linter run '''
+
+    def begin_check(self, check):
+        ''' start the section of an enabled check, with or without issues '''
+
+    def issue(self, check, issue, message):
+        ''' consume a single issue of the check, with its formatted message '''
+
+    def end_check(self, check):
+        ''' finish the section of a check '''
+
+    def end(self):
+        ''' finish the report '''
+
+
+class TextSink(ReportSink):
+    ''' write the human-readable digest to a text file '''
+
+    def __init__(self, outfile):
+        ''' constructor '''
+        self._out = outfile
+
+    def begin(self, linter):
+        ''' write the digest header '''
+        self._out.write(linter.format_header())
+
+    def begin_check(self, check):
+        ''' write the header of a check with issues '''
+        if not check.issues:
+            return
+        header = '%s:\n%s' % (check.header, '-' * (len(check.header) + 1))
+        self._out.write('\n\n\n%s\n%s\nissues:' % (header, check.__doc__))
+
+    def issue(self, check, issue, message):
+        ''' write a single issue line '''
+        self._out.write('\n    ')
+        self._out.write(message)
+
+
+class DeltaSink(ReportSink):
+    ''' write the digest of only the new and resolved issues since the previous recorded run '''
+
+    def __init__(self, outfile):
+        ''' constructor '''
+        self._out = outfile
+        self._delta = {}
+
+    def begin(self, linter):
+        ''' write the digest header '''
+        self._delta = linter.delta
+        self._out.write(linter.format_header())
+
+    def begin_check(self, check):
+        ''' write the new and resolved issues of the check, if any '''
+        delta = self._delta.get(str(check), None)
+        if not delta:
+            return
+
+        header = '%s:\n%s' % (check.header, '-' * (len(check.header) + 1))
+        self._out.write('\n\n\n%s\n%s' % (header, check.__doc__))
+        if delta.new:
+            self._out.write('\nnew issues:\n')
+            self._out.write('\n'.join('    ' + m for m in delta.new))
+        if delta.resolved:
+            self._out.write('\nresolved issues:\n')
+            self._out.write('\n'.join('    ' + m for m in delta.resolved))
+
+
+class NdjsonSink(ReportSink):
+    ''' write one json object per issue, for downstream tools '''
+
+    def __init__(self, outfile):
+        ''' constructor '''
+        self._out = outfile
+        self._time = None
+
+    def begin(self, linter):
+        ''' remember the time of the run '''
+        self._time = str(linter.end_time)
+
+    def issue(self, check, issue, message):
+        ''' write a single issue record '''
+        record = {
+            'time': self._time,
+            'check': str(check),
+            'key': check.issue_key(issue),
+            'message': message,
+            'object': str(issue[1]) if len(issue) > 1 else None,
+            'args': [str(a) for a in issue[2:]],
+        }
+        self._out.write(json.dumps(record, sort_keys=True))
+        self._out.write('\n')
@@ -2,25 +2,138 @@
 logging facilities for a telegram backend
 '''
 
+import time
+import queue
 import logging
+import threading
 
 import telegram
 
 
-class TelegramHandler(logging.StreamHandler):
-    ''' log messages to telegram '''
+# the maximum length of a single telegram message
+MESSAGE_LIMIT = 4096
 
-    def __init__(self, *args, **kwargs):
+
+# the queue item telling the background thread to stop
+_STOP = object()
+
+
+class TelegramHandler(logging.Handler):
+    '''
+    log messages to telegram. records are queued to a background thread that
+    coalesces bursts into batched messages and respects a minimum interval
+    between messages, so that logging never blocks on the network. records
+    that do not fit in the queue are dropped and summarized.
+    '''
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, token=None, chat_id=None, queue_size=1000, interval=3.0,
+                 batch_delay=1.0, flush_timeout=30.0, level=logging.NOTSET):
         ''' constructor '''
-        self._token = kwargs.pop('token', None)
-        self._chat_id = kwargs.pop('chat_id', None)
-        super().__init__(*args, **kwargs)
+        super().__init__(level)
+        self._token = token
+        self._chat_id = chat_id
+        self._interval = interval
+        self._batch_delay = batch_delay
+        self._flush_timeout = flush_timeout
+
+        self._queue = queue.Queue(queue_size)
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._last_send = 0.0
 
         self._connection = None
+        self._thread = None
         if self._token and self._chat_id:
             self._connection = telegram.Bot(self._token)
+            self._thread = threading.Thread(target=self._run, name='telegram-logging', daemon=True)
+            self._thread.start()
 
     def emit(self, record):
-        ''' emit a logging record '''
-        if self._connection:
-            self._connection.send_message(self._chat_id, self.format(record))
+        ''' queue a logging record, without waiting for it to be sent '''
+        if not self._connection:
+            return
+
+        try:
+            self._queue.put_nowait(self.format(record))
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+        except Exception: # pylint: disable=broad-except
+            self.handleError(record)
+
+    def _take_dropped(self):
+        ''' produce and reset the number of dropped records '''
+        with self._dropped_lock:
+            res = self._dropped
+            self._dropped = 0
+        return res
+
+    def _collect(self, first):
+        '''
+        produce a batch of messages starting with the given one, gathering more
+        from the queue for up to batch_delay seconds, and the queue items left
+        to acknowledge. the queue item that ended the batch, if any, is returned
+        as the third value.
+        '''
+        batch = first[:MESSAGE_LIMIT]
+        pending = 1
+        deadline = time.monotonic() + self._batch_delay
+        while True:
+            try:
+                message = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                return batch, pending, None
+            if message is _STOP or len(batch) + 1 + len(message) > MESSAGE_LIMIT:
+                return batch, pending, message
+            batch += '\n' + message
+            pending += 1
+
+    def _send(self, text):
+        ''' send a message, waiting for the rate limit first '''
+        delay = self._last_send + self._interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            self._connection.send_message(self._chat_id, text)
+        except Exception: # pylint: disable=broad-except
+            logging.getLogger(__name__).debug('failed to send telegram message', exc_info=True)
+        self._last_send = time.monotonic()
+
+    def _run(self):
+        ''' the background thread sending the queued records '''
+        message = self._queue.get()
+        while message is not _STOP:
+            batch, pending, message = self._collect(message)
+
+            dropped = self._take_dropped()
+            if dropped:
+                summary = '\n[%i more messages dropped]' % dropped
+                batch = batch[:MESSAGE_LIMIT - len(summary)] + summary
+
+            self._send(batch)
+            for _ in range(pending):
+                self._queue.task_done()
+
+            if message is None:
+                message = self._queue.get()
+        self._queue.task_done()
+
+    def flush(self):
+        ''' wait for the queued records to be sent, up to flush_timeout seconds '''
+        if self._thread is None or not self._thread.is_alive():
+            return
+
+        deadline = time.monotonic() + self._flush_timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def close(self):
+        ''' send the remaining records and stop the background thread '''
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=self._flush_timeout)
+            except queue.Full:
+                pass
+            self._thread.join(self._flush_timeout)
+        super().close()
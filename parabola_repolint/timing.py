@@ -0,0 +1,193 @@
+'''
+run time statistics of the linter checks
+'''
+
+import time
+import heapq
+import itertools
+import threading
+import contextlib
+
+
+# the number of slowest objects remembered per check
+SLOWEST_OBJECTS = 5
+
+
+# a tie breaker for the heaps, so that objects are never compared
+_SEQUENCE = itertools.count()
+
+
+class CheckTiming():
+    ''' accumulate wall and cpu time spent by a check on its objects '''
+
+    def __init__(self):
+        ''' constructor '''
+        self._wall = 0.0
+        self._cpu = 0.0
+        self._visited = 0
+        self._slowest = []
+
+    def record(self, obj, wall, cpu):
+        ''' record the time spent checking a single object '''
+        self._wall += wall
+        self._cpu += cpu
+        self._visited += 1
+
+        if len(self._slowest) < SLOWEST_OBJECTS:
+            heapq.heappush(self._slowest, (wall, next(_SEQUENCE), obj))
+        elif wall > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (wall, next(_SEQUENCE), obj))
+
+    def merge(self, other):
+        ''' add the statistics of another timing to this one '''
+        self._wall += other.wall
+        self._cpu += other.cpu
+        self._visited += other.visited
+        for wall, obj in other.slowest:
+            if len(self._slowest) < SLOWEST_OBJECTS:
+                heapq.heappush(self._slowest, (wall, next(_SEQUENCE), obj))
+            elif wall > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, (wall, next(_SEQUENCE), obj))
+
+    def map_objects(self, func):
+        ''' produce a copy of the timing with the slowest objects mapped by func '''
+        res = CheckTiming()
+        res._wall = self._wall
+        res._cpu = self._cpu
+        res._visited = self._visited
+        res._slowest = [(w, s, func(o)) for w, s, o in self._slowest]
+        return res
+
+    @property
+    def wall(self):
+        ''' produce the total wall time spent in the check '''
+        return self._wall
+
+    @property
+    def cpu(self):
+        ''' produce the total cpu time spent in the check '''
+        return self._cpu
+
+    @property
+    def visited(self):
+        ''' produce the number of objects the check has visited '''
+        return self._visited
+
+    @property
+    def slowest(self):
+        ''' produce the slowest objects and their wall times, slowest first '''
+        return [(w, o) for w, _, o in sorted(self._slowest, key=lambda s: -s[0])]
+
+    def to_dict(self):
+        ''' produce a machine-readable representation of the timing '''
+        return {
+            'wall': self._wall,
+            'cpu': self._cpu,
+            'visited': self._visited,
+            'slowest': [{'object': str(o), 'wall': w} for w, o in self.slowest],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        ''' restore a timing from its machine-readable representation '''
+        res = cls()
+        res._wall = data['wall']
+        res._cpu = data['cpu']
+        res._visited = data['visited']
+        res._slowest = [(s['wall'], next(_SEQUENCE), s['object']) for s in data['slowest']]
+        return res
+
+    def __repr__(self):
+        ''' produce a short human-readable summary '''
+        res = '%.2fs wall, %.2fs cpu, %i objects' % (self._wall, self._cpu, self._visited)
+        if self._slowest:
+            wall, obj = self.slowest[0]
+            res += ', slowest: %s (%.2fs)' % (obj, wall)
+        return res
+
+
+# the run time statistics of external commands, by command name
+SUBPROCESS_TIMINGS = {}
+_SUBPROCESS_LOCK = threading.Lock()
+
+
+class TimingListener():
+    '''
+    an observer of the phases of a run and of the external commands, to be
+    added to LISTENERS. the methods are called from the thread running the
+    phase or command.
+    '''
+
+    def phase_started(self, name, labels):
+        ''' called when a phase starts '''
+
+    def phase_ended(self, name, labels, wall):
+        ''' called when a phase ends, with its duration '''
+
+    def command_ended(self, name, obj, wall, cpu):
+        ''' called when an external command run on behalf of obj has terminated '''
+
+    def check_started(self, check, obj):
+        ''' called before a check runs on an object '''
+
+    def check_ended(self, check, obj, start, wall):
+        ''' called when a check has run on an object, with its perf_counter start time '''
+
+    def take_updates(self):
+        '''
+        called in a worker process after a task, producing the data recorded
+        in the worker to send back to the parent process
+        '''
+        return None
+
+    def merge_updates(self, updates):
+        ''' called in the parent process with the data taken from a worker '''
+
+
+# the observers notified of all phases and external commands
+LISTENERS = []
+
+
+@contextlib.contextmanager
+def phase(name, **labels):
+    '''
+    time a phase of the run, such as loading the pkgfiles of a repo, and notify
+    the listeners of its start and end. labels like the repo name identify
+    the phase further.
+    '''
+    for listener in LISTENERS:
+        listener.phase_started(name, labels)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - start
+        for listener in LISTENERS:
+            listener.phase_ended(name, labels, wall)
+
+
+def record_subprocess(name, obj, wall, cpu):
+    ''' record the time spent in an external command on an object '''
+    with _SUBPROCESS_LOCK:
+        if name not in SUBPROCESS_TIMINGS:
+            SUBPROCESS_TIMINGS[name] = CheckTiming()
+        SUBPROCESS_TIMINGS[name].record(obj, wall, cpu)
+    for listener in LISTENERS:
+        listener.command_ended(name, obj, wall, cpu)
+
+
+def take_subprocess_timings():
+    ''' produce and forget the run time statistics of the external commands '''
+    with _SUBPROCESS_LOCK:
+        res = dict(SUBPROCESS_TIMINGS)
+        SUBPROCESS_TIMINGS.clear()
+    return res
+
+
+def merge_subprocess_timings(timings):
+    ''' add run time statistics of external commands, by command name '''
+    with _SUBPROCESS_LOCK:
+        for name, timing in timings.items():
+            if name not in SUBPROCESS_TIMINGS:
+                SUBPROCESS_TIMINGS[name] = CheckTiming()
+            SUBPROCESS_TIMINGS[name].merge(timing)
@@ -0,0 +1,131 @@
+'''
+a timeline of a run in the chrome trace event format, viewable in perfetto or
+about:tracing
+'''
+
+import os
+import json
+import time
+import logging
+import threading
+
+from parabola_repolint.timing import LISTENERS, TimingListener
+
+
+# the minimum duration of a check on a single object to record as a span
+MIN_CHECK_SPAN = 0.001
+
+
+def _object_args(obj):
+    ''' produce the tags of a span run on behalf of an object '''
+    res = {'object': str(obj)}
+    try:
+        repo = getattr(obj, 'repo', None)
+        if repo is not None:
+            res['repo'] = getattr(repo, 'name', str(repo))
+        arch = getattr(obj, 'arch', None)
+        if arch is not None:
+            res['arch'] = str(arch)
+    except (KeyError, ValueError):
+        pass
+    return res
+
+
+class TraceRecorder(TimingListener):
+    '''
+    record the phases, external commands and slow checks of a run as complete
+    events, with the threads and worker processes they ran in
+    '''
+
+    def __init__(self, min_check_span=MIN_CHECK_SPAN):
+        ''' constructor '''
+        self._min_check_span = min_check_span
+        self._lock = threading.Lock()
+        self._base = time.perf_counter()
+        self._events = []
+        self._threads = {}
+
+    def _add(self, name, category, start, wall, args):
+        ''' record a complete event that started at the given perf_counter time '''
+        pid = os.getpid()
+        tid = threading.get_ident()
+        with self._lock:
+            self._threads[(pid, tid)] = threading.current_thread().name
+            self._events.append({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': start,
+                'dur': wall * 1e6,
+                'pid': pid,
+                'tid': tid,
+                'args': args,
+            })
+
+    def phase_ended(self, name, labels, wall):
+        ''' record a phase '''
+        self._add(name, 'phase', time.perf_counter() - wall, wall, dict(labels))
+
+    def command_ended(self, name, obj, wall, cpu):
+        ''' record an external command '''
+        args = _object_args(obj)
+        args['cpu'] = cpu
+        self._add(name, 'command', time.perf_counter() - wall, wall, args)
+
+    def check_ended(self, check, obj, start, wall):
+        ''' record a check on a single object, if it was slow enough to matter '''
+        if wall >= self._min_check_span:
+            self._add(str(check), 'check', start, wall, _object_args(obj))
+
+    def take_updates(self):
+        ''' produce and forget the events recorded in this worker process '''
+        pid = os.getpid()
+        with self._lock:
+            events = [e for e in self._events if e['pid'] == pid]
+            self._events = [e for e in self._events if e['pid'] != pid]
+            threads = [(k, v) for k, v in self._threads.items() if k[0] == pid]
+        return events, threads
+
+    def merge_updates(self, updates):
+        ''' add the events recorded in a worker process '''
+        events, threads = updates
+        with self._lock:
+            self._events.extend(events)
+            self._threads.update((tuple(k), v) for k, v in threads)
+
+    def clear(self):
+        ''' forget all recorded events, to start the trace of the next run '''
+        with self._lock:
+            self._events = []
+            self._base = time.perf_counter()
+
+    def write(self, path):
+        ''' write the trace as chrome trace event json '''
+        main_pid = os.getpid()
+        with self._lock:
+            events = []
+            for event in self._events:
+                event = dict(event)
+                event['ts'] = (event['ts'] - self._base) * 1e6
+                events.append(event)
+
+            for (pid, tid), name in self._threads.items():
+                events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                               'args': {'name': name}})
+            for pid in set(pid for pid, _ in self._threads):
+                name = 'parabola-repolint' if pid == main_pid else 'check worker %i' % pid
+                events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                               'args': {'name': name}})
+
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as outfile:
+            outfile.write(json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}))
+        os.replace(tmp, path)
+        logging.info('wrote trace of %i events to %s', len(events), path)
+
+
+def start_trace():
+    ''' produce a trace recorder, registered to receive the events of the run '''
+    recorder = TraceRecorder()
+    LISTENERS.append(recorder)
+    return recorder
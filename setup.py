@@ -31,7 +31,7 @@ setup(
         'pyxdg',
         'python-gnupg',
         'python-telegram-bot',
-        'splinter',
+        'inotify_simple',
     ],
 
     license='GPLv3',
@@ -0,0 +1,75 @@
+'''
+shared fixtures of the tests
+
+the config is read when parabola_repolint is imported, so a test config is
+written and the xdg directories are pointed to a scratch directory first.
+'''
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+import pytest
+
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SCRATCH = tempfile.mkdtemp(prefix='repolint-tests-')
+
+TEST_CONFIG = {
+    'parabola': {
+        'arches': ['x86_64', 'i686'],
+        'repos': ['libre', 'pcr', 'nonprism'],
+        'abslibre': None,
+        'mirror': None,
+        'update_jobs': None,
+    },
+    'fixhooks': {'enabled': False, 'jobs': 2},
+    'notify': {
+        'etherpad_url': None,
+        'etherpad_apikey': None,
+        'smtp_host': None,
+        'logfile_dest': None,
+    },
+    'gnupg': {'gpgdir': None, 'keyserver': None},
+    'timeouts': {},
+    'logging': {'version': 1},
+}
+
+for _name in ['config', 'cache', 'data']:
+    os.makedirs(os.path.join(SCRATCH, _name))
+    os.environ['XDG_%s_HOME' % _name.upper()] = os.path.join(SCRATCH, _name)
+with open(os.path.join(SCRATCH, 'config', 'parabola-repolint.conf'), 'w') as _out:
+    _out.write(json.dumps(TEST_CONFIG))
+
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+
+def pytest_unconfigure(config):
+    ''' remove the scratch directory '''
+    shutil.rmtree(SCRATCH, ignore_errors=True)
+
+
+def require_commands(*commands):
+    ''' skip a test if any of the given external commands is missing '''
+    missing = [c for c in commands if shutil.which(c) is None]
+    if missing:
+        pytest.skip('missing commands: %s' % ', '.join(missing))
+
+
+@pytest.fixture(scope='session')
+def synthetic_mirror(tmp_path_factory):
+    '''
+    a small synthetic mirror with arch and parabola repos, PKGBUILDs in an
+    abslibre git repository and a signed keyring. PKGBUILDs for a single arch
+    and any make shards of different arches load different objects.
+    '''
+    require_commands('gpg', 'git', 'tar', 'rsync', 'makepkg')
+    from synthetic_mirror import SyntheticMirror  # pylint: disable=import-outside-toplevel
+
+    mirror = SyntheticMirror(str(tmp_path_factory.mktemp('mirror')), packages=200,
+                             compression='gz', jobs=2)
+    mirror.generate()
+    return mirror
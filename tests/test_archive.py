@@ -0,0 +1,82 @@
+'''
+the digest archive stores snapshots and deltas, and reconstructs any digest
+'''
+
+import datetime
+
+from parabola_repolint.archive import DigestArchive, apply_delta, make_delta
+
+
+START = datetime.datetime(2020, 1, 1)
+
+
+def digest(hour):
+    ''' produce a digest that changes a few lines every hour '''
+    lines = ['header %i' % hour] + ['issue %i' % i for i in range(hour, hour + 10)]
+    if hour % 2:
+        lines.append('odd hour')
+    return '\n'.join(lines)
+
+
+def test_delta_roundtrip():
+    ''' a delta turns its base into the new lines, for insertions, removals and replacements '''
+    cases = [
+        ([], ['a']),
+        (['a'], []),
+        (['a', 'b', 'c'], ['a', 'x', 'c', 'd']),
+        (['a', 'b', 'c', 'd'], ['b', 'd']),
+        (['a', 'b'], ['a', 'b']),
+    ]
+    for old, new in cases:
+        assert apply_delta(old, make_delta(old, new)) == new
+    assert make_delta(['a', 'b'], ['a', 'b']) == [2]
+
+
+def test_snapshots_and_deltas(tmp_path):
+    ''' every snapshot_interval-th digest is a snapshot, and every digest is reconstructed '''
+    archive = DigestArchive(str(tmp_path), snapshot_interval=3)
+    times = [START + datetime.timedelta(hours=h) for h in range(7)]
+    for hour, time in enumerate(times):
+        archive.add(time, digest(hour))
+
+    assert [e['kind'] for e in archive.index] == ['snapshot', 'delta', 'delta'] * 2 + ['snapshot']
+
+    archive = DigestArchive(str(tmp_path), snapshot_interval=3)
+    for hour, time in enumerate(times):
+        assert archive.get(time.strftime('%Y%m%d_%H%M')) == (time.strftime('%Y%m%d_%H%M'), digest(hour))
+
+
+def test_lookup(tmp_path):
+    ''' a lookup produces the latest digest at or before the given time '''
+    archive = DigestArchive(str(tmp_path))
+    assert archive.get() is None
+
+    archive.add(START, digest(0))
+    archive.add(START + datetime.timedelta(hours=2), digest(2))
+
+    assert archive.get() == ('20200101_0200', digest(2))
+    assert archive.get('20200101_0159') == ('20200101_0000', digest(0))
+    assert archive.get('20200101_0200') == ('20200101_0200', digest(2))
+    assert archive.get('20200102') == ('20200101_0200', digest(2))
+    assert archive.get('20191231_2359') is None
+
+
+def test_same_minute_replaces(tmp_path):
+    ''' a second digest within the same minute replaces the first '''
+    archive = DigestArchive(str(tmp_path))
+    archive.add(START, digest(0))
+    archive.add(START + datetime.timedelta(seconds=30), digest(1))
+    assert len(archive.index) == 1
+    assert archive.get() == ('20200101_0000', digest(1))
+
+
+def test_retention(tmp_path):
+    ''' snapshot chains ending before the retention period are removed with their files '''
+    archive = DigestArchive(str(tmp_path), snapshot_interval=2, retention_days=1)
+    for hour in range(0, 60, 12):
+        archive.add(START + datetime.timedelta(hours=hour), digest(hour))
+
+    assert [e['time'] for e in archive.index] == ['20200102_0000', '20200102_1200', '20200103_0000']
+    assert sorted(p.name for p in tmp_path.iterdir() if p.name != 'index.json') == sorted(
+        e['file'] for e in archive.index)
+    assert archive.get('20200102_1200') == ('20200102_1200', digest(36))
@@ -0,0 +1,65 @@
+'''
+the change feed lists the files changed by an update, as itemized by rsync
+'''
+
+from parabola_repolint.changes import ChangeFeed
+
+
+PKG = 'foo-1.0-1-x86_64.pkg.tar.xz'
+
+ITEMIZED = '''\
+.d..t...... os/x86_64/
+>f+++++++++ os/x86_64/%(pkg)s
+>f+++++++++ os/x86_64/%(pkg)s.sig
+>f.st...... os/x86_64/libre.db.tar.gz
+cL+++++++++ os/x86_64/libre.db -> libre.db.tar.gz
+cL+++++++++ os/x86_64/bar-2.0-1-any.pkg.tar.xz -> ../../../pool/parabola/bar-2.0-1-any.pkg.tar.xz
+*deleting   os/x86_64/foo-0.9-1-x86_64.pkg.tar.xz
+*deleting   os/i686/
+>f+++++++++ os/x86_64/sub/dir/file
+>f+++++++++ README
+cd+++++++++ os/armv7h/
+''' % {'pkg': PKG}
+
+
+def test_parse_itemized_changes():
+    ''' additions, updates, deletions and symlinks are listed, directories and other files are not '''
+    feed = ChangeFeed.parse(ITEMIZED, prefix='libre/')
+    assert feed.data == {'libre': {'x86_64': {
+        'added': [PKG, PKG + '.sig', 'libre.db', 'bar-2.0-1-any.pkg.tar.xz'],
+        'updated': ['libre.db.tar.gz'],
+        'deleted': ['foo-0.9-1-x86_64.pkg.tar.xz'],
+    }}}
+    assert len(feed) == 6
+    assert feed.complete
+
+    feed = ChangeFeed.parse('>f+++++++++ pcr/os/i686/%s\n' % PKG)
+    assert feed.for_repo('pcr') == {'i686': {'added': [PKG], 'updated': [], 'deleted': []}}
+    assert feed.for_repo('libre') == {}
+
+
+def test_merge_keeps_the_latest_change():
+    ''' a file is listed once, with the kind of its latest change '''
+    feed = ChangeFeed.parse('>f+++++++++ libre/os/x86_64/%s\n' % PKG)
+    later = ChangeFeed.parse('*deleting   libre/os/x86_64/%s\n>f.st...... libre/os/x86_64/libre.db\n' % PKG)
+    later.mark_incomplete()
+    feed.merge(later)
+
+    assert feed.for_repo('libre') == {'x86_64': {
+        'added': [], 'updated': ['libre.db'], 'deleted': [PKG],
+    }}
+    assert not feed.complete
+
+
+def test_save_and_load(tmp_path):
+    ''' a saved feed is loaded as it was, a missing or corrupt one as empty '''
+    path = str(tmp_path / 'changes.json')
+    assert len(ChangeFeed.load(path)) == 0
+
+    feed = ChangeFeed.parse(ITEMIZED, prefix='libre/')
+    feed.save(path)
+    assert ChangeFeed.load(path).data == feed.data
+
+    with open(path, 'w') as outfile:
+        outfile.write('{')
+    assert len(ChangeFeed.load(path)) == 0
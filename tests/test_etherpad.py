@@ -0,0 +1,133 @@
+'''
+the etherpad client against a stub etherpad api server
+'''
+
+import json
+import threading
+import urllib.parse
+import http.server
+
+import pytest
+
+from parabola_repolint.dispatch import Dispatcher
+from parabola_repolint.etherpad import EtherpadClient, EtherpadError, EtherpadApiError
+
+
+class StubEtherpad(http.server.ThreadingHTTPServer):
+    ''' an etherpad api keeping the text of its pads, failing the calls it is told to '''
+
+    def __init__(self):
+        ''' constructor '''
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.pads = {}
+        self.calls = []
+        self.failures = {}
+
+    @property
+    def base_url(self):
+        ''' produce the url of the server '''
+        return 'http://127.0.0.1:%i' % self.server_address[1]
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    ''' answer the setText and appendText api calls '''
+
+    def do_POST(self): # pylint: disable=invalid-name
+        ''' apply an api call to the pads of the server '''
+        method = self.path.rsplit('/', 1)[-1]
+        length = int(self.headers['Content-Length'])
+        params = dict(urllib.parse.parse_qsl(self.rfile.read(length).decode()))
+        self.server.calls.append(method)
+
+        pads = self.server.pads
+        if params.get('apikey') != 'secret':
+            res = {'code': 4, 'message': 'no or wrong API Key', 'data': None}
+        elif method == 'setText':
+            pads[params['padID']] = params['text']
+            res = {'code': 0, 'message': 'ok', 'data': None}
+        elif method == 'appendText':
+            pads[params['padID']] += params['text']
+            res = {'code': 0, 'message': 'ok', 'data': None}
+        else:
+            res = {'code': 3, 'message': 'no such function', 'data': None}
+
+        status = 200
+        if self.server.failures.get(len(self.server.calls), None):
+            # the call is applied, but the answer is lost
+            status = 502
+        body = json.dumps(res).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args): # pylint: disable=arguments-differ
+        ''' keep the test output quiet '''
+
+
+@pytest.fixture
+def etherpad():
+    ''' a stub etherpad api server running in a thread '''
+    server = StubEtherpad()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_set_text_in_chunks(etherpad):
+    ''' a large text is uploaded with setText and appendText chunks '''
+    client = EtherpadClient(etherpad.base_url, 'secret')
+    client.set_text('pad', 'abcdefghij', chunk_size=4)
+
+    assert etherpad.pads['pad'] == 'abcdefghij'
+    assert etherpad.calls == ['setText', 'appendText', 'appendText']
+
+
+def test_missing_apikey(etherpad):
+    ''' an unset api key is a configuration error raised before any call '''
+    with pytest.raises(EtherpadApiError, match='etherpad_apikey'):
+        EtherpadClient(etherpad.base_url, None)
+    assert etherpad.calls == []
+
+
+def test_failed_chunk_is_not_duplicated(etherpad):
+    ''' a chunk applied but failed is never appended twice, the retry sets the whole text '''
+    client = EtherpadClient(etherpad.base_url, 'secret')
+    etherpad.failures[2] = True
+
+    with pytest.raises(EtherpadError):
+        client.set_text('pad', 'abcdefghij', chunk_size=4)
+    assert etherpad.calls == ['setText', 'appendText']
+    assert etherpad.pads['pad'] == 'abcdefgh'
+
+    etherpad.calls.clear()
+    etherpad.failures[2] = True
+    dispatcher = Dispatcher(timeout=10, retries=2, backoff=0)
+    dispatcher.add('etherpad', client.set_text, 'pad', 'abcdefghij', 4)
+    results = dispatcher.run()
+
+    assert results['etherpad'].success
+    assert results['etherpad'].attempts == 2
+    assert etherpad.calls == ['setText', 'appendText'] + ['setText', 'appendText', 'appendText']
+    assert etherpad.pads['pad'] == 'abcdefghij'
+
+
+def test_api_errors_are_not_retried(etherpad):
+    ''' a rejected call fails the sink at once, a transient failure is retried '''
+    etherpad.failures[1] = True
+
+    dispatcher = Dispatcher(timeout=10, retries=2, backoff=0)
+    dispatcher.add('transient', EtherpadClient(etherpad.base_url, 'secret').set_text, 'a', 'x')
+    results = dispatcher.run()
+    assert results['transient'].success
+    assert results['transient'].attempts == 2
+
+    dispatcher = Dispatcher(timeout=10, retries=2, backoff=0)
+    dispatcher.add('rejected', EtherpadClient(etherpad.base_url, 'wrong').set_text, 'b', 'x')
+    results = dispatcher.run()
+    assert not results['rejected'].success
+    assert results['rejected'].attempts == 1
+    assert 'API Key' in results['rejected'].error
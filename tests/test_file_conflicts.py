@@ -0,0 +1,81 @@
+'''
+the file conflict check reports each pair of conflicting packages once
+'''
+
+import io
+import types
+import tarfile
+
+from parabola_repolint.fileindex import FileIndex
+from parabola_repolint.linter import Linter
+from parabola_repolint.linter_checks.file_conflicts import FileConflict
+
+
+def write_files_db(path, packages):
+    ''' write a <repo>.files database of the given file lists, by pkgname '''
+    with tarfile.open(path, 'w:gz') as tar:
+        for pkgname, files in packages.items():
+            data = ('%FILES%\n' + ''.join('%s\n' % f for f in files)).encode()
+            info = tarfile.TarInfo('%s-1.0-1/files' % pkgname)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+class FakeRepo():
+    ''' a repo and its entries '''
+
+    def __init__(self, name, pkgnames):
+        ''' constructor '''
+        self.name = name
+        entries = [FakePkgEntry(self, n) for n in pkgnames]
+        self.pkgentries_cache = {'x86_64': {e.pkgname: [e] for e in entries}}
+
+
+class FakePkgEntry():
+    ''' a repo.db entry without conflicts(), replaces() or provides() '''
+
+    def __init__(self, repo, pkgname):
+        ''' constructor '''
+        self.repo = repo
+        self.arch = 'x86_64'
+        self.pkgname = pkgname
+        self.conflicts = set()
+        self.replaces = set()
+        self.provides = set()
+        self.input_digest = pkgname
+
+    def __repr__(self):
+        ''' produce the name of the entry '''
+        return '%s/%s/%s' % (self.repo.name, self.arch, self.pkgname)
+
+
+def test_pairs_reported_once(tmp_path):
+    ''' a pair of parabola packages is reported once, a pair with an arch package too '''
+    packages = {
+        'libre': {'foo': ['usr/bin/foo', 'usr/share/']},
+        'pcr': {'bar': ['usr/bin/foo', 'usr/share/']},
+        'extra': {'baz': ['usr/bin/foo']},
+    }
+    sources = {}
+    for repo, files in packages.items():
+        sources[repo] = str(tmp_path / ('%s.files' % repo))
+        write_files_db(sources[repo], files)
+
+    repos = {r: FakeRepo(r, packages[r]) for r in ['libre', 'pcr']}
+    arch_repos = {'extra': FakeRepo('extra', packages['extra'])}
+    cache = types.SimpleNamespace(
+        repos=repos, arch_repos=arch_repos,
+        pkgentries=[e for r in repos.values() for l in r.pkgentries_cache['x86_64'].values() for e in l],
+        file_indexes={'x86_64': FileIndex.load(str(tmp_path / 'x86_64.idx'), sources)},
+    )
+
+    linter = Linter(cache, [FileConflict])
+    linter.load_checks([FileConflict.name])
+    linter.run_checks()
+
+    messages = sorted(message for _, message in linter.enabled_checks[0].sorted_issues())
+    assert messages == [
+        'libre/x86_64/foo (extra/x86_64/baz: 1 files)',
+        'libre/x86_64/foo (pcr/x86_64/bar: 1 files)',
+        'pcr/x86_64/bar (extra/x86_64/baz: 1 files)',
+    ]
@@ -0,0 +1,89 @@
+'''
+the fixhooks of the split packages of a pkgbase never run at the same time
+'''
+
+import os
+import types
+
+from parabola_repolint.config import CONFIG, Bunch
+from parabola_repolint.fixer import Fixer
+
+
+# fails whenever another hook runs in the same PKGBUILD directory
+HOOK = '''
+mkdir foo.running || exit 1
+sleep 0.2
+rmdir foo.running
+'''
+
+
+class FakePkgBuild():
+    ''' a PKGBUILD in abslibre '''
+
+    def __init__(self, repo, pkgbase):
+        ''' constructor '''
+        self._repr = '%s/%s/PKGBUILD' % (repo, pkgbase)
+
+    def __repr__(self):
+        ''' produce the name of the PKGBUILD '''
+        return self._repr
+
+
+class FakePkgEntry():
+    ''' a repo.db entry produced by a PKGBUILD '''
+
+    def __init__(self, pkgbuild, pkgname):
+        ''' constructor '''
+        self.pkgbuilds = [pkgbuild]
+        self._repr = '%s/x86_64/%s' % (str(pkgbuild).split('/')[0], pkgname)
+
+    def __repr__(self):
+        ''' produce the name of the entry '''
+        return self._repr
+
+
+class FakeCheck():
+    ''' a check with issues on repo.db entries, fixed per <repo>/<pkgname> '''
+
+    def __init__(self, issues):
+        ''' constructor '''
+        self.issues = issues
+
+    def fixhook_base(self, issue):
+        ''' produce the fixhook base, as unsatisfiable_depends does '''
+        return '/'.join(str(issue[1]).split('/')[::2])
+
+    def fixhook_args(self, issue):
+        ''' produce the fixhook arguments '''
+        return list(issue[2:])
+
+    def __repr__(self):
+        ''' produce the name of the check '''
+        return 'fake_check'
+
+
+def test_split_packages_share_a_lock(tmp_path, monkeypatch):
+    ''' the hooks of two packages of the same pkgbase, with different fixbases, are serialized '''
+    abslibre = tmp_path / 'abslibre'
+    abslibre.mkdir()
+    scriptroot = tmp_path / 'fixhooks'
+    for pkgname in ['foo', 'foo-docs']:
+        hook = scriptroot / 'fake_check' / 'libre' / pkgname
+        hook.parent.mkdir(parents=True, exist_ok=True)
+        hook.write_text(HOOK)
+
+    monkeypatch.setitem(CONFIG, 'fixhooks', Bunch({
+        'enabled': True, 'jobs': 2, 'scriptroot': str(scriptroot), 'abslibre': str(abslibre),
+    }))
+
+    pkgbuild = FakePkgBuild('libre', 'foo')
+    issues = [('%s (%s)', FakePkgEntry(pkgbuild, n), 'missing') for n in ['foo', 'foo-docs']]
+    cache = types.SimpleNamespace(repos={}, arch_repos={})
+
+    fixer = Fixer(cache)
+    fixer.run_fixes([FakeCheck(issues)])
+
+    stats = fixer.stats['fake_check']
+    assert stats.runs == 2
+    assert stats.failures == 0
+    assert not os.path.exists(abslibre / 'foo.running')
@@ -0,0 +1,57 @@
+'''
+the issue history identifies issues of upgraded packages as the same issues
+'''
+
+import types
+
+from parabola_repolint.history import IssueHistory
+from parabola_repolint.linter import LinterCheckBase, LinterCheckType, object_identity
+
+
+class FakePkgFile():
+    ''' a package file, named by its version '''
+
+    def __init__(self, pkgname, pkgver):
+        ''' constructor '''
+        self.repo = types.SimpleNamespace(name='libre')
+        self.arch = 'x86_64'
+        self.pkgname = pkgname
+        self.pkgver = pkgver
+
+    def __repr__(self):
+        ''' produce the name of the package file '''
+        return 'libre/x86_64/%s-%s-x86_64.pkg.tar.zst' % (self.pkgname, self.pkgver)
+
+
+class OldPackage(LinterCheckBase):
+    ''' a check with issues on package files '''
+
+    name = 'test_old_package'
+    check_type = LinterCheckType.PKGFILE
+
+
+def record(history, time, pkgfiles):
+    ''' record a run with an issue on each package file '''
+    check = OldPackage(None, None)
+    check.issues.extend(('%s (built %s)', p, time) for p in pkgfiles)
+    return history.record(time, [check])[str(check)]
+
+
+def test_upgrades_keep_their_issues(tmp_path):
+    ''' an upgraded package with the same issue is neither new nor resolved '''
+    history = IssueHistory(str(tmp_path / 'history.sqlite'))
+    delta = record(history, '2020-01-01', [FakePkgFile('foo', '1.0-1'), FakePkgFile('bar', '1.0-1')])
+    assert len(delta.new) == 2
+
+    delta = record(history, '2020-01-02', [FakePkgFile('foo', '1.1-1'), FakePkgFile('bar', '1.0-1')])
+    assert not delta
+
+    delta = record(history, '2020-01-03', [FakePkgFile('foo', '1.1-1')])
+    assert delta.resolved == ['libre/x86_64/bar-1.0-1-x86_64.pkg.tar.zst (built 2020-01-02)']
+
+
+def test_object_identity():
+    ''' package files, given as objects or strings, are identified by name '''
+    assert object_identity(FakePkgFile('foo-libre', '1:2.0-3')) == 'libre/x86_64/foo-libre'
+    assert object_identity('libre/x86_64/foo-libre-1:2.0-3-x86_64.pkg.tar.xz') == 'libre/x86_64/foo-libre'
+    assert object_identity('libre/x86_64/foo-libre') == 'libre/x86_64/foo-libre'
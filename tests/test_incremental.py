@@ -0,0 +1,120 @@
+'''
+incremental runs reuse the issues of unchanged objects, and check changed ones again
+'''
+
+import json
+import types
+
+from parabola_repolint.linter import Linter, LinterCheckBase, LinterCheckType, LinterIssue
+
+
+class FakePkgFile():
+    ''' a built package '''
+
+    def __init__(self, name):
+        ''' constructor '''
+        self.name = name
+        self.fingerprint = name
+
+    def __repr__(self):
+        ''' produce the name of the package '''
+        return 'libre/x86_64/%s.pkg.tar.zst' % self.name
+
+
+class FakePkgEntry():
+    ''' a repo.db entry and its built package, fingerprinted by its version '''
+
+    def __init__(self, name, pkgfile, version='1'):
+        ''' constructor '''
+        self.name = name
+        self.pkgfile = pkgfile
+        self.fingerprint = '%s-%s' % (name, version)
+
+    def __repr__(self):
+        ''' produce the name of the entry '''
+        return 'libre/x86_64/%s' % self.name
+
+
+class UnbuiltEntry(LinterCheckBase):
+    ''' report every entry with its built package, counting the entries checked '''
+
+    name = 'test_unbuilt_entry'
+    check_type = LinterCheckType.PKGENTRY
+    checked = []
+    extra = None
+
+    def fingerprint(self, pkgentry):
+        ''' produce the digest of an input beyond the entry '''
+        return UnbuiltEntry.extra
+
+    def check(self, pkgentry):
+        ''' run the check '''
+        UnbuiltEntry.checked.append(pkgentry.name)
+        raise LinterIssue('%s (%s)', pkgentry.pkgfile, pkgentry)
+
+
+def make_cache(versions):
+    ''' produce a cache with an entry and a package of each name, of the given versions '''
+    pkgfiles = [FakePkgFile(n) for n in sorted(versions)]
+    pkgentries = [FakePkgEntry(p.name, p, versions[p.name]) for p in pkgfiles]
+    return types.SimpleNamespace(
+        pkgbuilds=[], pkgentries=pkgentries, pkgfiles=pkgfiles, arch_pkgfiles=[],
+        key_cache={}, keyring=[], quarantined=[],
+    )
+
+
+def run_linter(cache, path, jobs=1):
+    ''' run the test check incrementally, producing its issues and the checked entries '''
+    UnbuiltEntry.checked = []
+    linter = Linter(cache, [UnbuiltEntry])
+    linter.enable_incremental(path)
+    linter.load_checks([UnbuiltEntry.name])
+    linter.run_checks(jobs)
+    return linter.enabled_checks[0].issues, sorted(UnbuiltEntry.checked)
+
+
+def test_reuse_and_invalidation(tmp_path, monkeypatch):
+    ''' only changed entries are checked again, for changed fingerprints, extras or versions '''
+    path = str(tmp_path / 'state.json')
+    monkeypatch.setattr(UnbuiltEntry, 'extra', None)
+    monkeypatch.setattr(UnbuiltEntry, 'version', 1)
+
+    assert run_linter(make_cache({'a': '1', 'b': '1'}), path)[1] == ['a', 'b']
+    assert run_linter(make_cache({'a': '1', 'b': '1'}), path)[1] == []
+    assert run_linter(make_cache({'a': '1', 'b': '2'}), path)[1] == ['b']
+
+    monkeypatch.setattr(UnbuiltEntry, 'extra', 'x')
+    assert run_linter(make_cache({'a': '1', 'b': '2'}), path)[1] == ['a', 'b']
+
+    monkeypatch.setattr(UnbuiltEntry, 'version', 2)
+    assert run_linter(make_cache({'a': '1', 'b': '2'}), path)[1] == ['a', 'b']
+
+
+def test_reused_issues_refer_to_loaded_objects(tmp_path):
+    ''' a reused issue refers to the current pkgfile object, not to its string '''
+    path = str(tmp_path / 'state.json')
+    run_linter(make_cache({'a': '1'}), path)
+
+    cache = make_cache({'a': '1'})
+    issues, checked = run_linter(cache, path)
+    assert checked == []
+    assert issues == [('%s (%s)', cache.pkgfiles[0], cache.pkgentries[0])]
+
+    # the fake objects compare by identity
+    issues, _ = run_linter(cache, path, jobs=2)
+    assert issues == [('%s (%s)', cache.pkgfiles[0], cache.pkgentries[0])]
+
+    cache.pkgfiles = []
+    issues, checked = run_linter(cache, path)
+    assert checked == ['a']
+
+
+def test_older_state_is_discarded(tmp_path):
+    ''' a state of an older format, with stringified issues, is not reused '''
+    path = tmp_path / 'state.json'
+    run_linter(make_cache({'a': '1'}), str(path))
+
+    state = json.loads(path.read_text())
+    del state['format']
+    path.write_text(json.dumps(state))
+    assert run_linter(make_cache({'a': '1'}), str(path))[1] == ['a']
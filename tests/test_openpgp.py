@@ -0,0 +1,124 @@
+'''
+the openpgp parser reads signatures in old and new packet formats
+'''
+
+import base64
+
+import pytest
+
+from parabola_repolint.openpgp import (
+    PacketError, iter_packets, read_pgpsig, read_signature, read_signatures,
+)
+
+
+FINGERPRINT_V4 = bytes(range(20))
+FINGERPRINT_V5 = bytes(range(32))
+ISSUER = bytes.fromhex('0123456789ABCDEF')
+CREATED = 1600000000
+
+
+def subpacket(kind, data):
+    ''' produce a signature subpacket with a one octet length '''
+    return bytes([len(data) + 1, kind]) + data
+
+
+def signature_body(version, hashed, unhashed=b''):
+    ''' produce the body of a v4 or v5 binary signature by an rsa key over sha256 '''
+    return (bytes([version, 0x00, 1, 8]) + len(hashed).to_bytes(2, 'big') + hashed
+            + len(unhashed).to_bytes(2, 'big') + unhashed + b'\xab\xcd')
+
+
+def old_packet(tag, body, length_type):
+    ''' produce an old format packet with a 1, 2 or 4 octet or an indeterminate length '''
+    header = bytes([0x80 | (tag << 2) | length_type])
+    if length_type == 3:
+        return header + body
+    return header + len(body).to_bytes(1 << length_type, 'big') + body
+
+
+def new_length(length):
+    ''' produce a new format one, two or five octet length '''
+    if length < 192:
+        return bytes([length])
+    if length < 8384:
+        length -= 192
+        return bytes([(length >> 8) + 192, length & 0xFF])
+    return b'\xff' + length.to_bytes(4, 'big')
+
+
+def new_packet(tag, body):
+    ''' produce a new format packet '''
+    return bytes([0xC0 | tag]) + new_length(len(body)) + body
+
+
+def partial_packet(tag, body):
+    ''' produce a new format packet split into 512 and 1 octet partial bodies and a last one '''
+    return (bytes([0xC0 | tag]) + bytes([0xE0 | 9]) + body[:512] + bytes([0xE0]) + body[512:513]
+            + new_length(len(body) - 513) + body[513:])
+
+
+V4_SIGNATURE = signature_body(
+    4, subpacket(2, CREATED.to_bytes(4, 'big')) + subpacket(33, b'\x04' + FINGERPRINT_V4),
+    subpacket(16, ISSUER),
+)
+
+
+def test_old_and_new_formats():
+    ''' the same packet is read in every old and new format length encoding '''
+    for length_type in range(4):
+        assert list(iter_packets(old_packet(2, V4_SIGNATURE, length_type))) == [(2, V4_SIGNATURE)]
+
+    for size in [100, 1000, 10000]:
+        body = V4_SIGNATURE + b'\x00' * (size - len(V4_SIGNATURE))
+        data = new_packet(2, body) + old_packet(13, b'user', 0)
+        assert list(iter_packets(data)) == [(2, body), (13, b'user')]
+
+
+def test_partial_lengths():
+    ''' partial body lengths are joined into the body of one packet '''
+    body = V4_SIGNATURE + b'\x00' * 600
+    data = partial_packet(11, body) + new_packet(2, V4_SIGNATURE)
+    assert list(iter_packets(data)) == [(11, body), (2, V4_SIGNATURE)]
+    assert read_signature(data).key_id == ISSUER.hex().upper()
+
+
+def test_malformed_packets():
+    ''' headers without the leading bit, and truncated lengths and bodies, are errors '''
+    for data in [b'\x00\x01', new_packet(2, V4_SIGNATURE)[:-1], b'\x89\x01', b'\xc2\xff\x00']:
+        with pytest.raises(PacketError):
+            list(iter_packets(data))
+    with pytest.raises(PacketError):
+        read_signature(new_packet(13, b'user'))
+
+
+def test_v4_issuer_subpackets():
+    ''' the issuer subpacket has precedence over the issuer fingerprint '''
+    signature = read_signature(new_packet(2, V4_SIGNATURE))
+    assert signature.version == 4
+    assert signature.created == CREATED
+    assert signature.issuer == ISSUER.hex().upper()
+    assert signature.issuer_fingerprint == FINGERPRINT_V4.hex().upper()
+    assert signature.key_id == ISSUER.hex().upper()
+
+    body = signature_body(4, subpacket(2, CREATED.to_bytes(4, 'big')) + subpacket(33, b'\x04' + FINGERPRINT_V4))
+    signature = read_signature(old_packet(2, body, 1))
+    assert signature.issuer is None
+    assert signature.key_id == FINGERPRINT_V4[-8:].hex().upper()
+
+
+def test_v5_issuer_fingerprint():
+    ''' the key id of a v5 key is the start of its fingerprint '''
+    body = signature_body(5, subpacket(2, CREATED.to_bytes(4, 'big')) + subpacket(33, b'\x05' + FINGERPRINT_V5))
+    pgpsig = base64.b64encode(new_packet(2, body)).decode()
+    signature = read_pgpsig(pgpsig)
+    assert signature.version == 5
+    assert signature.created == CREATED
+    assert signature.key_id == FINGERPRINT_V5[:8].hex().upper()
+
+
+def test_armored_signatures():
+    ''' ascii armored data is read like binary data '''
+    data = new_packet(2, V4_SIGNATURE) * 2
+    armored = ('-----BEGIN PGP SIGNATURE-----\n\n%s\n=abcd\n-----END PGP SIGNATURE-----\n'
+               % base64.b64encode(data).decode())
+    assert [s.key_id for s in read_signatures(armored.encode())] == [ISSUER.hex().upper()] * 2
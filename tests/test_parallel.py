@@ -0,0 +1,104 @@
+'''
+checks run in parallel workers report the same issues as a sequential run
+'''
+
+import types
+import datetime
+
+import sh
+
+from parabola_repolint import commands
+from parabola_repolint.linter import Linter, LinterCheckBase, LinterCheckType, LinterIssue
+from parabola_repolint.timing import SUBPROCESS_TIMINGS
+
+
+class FakePkgFile():
+    ''' a built package '''
+
+    def __init__(self, name, builddate):
+        ''' constructor '''
+        self.name = name
+        self.builddate = builddate
+
+    def __repr__(self):
+        ''' produce the name of the package '''
+        return self.name
+
+
+class FakePkgEntry():
+    ''' a repo.db entry and its built package '''
+
+    def __init__(self, name, pkgfile):
+        ''' constructor '''
+        self.name = name
+        self.pkgfile = pkgfile
+
+    def __repr__(self):
+        ''' produce the name of the entry '''
+        return self.name
+
+
+class OldPkgFile(LinterCheckBase):
+    ''' report the built package of every other entry, with its build date '''
+
+    name = 'test_old_pkgfile'
+    check_type = LinterCheckType.PKGENTRY
+    incremental = False
+
+    def check(self, pkgentry):
+        ''' run the check '''
+        if int(pkgentry.name.rsplit('-', 1)[1]) % 2:
+            raise LinterIssue('%s: %s (built %s)', pkgentry, pkgentry.pkgfile,
+                              pkgentry.pkgfile.builddate)
+
+
+class PkgFileCommand(LinterCheckBase):
+    ''' run an external command on every package, and report some of them '''
+
+    name = 'test_pkgfile_command'
+    check_type = LinterCheckType.PKGFILE
+    incremental = False
+
+    def check(self, pkgfile):
+        ''' run the check '''
+        commands.run('true', pkgfile, sh.Command('true'))
+        if pkgfile.name.endswith('0'):
+            yield ('%s (%i)', pkgfile, len(pkgfile.name))
+
+
+def make_cache():
+    ''' produce a cache of 40 entries and their packages '''
+    date = datetime.datetime(2020, 1, 1)
+    pkgfiles = [FakePkgFile('pkg-%i' % i, date + datetime.timedelta(days=i)) for i in range(40)]
+    pkgentries = [FakePkgEntry('entry-%i' % i, p) for i, p in enumerate(pkgfiles)]
+    return types.SimpleNamespace(
+        pkgbuilds=[], pkgentries=pkgentries, pkgfiles=pkgfiles, arch_pkgfiles=[],
+        key_cache={}, keyring=[], quarantined=[],
+    )
+
+
+def run_linter(cache, jobs):
+    ''' run the test checks on the cache, producing their issues and the command timings '''
+    SUBPROCESS_TIMINGS.clear()
+    linter = Linter(cache, [OldPkgFile, PkgFileCommand])
+    linter.load_checks([OldPkgFile.name, PkgFileCommand.name])
+    linter.run_checks(jobs)
+    return {str(c): c.issues for c in linter.enabled_checks}, dict(SUBPROCESS_TIMINGS)
+
+
+def test_parallel_matches_sequential():
+    ''' the issues of a run on 2 workers are identical, referring to the same objects '''
+    cache = make_cache()
+    sequential, seq_timings = run_linter(cache, 1)
+    parallel, par_timings = run_linter(cache, 2)
+
+    assert sequential['test_old_pkgfile']
+    assert sequential['test_pkgfile_command']
+    # the fake objects compare by identity
+    assert parallel == sequential
+    for check, issues in parallel.items():
+        for par, seq in zip(issues, sequential[check]):
+            assert [type(a) for a in par] == [type(a) for a in seq]
+
+    assert par_timings['true'].visited == seq_timings['true'].visited == len(cache.pkgfiles)
+    assert all(o in cache.pkgfiles for _, o in par_timings['true'].slowest)
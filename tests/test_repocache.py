@@ -0,0 +1,109 @@
+'''
+loading a repo after an update touches only the files the update changed
+'''
+
+import os
+
+import pytest
+
+pytest.importorskip('pyalpm')
+if not os.path.exists('/usr/share/makepkg/util/schema.sh'):
+    pytest.skip('missing makepkg', allow_module_level=True)
+
+# pylint: disable=wrong-import-position
+from parabola_repolint.repocache import Repo, PkgFile, PKGFILE_SIDECARS
+from parabola_repolint.quarantine import Quarantine
+
+
+ARCH = 'x86_64'
+
+
+def add_package(arch_dir, pkgname):
+    '''
+    write a package, its signature and metadata sidecars newer than the
+    package, so that loading it runs no external commands
+    '''
+    filename = '%s-1.0-1-%s.pkg.tar.xz' % (pkgname, ARCH)
+    path = os.path.join(arch_dir, filename)
+    for name, data in [(filename, 'package'), (filename + '.sig', 'signature')]:
+        with open(os.path.join(arch_dir, name), 'w') as out:
+            out.write(data)
+        os.utime(os.path.join(arch_dir, name), (1000, 1000))
+
+    sidecars = ['pkgname = %s\nbuilddate = 1000\n' % pkgname, '', '{"key_id": null}']
+    for ext, data in zip(PKGFILE_SIDECARS, sidecars):
+        with open(path + ext, 'w') as out:
+            out.write(data)
+    return filename
+
+
+def load_repo(tmp_path, **kwargs):
+    ''' load the pkgfiles of the libre repo in tmp_path '''
+    return Repo('libre', None, str(tmp_path / 'pkgentries' / 'libre'),
+                str(tmp_path / 'pkgfiles' / 'libre'), arches=[ARCH],
+                quarantine=Quarantine(), **kwargs)
+
+
+@pytest.fixture
+def arch_dir(tmp_path):
+    ''' the directory of the packages of the libre repo, with foo and bar '''
+    path = tmp_path / 'pkgfiles' / 'libre' / 'os' / ARCH
+    path.mkdir(parents=True)
+    (tmp_path / 'pkgentries' / 'libre' / 'os').mkdir(parents=True)
+    add_package(str(path), 'foo')
+    add_package(str(path), 'bar')
+    return str(path)
+
+
+def test_resigned_package_drops_its_siginfo(tmp_path, arch_dir):
+    ''' a changed detached signature drops the signature sidecar of its package '''
+    foo = 'foo-1.0-1-%s.pkg.tar.xz' % ARCH
+    bar = 'bar-1.0-1-%s.pkg.tar.xz' % ARCH
+    changes = {ARCH: {'added': [], 'updated': [foo + '.sig'], 'deleted': []}}
+    load_repo(tmp_path, changes=changes, load_pkgfiles=False)
+
+    assert not os.path.exists(os.path.join(arch_dir, foo + '.siginfo'))
+    assert os.path.exists(os.path.join(arch_dir, foo + '.pkginfo'))
+    assert os.path.exists(os.path.join(arch_dir, foo + '.buildinfo'))
+    assert os.path.exists(os.path.join(arch_dir, bar + '.siginfo'))
+
+
+def test_reload_loads_only_changed_files(tmp_path, arch_dir, monkeypatch):
+    ''' unchanged pkgfiles are taken from the previous load without touching their files '''
+    previous = load_repo(tmp_path)
+    assert sorted(p.pkgname for p in previous.pkgfiles) == ['bar', 'foo']
+
+    bar = 'bar-1.0-1-%s.pkg.tar.xz' % ARCH
+    for name in [bar, bar + '.sig'] + [bar + ext for ext in PKGFILE_SIDECARS]:
+        os.remove(os.path.join(arch_dir, name))
+    baz = add_package(arch_dir, 'baz')
+    changes = {ARCH: {'added': [baz, baz + '.sig'], 'updated': [], 'deleted': [bar, bar + '.sig']}}
+
+    touched = []
+    getmtime = os.path.getmtime
+    def record(path):
+        ''' record the files statted by the reload '''
+        touched.append(path)
+        return getmtime(path)
+    monkeypatch.setattr(os.path, 'getmtime', record)
+
+    repo = load_repo(tmp_path, changes=changes, previous=previous)
+
+    assert sorted(p.pkgname for p in repo.pkgfiles) == ['baz', 'foo']
+    assert not [p for p in touched if 'foo-' in p]
+    foo = [p for p in repo.pkgfiles if p.pkgname == 'foo'][0]
+    assert isinstance(foo, PkgFile)
+    assert foo.repo is repo
+    assert foo not in previous.pkgfiles
+
+
+def test_resigned_package_changes_its_digest(tmp_path, arch_dir):
+    ''' a new detached signature changes the input digest, with the package mtime kept '''
+    def digest():
+        ''' produce the input digest of foo '''
+        return [p.input_digest for p in load_repo(tmp_path).pkgfiles if p.pkgname == 'foo'][0]
+
+    before = digest()
+    with open(os.path.join(arch_dir, 'foo-1.0-1-%s.pkg.tar.xz.sig' % ARCH), 'w') as out:
+        out.write('another signature')
+    assert digest() != before
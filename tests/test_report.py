@@ -0,0 +1,66 @@
+'''
+the digest and the delta digest are written in a single pass over the issues
+'''
+
+import io
+import types
+
+from parabola_repolint.history import IssueHistory
+from parabola_repolint.linter import Linter, LinterCheckBase, LinterCheckType, LinterIssue
+from parabola_repolint.report import TextSink, DeltaSink
+
+
+class BadPackage(LinterCheckBase):
+    ''' report the packages in bad '''
+
+    name = 'test_bad_package'
+    check_type = LinterCheckType.PKGFILE
+    header = 'bad packages'
+    bad = set()
+    sorted_calls = 0
+
+    def check(self, pkgfile):
+        ''' run the check '''
+        if pkgfile in BadPackage.bad:
+            raise LinterIssue('%s is bad', pkgfile)
+
+    def sorted_issues(self):
+        ''' count the passes over the issues '''
+        BadPackage.sorted_calls += 1
+        return super().sorted_issues()
+
+
+def run_linter(history, bad):
+    ''' run the check on three packages and record the run '''
+    BadPackage.bad = bad
+    cache = types.SimpleNamespace(
+        pkgbuilds=[], pkgentries=[], pkgfiles=['x', 'y', 'z'], arch_pkgfiles=[],
+        key_cache={}, keyring=[], quarantined=[],
+    )
+    linter = Linter(cache, [BadPackage])
+    linter.load_checks([BadPackage.name])
+    linter.run_checks()
+    linter.record_history(history)
+    return linter
+
+
+def test_digests_in_one_pass(tmp_path):
+    ''' both digests come from one pass, and a check with only resolved issues is in the delta '''
+    history = IssueHistory(str(tmp_path / 'history.sqlite'))
+    run_linter(history, {'x', 'y'})
+    linter = run_linter(history, {'y'})
+
+    digest, delta = io.StringIO(), io.StringIO()
+    BadPackage.sorted_calls = 0
+    linter.write_report([TextSink(digest), DeltaSink(delta)])
+    assert BadPackage.sorted_calls == 1
+
+    assert digest.getvalue().endswith('issues:\n    y is bad')
+    assert delta.getvalue().endswith('resolved issues:\n    x is bad')
+    assert 'new issues' not in delta.getvalue()
+
+    linter = run_linter(history, set())
+    digest, delta = io.StringIO(), io.StringIO()
+    linter.write_report([TextSink(digest), DeltaSink(delta)])
+    assert 'bad packages' not in digest.getvalue()
+    assert delta.getvalue().endswith('resolved issues:\n    y is bad')
@@ -0,0 +1,52 @@
+'''
+sharded runs merged together report the same issues as a single run
+'''
+
+import os
+import sys
+import json
+import subprocess
+
+from conftest import ROOT
+
+# pylint: disable=wrong-import-position
+from scaling import write_config
+
+
+def run_linter(run_dir, *args):
+    ''' run the linter in run_dir with its own cache and config '''
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT
+    env['XDG_CACHE_HOME'] = os.path.join(run_dir, 'cache')
+    env['XDG_CONFIG_HOME'] = os.path.join(run_dir, 'config')
+    env['XDG_DATA_HOME'] = os.path.join(run_dir, 'data')
+    cmd = [sys.executable, '-m', 'parabola_repolint'] + list(args)
+    subprocess.run(cmd, cwd=run_dir, env=env, check=True)
+
+
+def read_issues(path):
+    ''' produce the sorted (check, message) pairs of an ndjson report '''
+    with open(path, 'r') as infile:
+        records = [json.loads(line) for line in infile]
+    return sorted((r['check'], r['message']) for r in records)
+
+
+def test_merged_shards_match_single_run(synthetic_mirror, tmp_path):
+    ''' the merge of two shards, one per arch, reports exactly the issues of a single run '''
+    single = str(tmp_path / 'single')
+    sharded = str(tmp_path / 'sharded')
+    for run_dir in [single, sharded]:
+        os.makedirs(run_dir)
+        write_config(synthetic_mirror, run_dir)
+
+    run_linter(single, '--ndjson', 'issues.ndjson')
+
+    index = os.path.join(sharded, 'index.json')
+    for shard in range(2):
+        run_linter(sharded, '--shard', '%i/2' % shard, '--index', index,
+                   '--shard-output', 'shard-%i.json' % shard)
+    run_linter(sharded, '--ndjson', 'issues.ndjson', 'merge', 'shard-0.json', 'shard-1.json')
+
+    expected = read_issues(os.path.join(single, 'issues.ndjson'))
+    assert expected
+    assert read_issues(os.path.join(sharded, 'issues.ndjson')) == expected